@@ -1,12 +1,31 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import logging
 from datetime import datetime
 import threading
+import time
+import uuid
+import atexit
 from config import config
 from utils.realtime_detection import RealtimeDetector, StreamingProcessor
+from utils.frame_source import ProgressiveCapture
+from utils.stream_manager import StreamManager
+from utils.inference_scheduler import InferenceScheduler, PRIORITY_CLASSES
+from utils.violation_store import ViolationStore, db_path_from_uri
+from utils.plate_index import PlateIndex, NGRAM, normalize_plate
+from utils.evidence import EvidenceWriter, EvidenceRecorder
+from utils.annotation import AnnotatedOutputWriter
+from utils.result_cache import ResultCache
+from utils.result_sink import ResultSink
+from utils.checkpoint import CheckpointStore, JobCheckpointer, source_fingerprint
+from utils.tiling import TiledInference
+from utils.ocr_pool import OCRWorkerPool
+from utils.resources import ResourceManager
+from utils.load_shedding import LoadShedder
+from utils.events import EventAggregator, IoUTracker
+from utils.export import iter_log_chunks, iter_log_records, ndjson_chunks, csv_chunks
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -19,10 +38,46 @@ app.config.from_object(config)
 # Enable CORS
 CORS(app, resources={r"/api/*": {"origins": app.config['CORS_ORIGINS']}})
 
+# Split the cores between inference, decoding and OCR before any library starts its threads.
+# Without OCR workers OCR runs on the inference threads, so it gets no share of its own.
+resources = ResourceManager(
+    {pool: share for pool, share in config.CPU_BUDGET.items() if pool != 'ocr' or config.OCR_WORKERS > 0},
+    reserved_cores=config.CPU_RESERVED_CORES,
+    pin=config.CPU_PIN_WORKERS
+)
+resources.apply_server()
+
+# Out-of-process OCR (keeps EasyOCR off the detection threads' GIL and torch pool).
+# Started before the detector loads YOLO/EasyOCR so the forked workers inherit neither.
+ocr_pool = None
+if config.OCR_WORKERS > 0:
+    ocr_pool = OCRWorkerPool(
+        config.OCR_WORKERS,
+        ocr_settings={
+            'recognition_only': config.OCR_RECOGNITION_ONLY,
+            'allowlist': config.OCR_ALLOWLIST,
+            'min_confidence': config.OCR_MIN_CONFIDENCE,
+            'plate_height': 64
+        },
+        use_gpu=False,
+        slots=config.OCR_POOL_SLOTS,
+        slot_bytes=config.OCR_POOL_SLOT_BYTES,
+        torch_threads=config.OCR_WORKER_THREADS or resources.threads('ocr', config.OCR_WORKERS),
+        cpu_sets=[resources.worker_cores('ocr', i, config.OCR_WORKERS) for i in range(config.OCR_WORKERS)]
+        if config.CPU_PIN_WORKERS else None,
+        slot_timeout=config.OCR_POOL_SLOT_TIMEOUT
+    )
+    atexit.register(ocr_pool.close)
+
 # Initialize detector (loaded once)
 logger.info("Initializing real-time detector with optimizations...")
-detector = RealtimeDetector(use_gpu=False)  # Set to True if you have GPU (CUDA)
-processor = StreamingProcessor(detector, speed_limit=config.SPEED_LIMIT)
+detector = RealtimeDetector(use_gpu=False,  # Set to True if you have GPU (CUDA)
+                            plate_model_path=config.PLATE_MODEL_WEIGHTS)
+if not config.PLATE_PREFILTER_ENABLED:
+    detector.plate_filter = None
+detector.ocr_recognition_only = config.OCR_RECOGNITION_ONLY
+detector.ocr_allowlist = config.OCR_ALLOWLIST
+detector.ocr_min_confidence = config.OCR_MIN_CONFIDENCE
 
 # Global variables for streaming
 streaming_data = {
@@ -34,6 +89,174 @@ streaming_data = {
 }
 streaming_lock = threading.Lock()
 
+# Background jobs (progressive uploads etc.), keyed by job_id
+jobs = {}
+jobs_lock = threading.Lock()
+
+# Persistent violation history (batched background writes, WAL mode)
+violation_store = ViolationStore(
+    db_path_from_uri(config.SQLALCHEMY_DATABASE_URI),
+    batch_size=config.VIOLATION_STORE_BATCH_SIZE,
+    flush_interval=config.VIOLATION_STORE_FLUSH_INTERVAL,
+    max_queue=config.VIOLATION_STORE_MAX_QUEUE
+)
+violation_store.start()
+atexit.register(violation_store.close)
+
+# Fuzzy plate search, kept in sync with the store's writes
+plate_index = PlateIndex()
+plate_index.attach(violation_store)
+
+
+def record_violation(violation_info, job_id=None):
+    """Publish a detection result to the live status feed and persist violations"""
+    if violation_info.get('is_violation'):
+        violation_store.add(violation_info, job_id=job_id)
+    
+    with streaming_lock:
+        streaming_data['last_violations'].append(violation_info)
+        if len(streaming_data['last_violations']) > 10:
+            streaming_data['last_violations'].pop(0)
+        streaming_data['total_violations'] += 1
+
+
+# Repeat requests for the same video + settings are answered from disk
+result_cache = (ResultCache(config.RESULT_CACHE_FOLDER, max_bytes=config.RESULT_CACHE_MAX_BYTES)
+                if config.RESULT_CACHE_ENABLED else None)
+
+
+def processing_settings():
+    """Settings that change the output of a processing run (part of the cache key)"""
+    return {
+        'frame_skip': detector.frame_skip,
+        'confidence': detector.conf_threshold,
+        'speed_limit': config.SPEED_LIMIT,
+        'model_version': detector.model_version,
+        'plate_prefilter': detector.plate_filter is not None,
+        'ocr': [detector.ocr_recognition_only, detector.ocr_allowlist, detector.ocr_min_confidence],
+        'events': [config.EVENT_AGGREGATION, config.EVENT_GAP_FRAMES,
+                   config.EVENT_TRACK_IOU, config.EVENT_TRACK_MAX_AGE]
+    }
+
+
+# Long file jobs snapshot their progress so a restart resumes instead of starting over
+checkpoint_store = CheckpointStore(config.CHECKPOINT_FOLDER) if config.CHECKPOINT_ENABLED else None
+
+
+# Evidence clips/stills are encoded on a background writer
+evidence_writer = EvidenceWriter(config.EVIDENCE_FOLDER) if config.EVIDENCE_ENABLED else None
+
+
+def make_evidence_recorder(name):
+    """Per-stream evidence ring buffer (None when evidence capture is disabled)"""
+    if evidence_writer is None:
+        return None
+    return EvidenceRecorder(
+        evidence_writer,
+        name=name,
+        pre_roll=config.EVIDENCE_PRE_ROLL,
+        post_roll=config.EVIDENCE_POST_ROLL,
+        jpeg_quality=config.EVIDENCE_JPEG_QUALITY
+    )
+
+
+def make_tiler():
+    """Tiled full-resolution inference for high-resolution sources"""
+    return TiledInference(
+        detector,
+        tile_size=config.TILE_SIZE,
+        overlap=config.TILE_OVERLAP,
+        nms_threshold=config.TILE_NMS_THRESHOLD,
+        iou_threshold=config.TILE_IOU_THRESHOLD,
+        include_full_frame=config.TILE_INCLUDE_FULL_FRAME,
+        full_refresh_interval=config.TILE_FULL_REFRESH_INTERVAL,
+        activity_ttl=config.TILE_ACTIVITY_TTL
+    )
+
+
+def make_event_aggregator(keep_detail=None):
+    """Track-level violation events (None = one record per vehicle per frame)"""
+    if not config.EVENT_AGGREGATION:
+        return None
+    return EventAggregator(
+        IoUTracker(iou_threshold=config.EVENT_TRACK_IOU, max_age=config.EVENT_TRACK_MAX_AGE),
+        gap_frames=config.EVENT_GAP_FRAMES,
+        keep_detail=config.EVENT_KEEP_DETAIL if keep_detail is None else bool(keep_detail)
+    )
+
+
+def make_load_shedder(latency_slo=None):
+    """Latency-SLO controller for a live source (None when shedding is disabled)"""
+    slo = latency_slo or config.STREAM_LATENCY_SLO
+    if not slo:
+        return None
+    return LoadShedder(
+        float(slo),
+        drop_stride=config.STREAM_SHED_DROP_STRIDE,
+        reduced_size=config.STREAM_SHED_REDUCED_SIZE,
+        recover_frames=config.STREAM_SHED_RECOVER_FRAMES
+    )
+
+
+def make_result_sink(job_id):
+    """Per-job violation log under RESULT_LOG_FOLDER with a bounded in-memory window"""
+    return ResultSink(os.path.join(config.RESULT_LOG_FOLDER, f'{job_id}.ndjson'),
+                      window_size=config.RESULT_WINDOW_SIZE)
+
+
+def make_annotator(name, output_fps=None, output_size=None):
+    """Asynchronous annotated-video writer for one run"""
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_annotated.mp4"
+    return AnnotatedOutputWriter(
+        os.path.join(config.ANNOTATION_FOLDER, filename),
+        output_fps=output_fps or config.ANNOTATION_FPS,
+        output_size=output_size or config.ANNOTATION_SIZE,
+        max_queue=config.ANNOTATION_QUEUE_SIZE
+    )
+
+
+# Live cameras and file jobs share one batched inference engine; file jobs
+# run at a lower priority class so live enforcement never waits on uploads
+inference_scheduler = InferenceScheduler(
+    detector,
+    max_batch_size=config.INFERENCE_BATCH_SIZE,
+    batch_timeout=config.INFERENCE_BATCH_TIMEOUT,
+    default_max_staleness=config.STREAM_MAX_STALENESS,
+    class_shares=config.SCHEDULER_CLASS_SHARES,
+    share_window=config.SCHEDULER_SHARE_WINDOW
+)
+
+
+def attach_scheduler(job_processor, source_id, priority):
+    """Route a file job's YOLO calls through the shared scheduler; returns the scheduler source or None"""
+    job_processor.scheduler = None
+    if job_processor.tiler is not None:
+        return None  # tiled jobs batch their own tiles
+    inference_scheduler.register_source(source_id, priority=priority)
+    inference_scheduler.start()
+    job_processor.scheduler = inference_scheduler
+    job_processor.scheduler_source = source_id
+    return source_id
+
+stream_manager = StreamManager(
+    detector,
+    speed_limit=config.SPEED_LIMIT,
+    output_callback=record_violation,
+    max_sources=config.MAX_STREAMS,
+    backoff_initial=config.STREAM_RECONNECT_BACKOFF_INITIAL,
+    backoff_max=config.STREAM_RECONNECT_BACKOFF_MAX,
+    scheduler=inference_scheduler,
+    pipeline_depth=config.STREAM_PIPELINE_DEPTH,
+    evidence_factory=make_evidence_recorder,
+    annotation_factory=make_annotator,
+    tiling_factory=make_tiler,
+    ocr_pool=ocr_pool,
+    shedding_factory=make_load_shedder,
+    events_factory=make_event_aggregator,
+    ring_slots=config.FRAME_RING_SLOTS,
+    ocr_defer_max_frames=config.STREAM_SHED_OCR_MAX_DEFER
+)
+
 logger.info("✓ Real-time detector initialized with 10x speedup!")
 
 
@@ -119,18 +342,78 @@ def process_realtime():
     if not os.path.exists(filepath):
         return jsonify({'error': f'File not found: {file_id}'}), 404
     
+    priority = data.get('priority', config.UPLOAD_PRIORITY)
+    if priority not in PRIORITY_CLASSES:
+        return jsonify({'error': f'priority must be one of {list(PRIORITY_CLASSES)}'}), 400
+    
+    # Annotated runs must produce a fresh output video, so they bypass the cache
+    cache_key = content_digest = None
+    if result_cache is not None and data.get('use_cache', True) and not data.get('annotate'):
+        content_digest = result_cache.file_digest(filepath)
+        cache_key = ResultCache.make_key(
+            content_digest, {**processing_settings(), 'tiled': bool(data.get('tiled')),
+                             'detail': bool(data.get('detail', config.EVENT_KEEP_DETAIL))}
+        )
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✓ Cache hit for {file_id} (same content as {cached['file_id']})")
+            cached.update({'cached': True, 'requested_file_id': file_id})
+            return jsonify(cached), 200
+    
+    scheduler_source = None
     try:
         logger.info(f"⚡ Starting REAL-TIME processing: {file_id}")
         logger.info(f"   Frame skip: {detector.frame_skip} (detect every {detector.frame_skip} frames)")
         logger.info(f"   Confidence: {detector.conf_threshold}")
         
+        # Resume from the last checkpoint of this upload unless asked to start over
+        checkpointer = None
+        resuming = False
+        if checkpoint_store is not None:
+            checkpointer = JobCheckpointer(
+                checkpoint_store, file_id,
+                interval_frames=config.CHECKPOINT_INTERVAL_FRAMES,
+                fingerprint=source_fingerprint(filepath)
+            )
+            if not data.get('resume', True):
+                checkpointer.complete()
+            elif checkpointer.load() is not None:
+                # Violations between the checkpoint and the crash were already persisted.
+                # Events are reported when they close, not in frame order, so match them by key.
+                resuming = True
+        
+        # Optional annotated output, drawn and encoded on its own thread
+        annotator = None
+        if data.get('annotate'):
+            output_size = None
+            if data.get('output_width') and data.get('output_height'):
+                output_size = (int(data['output_width']), int(data['output_height']))
+            annotator = make_annotator(
+                os.path.splitext(file_id)[0],
+                output_fps=data.get('output_fps'),
+                output_size=output_size
+            )
+        
+        # Per-request processor: concurrent jobs share only the detector (and OCR pool)
+        processor = StreamingProcessor(
+            detector, speed_limit=config.SPEED_LIMIT,
+            evidence=make_evidence_recorder(os.path.splitext(file_id)[0]),
+            annotator=annotator,
+            checkpoint=checkpointer,
+            sink=make_result_sink(file_id),
+            tiler=make_tiler() if data.get('tiled') else None,
+            ocr_pool=ocr_pool,
+            events=make_event_aggregator(data.get('detail'))
+        )
+        processor.keyframe_seek_min_skip = config.KEYFRAME_SEEK_MIN_SKIP
+        scheduler_source = attach_scheduler(processor, f'upload:{file_id}:{uuid.uuid4().hex[:8]}', priority)
+        
         def on_violation(violation_info):
             """Callback when violation is detected"""
-            with streaming_lock:
-                streaming_data['last_violations'].append(violation_info)
-                if len(streaming_data['last_violations']) > 10:
-                    streaming_data['last_violations'].pop(0)
-                streaming_data['total_violations'] += 1
+            if resuming and violation_info.get('is_violation') and violation_store.contains_event(
+                    file_id, violation_info, since=checkpointer.started_at):
+                return
+            record_violation(violation_info, job_id=file_id)
         
         def on_frame(frame_info):
             """Callback on each frame processed"""
@@ -149,20 +432,258 @@ def process_realtime():
         
         logger.info(f"✓ Real-time processing complete: {result['violations']} violations in {result['total_frames']} frames")
         
-        return jsonify({
+        response = {
             'success': True,
             'file_id': file_id,
             'total_frames': result['total_frames'],
+            'frames_analyzed': result['frames_analyzed'],
+            'frames_dropped': result['frames_dropped'],  # rejected by the inference scheduler
+            'partial': result['frames_dropped'] > 0,
+            'resumed_from': result['resumed_from'],
+            'results_log': os.path.basename(result['results_log']) if result['results_log'] else None,
             'fps': result['fps'],
             'violations_detected': result['violations'],
             'violations': result['violation_list'],
+            'job_id': file_id,  # full history: GET /api/violations?job_id=<file_id>
+            'annotated_output': os.path.basename(result['output_path']) if result['output_path'] else None,
             'processing_type': 'realtime',
             'optimization': '⚡ Frame skipping enabled for 10x speed'
-        }), 200
+        }
+        
+        # A run with frames the scheduler dropped is incomplete - don't serve it again
+        if cache_key is not None and not response['partial']:
+            result_cache.put(cache_key, content_digest, response)
+        
+        return jsonify(response), 200
     
     except Exception as e:
         logger.error(f"Processing error: {e}")
         return jsonify({'error': str(e)}), 500
+    
+    finally:
+        if scheduler_source is not None:
+            inference_scheduler.unregister_source(scheduler_source)
+
+
+def _run_progressive_job(job_id, filepath, upload_finished, upload_failed):
+    """Run detection on a file while it is still being uploaded (abandoned if the upload fails)"""
+    job_processor = StreamingProcessor(
+        detector, speed_limit=config.SPEED_LIMIT,
+        evidence=make_evidence_recorder(job_id),
+        sink=make_result_sink(job_id),
+        events=make_event_aggregator(),
+        ocr_pool=ocr_pool
+    )
+    job_processor.keyframe_seek_min_skip = config.KEYFRAME_SEEK_MIN_SKIP
+    scheduler_source = attach_scheduler(job_processor, f'job:{job_id}', config.PROGRESSIVE_PRIORITY)
+    
+    def on_violation(violation_info):
+        with jobs_lock:
+            job = jobs[job_id]
+            job['violations_detected'] += 1
+            if job['first_violation_latency'] is None:
+                job['first_violation_latency'] = round(time.time() - job['started_at'], 3)
+        record_violation(violation_info, job_id=job_id)
+    
+    def on_frame(frame_info):
+        with jobs_lock:
+            jobs[job_id]['current_frame'] = frame_info['frame_num']
+    
+    try:
+        cap = ProgressiveCapture(
+            filepath, upload_finished,
+            poll_interval=config.PROGRESSIVE_POLL_INTERVAL,
+            idle_timeout=config.PROGRESSIVE_IDLE_TIMEOUT,
+            failed=upload_failed
+        )
+        with jobs_lock:
+            if not upload_failed.is_set():
+                jobs[job_id]['status'] = 'processing'
+            jobs[job_id]['source_mode'] = cap.mode
+        
+        result = job_processor.process_stream(
+            cap,
+            output_callback=on_violation,
+            frame_callback=on_frame
+        )
+        
+        with jobs_lock:
+            if upload_failed.is_set():
+                # Only part of the file arrived: results would be incomplete
+                jobs[job_id]['status'] = 'failed'
+                jobs[job_id]['error'] = jobs[job_id].get('error') or 'Upload failed'
+            elif 'error' in result:
+                jobs[job_id]['status'] = 'failed'
+                jobs[job_id]['error'] = result['error']
+            else:
+                jobs[job_id]['status'] = 'completed'
+                jobs[job_id]['result'] = result
+        logger.info(f"✓ Progressive job {job_id} finished")
+    
+    except Exception as e:
+        logger.error(f"Progressive job {job_id} failed: {e}")
+        with jobs_lock:
+            jobs[job_id]['status'] = 'failed'
+            jobs[job_id]['error'] = str(e)
+    
+    finally:
+        if scheduler_source is not None:
+            inference_scheduler.unregister_source(scheduler_source)
+
+
+@app.route('/api/upload/stream', methods=['POST'])
+def upload_stream():
+    """
+    Upload a video as a raw request body and start detection on the bytes as they arrive.
+    Usage: POST /api/upload/stream?filename=clip.ts  (body = file bytes, chunked OK)
+    Progressive formats (MJPEG, MPEG-TS, fragmented/faststart MP4) are processed
+    during the upload; other files start as soon as the upload completes.
+    """
+    original_name = request.args.get('filename') or request.headers.get('X-Filename', '')
+    
+    if not original_name or not allowed_file(original_name):
+        return jsonify(
+            {'error': f'filename required. Allowed: {config.ALLOWED_EXTENSIONS}'}
+        ), 400
+    
+    filename = datetime.now().strftime('%Y%m%d_%H%M%S_') + secure_filename(original_name)
+    filepath = os.path.join(config.UPLOAD_FOLDER, filename)
+    job_id = uuid.uuid4().hex
+    upload_finished = threading.Event()
+    upload_failed = threading.Event()
+    
+    with jobs_lock:
+        jobs[job_id] = {
+            'job_id': job_id,
+            'file_id': filename,
+            'status': 'uploading',
+            'started_at': time.time(),
+            'bytes_received': 0,
+            'upload_complete': False,
+            'current_frame': 0,
+            'violations_detected': 0,
+            'first_violation_latency': None
+        }
+    
+    worker = None
+    bytes_received = 0
+    
+    try:
+        with open(filepath, 'wb') as f:
+            while True:
+                chunk = request.stream.read(config.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                
+                bytes_received += len(chunk)
+                if bytes_received > config.MAX_FILE_SIZE:
+                    raise ValueError(f'File too large. Max: {config.MAX_FILE_SIZE / 1024 / 1024}MB')
+                
+                f.write(chunk)
+                f.flush()
+                
+                with jobs_lock:
+                    jobs[job_id]['bytes_received'] = bytes_received
+                
+                # Kick off detection as soon as the first bytes are on disk
+                if worker is None:
+                    worker = threading.Thread(
+                        target=_run_progressive_job,
+                        args=(job_id, filepath, upload_finished, upload_failed),
+                        daemon=True
+                    )
+                    worker.start()
+    
+    except Exception as e:
+        logger.error(f"Streaming upload error: {e}")
+        upload_failed.set()  # stop the detection worker; the partial file is not processed further
+        with jobs_lock:
+            jobs[job_id]['status'] = 'failed'
+            jobs[job_id]['error'] = str(e)
+        return jsonify({'error': str(e), 'job_id': job_id}), 400
+    
+    finally:
+        upload_finished.set()
+    
+    with jobs_lock:
+        jobs[job_id]['upload_complete'] = True
+        job = dict(jobs[job_id])
+    
+    if worker is None:
+        return jsonify({'error': 'Empty upload', 'job_id': job_id}), 400
+    
+    logger.info(f"Streaming upload finished: {filename} ({bytes_received} bytes)")
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'file_id': filename,
+        'bytes_received': bytes_received,
+        'status': job['status'],
+        'violations_so_far': job['violations_detected']
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Get status of a background processing job"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': f'Job not found: {job_id}'}), 404
+        job = dict(job)
+    
+    result = job.pop('result', None)
+    if result:
+        job['total_frames'] = result['total_frames']
+        job['fps'] = result['fps']
+        job['violations'] = result['violation_list']
+        job['results_log'] = os.path.basename(result['results_log']) if result['results_log'] else None
+    
+    return jsonify(job), 200
+
+
+@app.route('/api/jobs/<job_id>/export', methods=['GET'])
+def export_job(job_id):
+    """
+    Stream every violation of a job as NDJSON (default) or CSV (?format=csv).
+    Reads the job's on-disk results log, or the violation store when the job
+    has no log (?source=store forces the store). Memory use is independent
+    of the result size.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    log_path = os.path.join(config.RESULT_LOG_FOLDER, secure_filename(job_id) + '.ndjson')
+    use_log = request.args.get('source') != 'store' and os.path.exists(log_path)
+    
+    if not use_log and violation_store.count(filters={'job_id': job_id}) == 0:
+        return jsonify({'error': f'No results for job: {job_id}'}), 404
+    
+    if export_format == 'ndjson':
+        chunks = iter_log_chunks(log_path) if use_log else \
+            ndjson_chunks(violation_store.iter_rows({'job_id': job_id}))
+        mimetype = 'application/x-ndjson'
+    else:
+        records = iter_log_records(log_path) if use_log else violation_store.iter_rows({'job_id': job_id})
+        chunks = csv_chunks(records)
+        mimetype = 'text/csv'
+    
+    filename = f"{secure_filename(job_id)}_violations.{export_format}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@app.route('/api/checkpoints', methods=['GET'])
+def list_checkpoints():
+    """Interrupted file jobs that will resume on the next /api/process/realtime call"""
+    if checkpoint_store is None:
+        return jsonify({'success': True, 'checkpoints': {}}), 200
+    return jsonify({'success': True, 'checkpoints': checkpoint_store.list()}), 200
 
 
 # Keep backward compatibility with old endpoints
@@ -191,6 +712,87 @@ def stream_status():
         }), 200
 
 
+@app.route('/api/streams', methods=['GET'])
+def list_streams():
+    """List registered live sources with per-source health stats"""
+    return jsonify({
+        'success': True,
+        'streams': stream_manager.stats(),
+        'scheduler': inference_scheduler.stats()
+    }), 200
+
+
+@app.route('/api/streams', methods=['POST'])
+def register_stream():
+    """
+    Register a live source (RTSP/HTTP URL, file path or device index)
+    Body: {"source_id": "cam-1", "uri": "rtsp://...", "loop": false, "start": true,
+           "weight": 1, "max_staleness": 1.0, "annotate": false, "tiled": false,
+           "priority": "live", "latency_slo": 2.0, "decode_process": false}
+    """
+    data = request.get_json()
+    
+    if not data or 'uri' not in data:
+        return jsonify({'error': 'uri required'}), 400
+    
+    source_id = data.get('source_id') or uuid.uuid4().hex[:8]
+    
+    try:
+        stream_manager.register(
+            source_id, data['uri'],
+            loop_files=bool(data.get('loop', False)),
+            weight=int(data.get('weight', 1)),
+            max_staleness=data.get('max_staleness'),
+            annotate=bool(data.get('annotate', False)),
+            tiled=bool(data.get('tiled', False)),
+            priority=data.get('priority', 'live'),
+            latency_slo=data.get('latency_slo'),
+            decode_process=bool(data.get('decode_process', config.STREAM_DECODE_PROCESS))
+        )
+        if data.get('start', True):
+            stream_manager.start(source_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'stream': stream_manager.source_stats(source_id)
+    }), 201
+
+
+@app.route('/api/streams/<source_id>', methods=['GET', 'DELETE'])
+def stream_detail(source_id):
+    """Get stats for one source, or stop and remove it"""
+    try:
+        if request.method == 'DELETE':
+            stream_manager.unregister(source_id)
+            return jsonify({'success': True, 'message': f'Stream {source_id} removed'}), 200
+        
+        return jsonify({'success': True, 'stream': stream_manager.source_stats(source_id)}), 200
+    except KeyError:
+        return jsonify({'error': f'Stream not found: {source_id}'}), 404
+
+
+@app.route('/api/streams/<source_id>/start', methods=['POST'])
+def start_stream(source_id):
+    """Start reading and processing a registered source"""
+    try:
+        stream_manager.start(source_id)
+        return jsonify({'success': True, 'stream': stream_manager.source_stats(source_id)}), 200
+    except KeyError:
+        return jsonify({'error': f'Stream not found: {source_id}'}), 404
+
+
+@app.route('/api/streams/<source_id>/stop', methods=['POST'])
+def stop_stream(source_id):
+    """Stop a running source (stays registered)"""
+    try:
+        stream_manager.stop(source_id)
+        return jsonify({'success': True, 'stream': stream_manager.source_stats(source_id)}), 200
+    except KeyError:
+        return jsonify({'error': f'Stream not found: {source_id}'}), 404
+
+
 @app.route('/api/settings', methods=['GET', 'POST'])
 def settings():
     """Get/update system settings for performance tuning"""
@@ -219,12 +821,21 @@ def settings():
 @app.route('/api/stats', methods=['GET'])
 def get_statistics():
     """Get system statistics"""
+    today_start = datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+    violations_today = violation_store.count(since=today_start)
     
     with streaming_lock:
         return jsonify({
             'success': True,
             'total_violations': streaming_data['total_violations'],
             'current_frame': streaming_data['current_frame'],
+            'violations_today': violations_today,
+            'violation_store': violation_store.stats(),
+            'evidence': evidence_writer.stats() if evidence_writer else None,
+            'plate_localizer': detector.plate_localizer.stats() if detector.plate_localizer else None,
+            'plate_prefilter': detector.plate_filter.stats() if detector.plate_filter else None,
+            'ocr': detector.ocr_stats,
+            'ocr_pool': ocr_pool.stats() if ocr_pool else None,
             'processing_mode': 'real-time with frame skipping',
             'status': 'available'
         }), 200
@@ -242,6 +853,161 @@ def list_violations():
         }), 200
 
 
+def _parse_time(value):
+    """Accept unix seconds or an ISO-8601 timestamp"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _violation_filters(args):
+    """Build store filters from query-string parameters"""
+    return {
+        'start_time': _parse_time(args.get('start')),
+        'end_time': _parse_time(args.get('end')),
+        'camera_id': args.get('camera'),
+        'violation_type': args.get('type'),
+        'job_id': args.get('job_id'),
+        'plate': args.get('plate'),
+        'min_speed': args.get('min_speed', type=float),
+        'max_speed': args.get('max_speed', type=float),
+        'plate_prefix': args.get('plate_prefix')
+    }
+
+
+@app.route('/api/violations', methods=['GET'])
+def query_violations():
+    """
+    Query the full violation history (newest first, keyset-paginated)
+    Params: start, end (ISO or unix), camera, type, job_id, min_speed, max_speed,
+            plate, plate_prefix, limit (<=1000), cursor, include_count=1
+    """
+    try:
+        filters = _violation_filters(request.args)
+        page = violation_store.query(
+            filters,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 100, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    
+    response = {
+        'success': True,
+        'count': len(page['violations']),
+        'violations': page['violations'],
+        'next_cursor': page['next_cursor']
+    }
+    if request.args.get('include_count') in ('1', 'true'):
+        response['total_matching'] = violation_store.count(filters=filters)
+    
+    return jsonify(response), 200
+
+
+@app.route('/api/violations/aggregate', methods=['GET'])
+def aggregate_violations():
+    """Counts by type/camera/day and speed statistics (same filters as /api/violations)"""
+    try:
+        filters = _violation_filters(request.args)
+        summary = violation_store.aggregate(filters)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    
+    return jsonify({'success': True, **summary}), 200
+
+
+@app.route('/api/cache', methods=['GET', 'DELETE'])
+def result_cache_api():
+    """
+    GET: cache statistics
+    DELETE: invalidate ?key=<cache key>, ?file_id=<upload> (all settings for that
+            video's content), or everything when no parameter is given
+    """
+    if result_cache is None:
+        return jsonify({'error': 'Result cache is disabled'}), 404
+    
+    if request.method == 'GET':
+        return jsonify({'success': True, **result_cache.stats()}), 200
+    
+    key = request.args.get('key')
+    file_id = request.args.get('file_id')
+    content_digest = None
+    
+    if file_id:
+        filepath = os.path.join(config.UPLOAD_FOLDER, secure_filename(file_id))
+        if not os.path.exists(filepath):
+            return jsonify({'error': f'File not found: {file_id}'}), 404
+        content_digest = result_cache.file_digest(filepath)
+    
+    removed = result_cache.invalidate(key=key, content_digest=content_digest)
+    return jsonify({'success': True, 'removed': removed}), 200
+
+
+@app.route('/api/resources', methods=['GET'])
+def resources_api():
+    """CPU budget: cores per pool and the thread settings actually in effect"""
+    report = resources.report()
+    report['effective']['ocr_workers'] = ocr_pool.worker_threads if ocr_pool else []
+    return jsonify({'success': True, **report}), 200
+
+
+@app.route('/api/results/annotated/<path:filename>', methods=['GET'])
+def get_annotated_output(filename):
+    """Download an annotated output video"""
+    filepath = os.path.join(config.ANNOTATION_FOLDER, secure_filename(filename))
+    
+    if not os.path.exists(filepath):
+        return jsonify({'error': f'Annotated output not found: {filename}'}), 404
+    
+    return send_file(os.path.abspath(filepath))
+
+
+@app.route('/api/evidence/<path:filename>', methods=['GET'])
+def get_evidence(filename):
+    """Download an evidence clip or still referenced by a violation record"""
+    filepath = os.path.join(config.EVIDENCE_FOLDER, secure_filename(filename))
+    
+    if not os.path.exists(filepath):
+        return jsonify({'error': f'Evidence not found (it may still be encoding): {filename}'}), 404
+    
+    return send_file(os.path.abspath(filepath))
+
+
+@app.route('/api/plates/search', methods=['GET'])
+def search_plates():
+    """
+    Fuzzy plate search tolerant to OCR misreads
+    Params: q (plate or fragment), max_distance, limit, partial=1 (match inside plates)
+    """
+    query = normalize_plate(request.args.get('q', ''))
+    partial = request.args.get('partial') in ('1', 'true')
+    
+    if len(query) < (NGRAM if partial else 1):
+        return jsonify({'error': f'q must have at least {NGRAM if partial else 1} letters/digits'}), 400
+    
+    started = time.time()
+    candidates = plate_index.search(
+        query,
+        max_distance=request.args.get('max_distance', config.PLATE_SEARCH_MAX_DISTANCE, type=float),
+        limit=request.args.get('limit', config.PLATE_SEARCH_LIMIT, type=int),
+        partial=partial
+    )
+    
+    for candidate in candidates:
+        candidate['last_seen'] = datetime.fromtimestamp(candidate['last_seen']).isoformat()
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'candidates': candidates,
+        'index_ready': plate_index.ready,
+        'search_ms': round(1000 * (time.time() - started), 2)
+    }), 200
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
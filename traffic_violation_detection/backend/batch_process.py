@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""
+Batch processing CLI for archived videos (no HTTP server involved)
+
+Usage:
+    python batch_process.py /data/archive/2024-05-01 --workers 4
+    python batch_process.py "/data/archive/**/*.mp4" --output results/backfill.jsonl
+
+Every input file is processed by a pool of worker processes, each owning its
+own RealtimeDetector. One JSON line per file is appended to the output file;
+files already recorded there (same path, size and mtime) are skipped, so an
+interrupted backfill can simply be re-run.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import Config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('batch_process')
+
+config = Config()
+
+VIDEO_EXTENSIONS = {ext for ext in config.ALLOWED_EXTENSIONS if ext not in {'jpg', 'jpeg', 'png'}}
+
+# Per-process detector, created once by the pool initializer
+_worker = {}
+
+
+def collect_inputs(patterns, recursive=False):
+    """Expand directories, globs and plain paths into a sorted list of video files"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            for root, _, names in walker:
+                files.update(os.path.join(root, name) for name in names)
+        else:
+            files.update(glob.glob(pattern, recursive=True))
+
+    return sorted(
+        os.path.abspath(path) for path in files
+        if os.path.isfile(path) and path.rsplit('.', 1)[-1].lower() in VIDEO_EXTENSIONS
+    )
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, int(stat.st_mtime))
+
+
+def load_done(output_path):
+    """Keys of files that already have a successful result in the output JSONL"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partial last line from an interrupted run
+            if record.get('status') == 'ok':
+                done.add((record['file'], record['size'], record['mtime']))
+    return done
+
+
+def _init_worker(settings, worker_counter):
+    """Pool initializer: apply this worker's CPU share, then load the model once"""
+    from utils.resources import limit_threads
+    from utils.realtime_detection import RealtimeDetector
+
+    with worker_counter.get_lock():
+        index = worker_counter.value
+        worker_counter.value += 1
+    cpu_sets = settings['cpu_sets']
+    limit_threads(settings['threads'], cpu_sets[index % len(cpu_sets)] if cpu_sets else None)
+
+    detector = RealtimeDetector(model_path=settings['model'], use_gpu=settings['gpu'])
+    detector.frame_skip = settings['frame_skip']
+    detector.conf_threshold = settings['confidence']
+    _worker['detector'] = detector
+    _worker['settings'] = settings
+
+
+def _process_file(path):
+    """Run one video through a fresh StreamingProcessor inside a worker"""
+    from utils.realtime_detection import StreamingProcessor
+    from utils.result_sink import ResultSink
+    from utils.events import EventAggregator, IoUTracker
+    from utils.frame_ring import RingCapture
+
+    settings = _worker['settings']
+    _, size, mtime = file_key(path)
+    record = {'file': path, 'size': size, 'mtime': mtime}
+
+    log_path = None
+    if settings['logs_dir']:
+        log_path = os.path.join(settings['logs_dir'], os.path.basename(path) + '.ndjson')
+
+    processor = StreamingProcessor(
+        _worker['detector'], speed_limit=settings['speed_limit'],
+        sink=ResultSink(log_path, window_size=config.RESULT_WINDOW_SIZE),
+        events=EventAggregator(
+            IoUTracker(iou_threshold=config.EVENT_TRACK_IOU, max_age=config.EVENT_TRACK_MAX_AGE),
+            gap_frames=config.EVENT_GAP_FRAMES, keep_detail=config.EVENT_KEEP_DETAIL
+        ) if config.EVENT_AGGREGATION else None
+    )
+
+    started = time.time()
+    try:
+        # Decoder process hands frames over through shared memory; it only
+        # retrieves the frames the processor will analyze
+        source = RingCapture(path, slots=config.FRAME_RING_SLOTS, every=settings['frame_skip']) \
+            if settings['decode_process'] else path
+        result = processor.process_stream(source)
+    except Exception as e:
+        result = {'error': str(e)}
+    elapsed = time.time() - started
+
+    if 'error' in result:
+        record.update({'status': 'error', 'error': result['error'], 'elapsed': round(elapsed, 3)})
+        return record
+
+    record.update({
+        'status': 'ok',
+        'total_frames': result['total_frames'],
+        'frames_analyzed': result['frames_analyzed'],
+        'fps': result['fps'],
+        'duration': round(result['total_frames'] / (result['fps'] or 30), 3),
+        'violations_detected': result['violations'],
+        'violations': result['violation_list'],
+        'results_log': result['results_log'],
+        'elapsed': round(elapsed, 3),
+        'processed_at': time.time()
+    })
+    return record
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Process a directory or glob of videos in parallel')
+    parser.add_argument('inputs', nargs='+', help='video files, directories or glob patterns')
+    parser.add_argument('-o', '--output', default=os.path.join(config.RESULTS_FOLDER, 'batch_results.jsonl'),
+                        help='JSONL file results are appended to (default: %(default)s)')
+    parser.add_argument('-w', '--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='worker processes, each with its own detector (default: %(default)s)')
+    parser.add_argument('-t', '--threads', type=int, default=None,
+                        help='torch/OpenCV threads per worker (default: available cores / workers)')
+    parser.add_argument('--pin', action='store_true', default=config.CPU_PIN_WORKERS,
+                        help='pin each worker to its own cores (Linux)')
+    parser.add_argument('--decode-process', action='store_true',
+                        help='decode each video in its own process, handing frames over through shared memory')
+    parser.add_argument('-r', '--recursive', action='store_true', help='descend into sub-directories')
+    parser.add_argument('--logs-dir', default=None,
+                        help='also write every violation of each file to <logs-dir>/<file>.ndjson')
+    parser.add_argument('--model', default='yolov8n.pt', help='YOLO weights (default: %(default)s)')
+    parser.add_argument('--gpu', action='store_true', help='run the detector on CUDA')
+    parser.add_argument('--frame-skip', type=int, default=2, help='analyze every Nth frame (default: %(default)s)')
+    parser.add_argument('--confidence', type=float, default=config.CONFIDENCE_THRESHOLD,
+                        help='detection confidence threshold (default: %(default)s)')
+    parser.add_argument('--speed-limit', type=float, default=config.SPEED_LIMIT,
+                        help='speed limit in km/h (default: %(default)s)')
+    parser.add_argument('--force', action='store_true', help='reprocess files already in the output')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    files = collect_inputs(args.inputs, recursive=args.recursive)
+    if not files:
+        logger.error("❌ No video files matched the given inputs")
+        return 1
+
+    done = set() if args.force else load_done(args.output)
+    pending = [path for path in files if file_key(path) not in done]
+    logger.info(f"📹 {len(files)} videos found, {len(files) - len(pending)} already processed, "
+                f"{len(pending)} to go with {args.workers} workers")
+    if not pending:
+        return 0
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    from utils.resources import ResourceManager
+
+    # No server here: the workers split every core between them
+    resources = ResourceManager({'inference': 1.0}, reserved_cores=0, pin=args.pin)
+    settings = {
+        'threads': args.threads or resources.threads('inference', args.workers),
+        'cpu_sets': [resources.worker_cores('inference', i, args.workers) for i in range(args.workers)]
+        if args.pin else None,
+        'model': args.model,
+        'gpu': args.gpu,
+        'frame_skip': max(1, args.frame_skip),
+        'confidence': args.confidence,
+        'speed_limit': args.speed_limit,
+        'logs_dir': args.logs_dir,
+        'decode_process': args.decode_process
+    }
+
+    started = time.time()
+    completed = failed = frames = violations = 0
+    video_seconds = 0.0
+
+    with open(args.output, 'a') as out, ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(settings, mp.Value('i', 0))
+    ) as pool:
+        futures = {pool.submit(_process_file, path): path for path in pending}
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:  # worker crashed
+                record = {'file': path, 'status': 'error', 'error': str(e)}
+
+            out.write(json.dumps(record, default=str) + '\n')
+            out.flush()
+
+            if record['status'] == 'ok':
+                completed += 1
+                frames += record['total_frames']
+                violations += record['violations_detected']
+                video_seconds += record['duration']
+            else:
+                failed += 1
+
+            wall = time.time() - started
+            logger.info(
+                f"[{completed + failed}/{len(pending)}] {os.path.basename(path)}: "
+                f"{record.get('violations_detected', record.get('error'))} | "
+                f"{frames / wall:.1f} frames/s, {video_seconds / wall:.2f}x realtime"
+            )
+
+    wall = time.time() - started
+    logger.info(f"✓ Done in {wall:.1f}s: {completed} ok, {failed} failed, {violations} violations, "
+                f"{frames} frames ({frames / wall:.1f} frames/s, {video_seconds / wall:.2f}x realtime)")
+    logger.info(f"   Results: {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
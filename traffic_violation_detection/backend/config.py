@@ -9,9 +9,14 @@ class Config:
     
     # Upload Settings
     UPLOAD_FOLDER = 'uploads'
-    ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'jpg', 'jpeg', 'png'}
+    ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'ts', 'm2ts', 'mjpeg', 'mjpg', 'jpg', 'jpeg', 'png'}
     MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
     
+    # Progressive Upload (process while the upload is in flight)
+    UPLOAD_CHUNK_SIZE = 256 * 1024  # 256KB
+    PROGRESSIVE_POLL_INTERVAL = 0.05  # seconds between checks for new bytes
+    PROGRESSIVE_IDLE_TIMEOUT = 30  # seconds without new bytes before giving up
+    
     # YOLO Settings
     CONFIDENCE_THRESHOLD = 0.5
     NMS_THRESHOLD = 0.4
@@ -19,13 +24,45 @@ class Config:
     # Model Paths
     YOLO_WEIGHTS = 'models/yolov8n.pt'  # YOLOv8 Nano
     
+    # Frame Skipping (skipped frames are grabbed, never decoded to BGR/resized)
+    KEYFRAME_SEEK_MIN_SKIP = 30  # skips at least this long seek instead of grabbing
+    
     # Speed Detection (km/h)
     SPEED_LIMIT = 60
     VIOLATION_SPEED_THRESHOLD = 65
     
+    # Live Streams
+    MAX_STREAMS = 64  # sources per node
+    STREAM_RECONNECT_BACKOFF_INITIAL = 0.5  # seconds
+    STREAM_RECONNECT_BACKOFF_MAX = 30  # seconds
+    
+    # Shared Inference Scheduler (batches YOLO calls across cameras)
+    INFERENCE_BATCH_SIZE = 8
+    INFERENCE_BATCH_TIMEOUT = 0.01  # seconds to wait for a fuller batch
+    STREAM_MAX_STALENESS = 1.0  # seconds before a queued frame is dropped
+    STREAM_PIPELINE_DEPTH = 2  # frames in flight per source
+    STREAM_LATENCY_SLO = 2.0  # seconds from capture to result before load is shed; None disables
+    STREAM_SHED_DROP_STRIDE = 2  # while shedding, analyze every Nth fresh frame
+    STREAM_SHED_REDUCED_SIZE = (480, 360)  # detection size at the reduced-resolution level
+    STREAM_SHED_RECOVER_FRAMES = 30  # frames under the SLO before stepping back one level
+    STREAM_SHED_OCR_MAX_DEFER = 150  # source frames a deferred plate read may wait before it runs anyway
+    STREAM_DECODE_PROCESS = False  # default for new sources: decode in a separate process
+    FRAME_RING_SLOTS = 8  # shared-memory frames per decoder (held frames, e.g. queued for annotation, use one)
+    SCHEDULER_CLASS_SHARES = {'live': 0.6, 'interactive': 0.3, 'batch': 0.1}  # minimum inference shares
+    SCHEDULER_SHARE_WINDOW = 64  # batch slots the shares are measured over
+    UPLOAD_PRIORITY = 'batch'  # default class of /api/process/realtime jobs
+    PROGRESSIVE_PRIORITY = 'interactive'  # uploads processed while they arrive
+    
     # Database
     SQLALCHEMY_DATABASE_URI = 'sqlite:///violations.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    VIOLATION_STORE_BATCH_SIZE = 500  # rows per write transaction
+    VIOLATION_STORE_FLUSH_INTERVAL = 0.5  # seconds
+    VIOLATION_STORE_MAX_QUEUE = 100000  # pending rows before new ones are dropped
+    
+    # Fuzzy Plate Search (OCR confusions like O/0, B/8, I/1 cost half an edit)
+    PLATE_SEARCH_MAX_DISTANCE = 2.0
+    PLATE_SEARCH_LIMIT = 20
     
     # API Settings
     CORS_ORIGINS = ['http://localhost:3000', 'http://localhost:5000']
@@ -33,10 +70,85 @@ class Config:
     # File Storage
     RESULTS_FOLDER = 'results'
     
+    # Dedicated plate detector (YOLO weights trained on plates, e.g. 'models/plate_yolov8n.pt');
+    # None uses the lower part of the vehicle box as the plate region
+    PLATE_MODEL_WEIGHTS = None
+    PLATE_PREFILTER_ENABLED = True  # skip OCR on heuristic regions with no plate-like blob
+    
+    # OCR
+    OCR_RECOGNITION_ONLY = True  # tight plate crops skip EasyOCR's text detector
+    OCR_ALLOWLIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'  # plate charset; None = any
+    OCR_MIN_CONFIDENCE = 0.5  # recognition-only results below this fall back to readtext()
+    OCR_WORKERS = 0  # separate OCR processes; 0 = OCR in the detection thread
+    OCR_POOL_SLOTS = 64  # shared-memory crop slots (max OCR requests in flight)
+    OCR_POOL_SLOT_BYTES = 256 * 1024  # larger crops are pickled to the worker instead
+    OCR_POOL_SLOT_TIMEOUT = 5.0  # seconds to wait for a free slot before a plate is skipped
+    OCR_WORKER_THREADS = None  # torch threads per OCR process; None = from the CPU budget
+    
+    # CPU Budget (how the node's cores are split between the process pools)
+    CPU_RESERVED_CORES = 1  # left to the OS and the Flask request threads
+    CPU_BUDGET = {'inference': 0.5, 'ocr': 0.3, 'decode': 0.2}  # shares of the remaining cores
+    CPU_PIN_WORKERS = False  # pin each pool to its own cores (Linux)
+    
+    # Distributed Mode (coordinator.py hands out work to worker.py nodes over HTTP)
+    COORDINATOR_PORT = 5100
+    COORDINATOR_URL = os.environ.get('COORDINATOR_URL', 'http://127.0.0.1:5100')
+    WORKER_HEARTBEAT_INTERVAL = 5  # seconds
+    WORKER_HEARTBEAT_TIMEOUT = 15  # seconds of silence before a worker's tasks are requeued
+    WORKER_POLL_INTERVAL = 1.0  # seconds between lease attempts when the queue is empty
+    DISTRIBUTED_MAX_ATTEMPTS = 3  # leases per task before it is reported as failed
+    DISTRIBUTED_RANGE_FRAMES = 1800  # frames per task when files are split into ranges
+    DISTRIBUTED_FRAME_SKIP = 2  # analyze every Nth frame unless a job sets frame_skip (ranges align to it)
+    DISTRIBUTED_RESULTS_FOLDER = os.path.join('results', 'distributed')
+    
+    # Tiled Inference (high-resolution cameras; opt-in per job/stream)
+    TILE_SIZE = 640  # model input resolution
+    TILE_OVERLAP = 0.2
+    TILE_NMS_THRESHOLD = 0.5  # IoU of a seam-cut box with another view's box clipped to its tile
+    TILE_IOU_THRESHOLD = 0.5  # duplicates of one vehicle seen by two views
+    TILE_INCLUDE_FULL_FRAME = True  # extra downscaled pass for vehicles bigger than a tile
+    TILE_FULL_REFRESH_INTERVAL = 10  # analyzed frames between full sweeps; None = always all tiles
+    TILE_ACTIVITY_TTL = 15  # analyzed frames a tile stays active after a detection
+    
+    # Result Cache (content hash of the video + effective settings)
+    RESULT_CACHE_ENABLED = True
+    RESULT_CACHE_FOLDER = os.path.join(RESULTS_FOLDER, 'cache')
+    RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB, LRU-evicted
+    
+    # Per-job results: bounded window in memory, full NDJSON log on disk
+    RESULT_LOG_FOLDER = os.path.join(RESULTS_FOLDER, 'jobs')
+    RESULT_WINDOW_SIZE = 200
+    
+    # Violation Events (one record per vehicle and incident instead of one per frame)
+    EVENT_AGGREGATION = True
+    EVENT_GAP_FRAMES = 30  # source frames without a violation before an incident closes
+    EVENT_TRACK_IOU = 0.3  # box overlap that links a vehicle across processed frames
+    EVENT_TRACK_MAX_AGE = 30  # source frames a vehicle may go unseen before its track ends
+    EVENT_KEEP_DETAIL = False  # attach the per-frame records to each event ('detail')
+    
+    # Checkpoints (resume long file jobs after a restart)
+    CHECKPOINT_ENABLED = True
+    CHECKPOINT_FOLDER = os.path.join(RESULTS_FOLDER, 'checkpoints')
+    CHECKPOINT_INTERVAL_FRAMES = 900  # ~30s of 30fps video between snapshots
+    
+    # Annotated Output (drawn/encoded off the detection thread)
+    ANNOTATION_FOLDER = os.path.join(RESULTS_FOLDER, 'annotated')
+    ANNOTATION_FPS = 15
+    ANNOTATION_SIZE = None  # (width, height); None keeps the source resolution
+    ANNOTATION_QUEUE_SIZE = 16  # frames; beyond this, annotated frames are dropped
+    
+    # Violation Evidence (pre/post-roll clips + vehicle stills)
+    EVIDENCE_ENABLED = True
+    EVIDENCE_FOLDER = os.path.join(RESULTS_FOLDER, 'evidence')
+    EVIDENCE_PRE_ROLL = 5  # seconds
+    EVIDENCE_POST_ROLL = 5  # seconds
+    EVIDENCE_JPEG_QUALITY = 80
+    
     def __init__(self):
         # Create necessary directories
         os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(self.RESULTS_FOLDER, exist_ok=True)
+        os.makedirs(self.EVIDENCE_FOLDER, exist_ok=True)
         os.makedirs('models', exist_ok=True)
 
 config = Config()
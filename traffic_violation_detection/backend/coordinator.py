@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Coordinator for distributed processing across several machines
+
+Usage:
+    python coordinator.py --port 5100
+    python coordinator.py --local-workers 2      # also start two worker.py processes here
+
+Worker nodes (python worker.py --coordinator http://<host>:5100) register,
+heartbeat and pull tasks over HTTP. Jobs are submitted with
+POST /api/jobs {"files": [...], "shard": "file" | "range"}; video paths must
+be readable by every worker (shared storage). Tasks of a worker that stops
+heartbeating are requeued; the merged result of a job is available from
+GET /api/jobs/<job_id> and written to DISTRIBUTED_RESULTS_FOLDER.
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import atexit
+import logging
+
+from flask import Flask, request, jsonify
+
+from config import Config
+from utils.coordination import DistributedCoordinator
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('coordinator')
+
+config = Config()
+
+app = Flask(__name__)
+coordinator = None  # created in main()
+
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    return jsonify({'status': 'healthy', 'role': 'coordinator', **coordinator.stats()})
+
+
+@app.route('/api/workers/register', methods=['POST'])
+def register_worker():
+    data = request.get_json(silent=True) or {}
+    return jsonify(coordinator.register_worker(data.get('name'), int(data.get('slots', 1)))), 201
+
+
+@app.route('/api/workers', methods=['GET'])
+def list_workers():
+    return jsonify({'workers': coordinator.worker_list()})
+
+
+@app.route('/api/workers/<worker_id>/heartbeat', methods=['POST'])
+def worker_heartbeat(worker_id):
+    data = request.get_json(silent=True) or {}
+    return jsonify(coordinator.heartbeat(worker_id, data.get('running', [])))
+
+
+@app.route('/api/workers/<worker_id>/lease', methods=['POST'])
+def lease_task(worker_id):
+    """Next task for the worker; 204 when there is nothing to do"""
+    try:
+        task = coordinator.lease(worker_id)
+    except KeyError:
+        return jsonify({'error': 'Unknown worker, register again'}), 404
+    if task is None:
+        return '', 204
+    return jsonify(task)
+
+
+@app.route('/api/tasks/<task_id>/result', methods=['POST'])
+def task_result(task_id):
+    data = request.get_json(silent=True) or {}
+    if 'result' not in data:
+        return jsonify({'error': 'result required'}), 400
+    if not coordinator.complete(data.get('worker_id'), task_id, data.get('lease_id'), data['result']):
+        return jsonify({'error': 'Lease expired, result discarded'}), 409
+    return jsonify({'success': True})
+
+
+@app.route('/api/tasks/<task_id>/failure', methods=['POST'])
+def task_failure(task_id):
+    data = request.get_json(silent=True) or {}
+    if not coordinator.fail(data.get('worker_id'), task_id, data.get('lease_id'), data.get('error', 'unknown error')):
+        return jsonify({'error': 'Lease expired'}), 409
+    return jsonify({'success': True})
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Body: {"files": ["/shared/videos/a.mp4", ...], "shard": "file" | "range",
+           "range_frames": 1800, "frame_skip": 2, "speed_limit": 60}
+    """
+    data = request.get_json(silent=True) or {}
+    files = data.get('files')
+    if not files or not isinstance(files, list):
+        return jsonify({'error': 'files required'}), 400
+
+    settings = {key: data[key] for key in ('frame_skip', 'speed_limit', 'confidence') if key in data}
+    try:
+        job = coordinator.submit_job(
+            [os.path.abspath(path) for path in files],
+            shard=data.get('shard', 'file'),
+            range_frames=int(data.get('range_frames', config.DISTRIBUTED_RANGE_FRAMES)),
+            settings=settings
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(job), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        return jsonify(coordinator.job_status(job_id))
+    except KeyError:
+        return jsonify({'error': 'Job not found'}), 404
+
+
+def start_local_workers(count, port):
+    """Spawn worker.py processes on this machine (single-box or testing setups)"""
+    workers = []
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+    for i in range(count):
+        workers.append(subprocess.Popen(
+            [sys.executable, script, '--coordinator', f'http://127.0.0.1:{port}', '--name', f'local-{i}'],
+            cwd=os.path.dirname(script)
+        ))
+
+    def stop_workers():
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in workers:
+            try:
+                worker.wait(10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+
+    atexit.register(stop_workers)
+    logger.info(f"🖥 Started {count} local workers")
+    return workers
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Hand out video processing work to worker nodes')
+    parser.add_argument('--host', default='0.0.0.0', help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=config.COORDINATOR_PORT, help='port (default: %(default)s)')
+    parser.add_argument('--local-workers', type=int, default=0,
+                        help='worker processes to start on this machine (default: %(default)s)')
+    parser.add_argument('--heartbeat-timeout', type=float, default=config.WORKER_HEARTBEAT_TIMEOUT,
+                        help='seconds without a heartbeat before a worker is declared dead (default: %(default)s)')
+    parser.add_argument('--max-attempts', type=int, default=config.DISTRIBUTED_MAX_ATTEMPTS,
+                        help='leases per task before it is reported failed (default: %(default)s)')
+    parser.add_argument('--results', default=config.DISTRIBUTED_RESULTS_FOLDER,
+                        help='folder merged job results are written to (default: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global coordinator
+    args = parse_args(argv)
+
+    coordinator = DistributedCoordinator(
+        heartbeat_timeout=args.heartbeat_timeout,
+        max_attempts=args.max_attempts,
+        results_folder=args.results,
+        merge_gap_frames=config.EVENT_GAP_FRAMES,
+        default_frame_skip=config.DISTRIBUTED_FRAME_SKIP
+    )
+    coordinator.start()
+    atexit.register(coordinator.stop)
+
+    if args.local_workers:
+        start_local_workers(args.local_workers, args.port)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # run atexit: stop the local workers too
+
+    logger.info(f"🚀 Coordinator on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import time
+
+import pytest
+
+from utils.coordination import DistributedCoordinator, merge_file_results, shard_ranges
+
+
+# shard_ranges
+
+def test_shard_ranges_cover_the_video_without_gaps():
+    ranges = shard_ranges(1000, 300)
+    assert ranges == [(0, 300), (300, 600), (600, 900), (900, 1000)]
+
+
+def test_shard_ranges_align_to_frame_skip():
+    ranges = shard_ranges(1000, 100, frame_skip=3)
+    assert all(start % 3 == 0 for start, _ in ranges)
+    assert ranges[-1][1] == 1000
+
+    # The shards analyze exactly the frames of a single run
+    analyzed = [frame for start, end in ranges for frame in range(start, end, 3)]
+    assert analyzed == list(range(0, 1000, 3))
+
+
+def test_shard_ranges_never_smaller_than_frame_skip():
+    assert shard_ranges(10, 2, frame_skip=4) == [(0, 4), (4, 8), (8, 10)]
+
+
+def test_shard_ranges_unknown_length():
+    assert shard_ranges(0, 300) == [(0, None)]
+
+
+# merge_file_results
+
+def _event(frame, end_frame, bbox=(100, 100, 200, 200), violation_type='Speeding', speed=70.0, **extra):
+    return {'frame': frame, 'start_frame': frame, 'end_frame': end_frame, 'frames': end_frame - frame + 1,
+            'bbox': list(bbox), 'violation_type': violation_type, 'speed': speed, 'max_speed': speed, **extra}
+
+
+def _shard(start_frame, violations, total_frames=200, frames_analyzed=100):
+    return {'file': 'a.mp4', 'start_frame': start_frame, 'total_frames': total_frames,
+            'frames_analyzed': frames_analyzed, 'violations': violations}
+
+
+def test_merge_stitches_event_cut_by_shard_boundary():
+    first = _event(80, 99, speed=70.0, plate='AB123', plate_confidence=0.6)
+    second = _event(100, 120, bbox=(105, 100, 205, 200), speed=85.0, plate='AB1234', plate_confidence=0.9)
+
+    merged = merge_file_results([_shard(100, [second]), _shard(0, [first])])
+
+    assert merged['shards'] == 2
+    assert merged['frames_analyzed'] == 200
+    assert merged['violations_detected'] == 1
+    event = merged['violations'][0]
+    assert (event['start_frame'], event['end_frame']) == (80, 120)
+    assert event['frames'] == first['frames'] + second['frames']
+    assert event['speed'] == event['max_speed'] == 85.0
+    assert event['plate'] == 'AB1234'
+    assert '_joined' not in event
+
+
+@pytest.mark.parametrize('second', [
+    _event(100, 120, bbox=(400, 400, 500, 500)),  # different vehicle
+    _event(100, 120, violation_type='Red Light'),  # different violation
+    _event(140, 160),  # starts too long after the boundary
+])
+def test_merge_keeps_unrelated_events_apart(second):
+    merged = merge_file_results([_shard(0, [_event(80, 99)]), _shard(100, [second])], gap_frames=30)
+    assert merged['violations_detected'] == 2
+
+
+def test_merge_does_not_stitch_event_that_ended_before_the_gap():
+    merged = merge_file_results([_shard(0, [_event(10, 50)]), _shard(100, [_event(100, 120)])], gap_frames=30)
+    assert merged['violations_detected'] == 2
+
+
+def test_merge_joins_each_earlier_event_only_once():
+    merged = merge_file_results([
+        _shard(0, [_event(80, 99)]),
+        _shard(100, [_event(100, 110), _event(105, 120)])
+    ])
+    assert merged['violations_detected'] == 2
+    assert [event['frame'] for event in merged['violations']] == [80, 105]
+
+
+def test_merge_leaves_per_frame_records_alone():
+    record = {'frame': 101, 'bbox': [100, 100, 200, 200], 'violation_type': 'Speeding', 'speed': 70.0}
+    merged = merge_file_results([_shard(0, [_event(80, 99)]), _shard(100, [record])])
+    assert merged['violations_detected'] == 2
+
+
+# Leases
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'a.mp4'
+    path.write_bytes(b'\0')
+    return str(path)
+
+
+def test_expired_lease_is_requeued_and_late_result_rejected(video):
+    coordinator = DistributedCoordinator(heartbeat_timeout=0.05)
+    job = coordinator.submit_job([video])
+    lost = coordinator.register_worker('lost')['worker_id']
+    task = coordinator.lease(lost)
+    assert task['attempts'] == 1
+
+    time.sleep(0.1)
+    healthy = coordinator.register_worker('healthy')['worker_id']
+    assert coordinator.reap() == [lost]
+    assert coordinator.stats()['requeued'] == 1
+    assert coordinator.job_status(job['job_id'])['tasks_queued'] == 1
+
+    retry = coordinator.lease(healthy)
+    assert retry['task_id'] == task['task_id']
+    assert retry['attempts'] == 2
+    assert retry['lease_id'] != task['lease_id']
+
+    # The dead worker must re-register and its result is discarded
+    assert coordinator.heartbeat(lost, [task['task_id']]) == {'known': False, 'cancel': [task['task_id']]}
+    with pytest.raises(KeyError):
+        coordinator.lease(lost)
+    assert not coordinator.complete(lost, task['task_id'], task['lease_id'], {})
+
+    result = {'total_frames': 1, 'frames_analyzed': 1, 'violations': []}
+    assert coordinator.complete(healthy, retry['task_id'], retry['lease_id'], result)
+    assert coordinator.job_status(job['job_id'])['status'] == 'completed'
+
+
+def test_task_fails_after_max_attempts(video):
+    coordinator = DistributedCoordinator(max_attempts=2)
+    job = coordinator.submit_job([video])
+    worker = coordinator.register_worker()['worker_id']
+
+    for _ in range(2):
+        task = coordinator.lease(worker)
+        assert coordinator.fail(worker, task['task_id'], task['lease_id'], 'decode error')
+
+    status = coordinator.job_status(job['job_id'])
+    assert status['status'] == 'failed'
+    assert status['tasks_failed'] == 1
+    assert status['result']['failed_tasks'][0]['error'] == 'decode error'
+    assert coordinator.lease(worker) is None
+
+
+def test_lease_respects_worker_slots(video):
+    coordinator = DistributedCoordinator()
+    coordinator.submit_job([video, video])
+    worker = coordinator.register_worker(slots=1)['worker_id']
+    assert coordinator.lease(worker) is not None
+    assert coordinator.lease(worker) is None
+
+
+def test_tasks_carry_the_frame_skip_shards_align_to(video):
+    coordinator = DistributedCoordinator(default_frame_skip=3)
+    coordinator.submit_job([video])
+    coordinator.submit_job([video], settings={'frame_skip': 5})
+    worker = coordinator.register_worker(slots=2)['worker_id']
+    assert [coordinator.lease(worker)['settings']['frame_skip'] for _ in range(2)] == [3, 5]
@@ -0,0 +1,135 @@
+from utils.events import EventAggregator, IoUTracker, event_key
+
+
+def _record(frame, track_id, violation_type='Speeding', speed=70.0, plate='', plate_confidence=0.0,
+            bbox=(100, 100, 200, 200)):
+    return {'frame': frame, 'track_id': track_id, 'violation_type': violation_type, 'speed': speed,
+            'plate': plate, 'plate_confidence': plate_confidence, 'bbox': list(bbox), 'is_violation': True}
+
+
+# IoUTracker
+
+def test_tracker_keeps_ids_of_overlapping_boxes():
+    tracker = IoUTracker(iou_threshold=0.3)
+    first = tracker.update(0, [[0, 0, 100, 100], [300, 300, 400, 400]])
+    second = tracker.update(2, [[305, 300, 405, 400], [5, 0, 105, 100]])
+    assert second == [first[1], first[0]]
+
+
+def test_tracker_starts_new_track_for_unmatched_box():
+    tracker = IoUTracker()
+    (first,) = tracker.update(0, [[0, 0, 100, 100]])
+    (second,) = tracker.update(1, [[500, 500, 600, 600]])
+    assert second != first
+
+
+def test_tracker_forgets_tracks_after_max_age():
+    tracker = IoUTracker(max_age=10)
+    (first,) = tracker.update(0, [[0, 0, 100, 100]])
+    assert tracker.update(10, [[0, 0, 100, 100]]) == [first]
+    assert tracker.update(21, [[0, 0, 100, 100]]) != [first]
+
+
+def test_tracker_state_round_trip():
+    tracker = IoUTracker()
+    ids = tracker.update(0, [[0, 0, 100, 100], [300, 300, 400, 400]])
+    restored = IoUTracker()
+    restored.restore(tracker.get_state())
+    assert restored.update(1, [[0, 0, 100, 100]]) == [ids[0]]
+    assert restored.update(2, [[800, 800, 900, 900]]) == [tracker.next_id]
+
+
+# EventAggregator
+
+def test_incident_folds_frames_and_keeps_best_plate_and_max_speed():
+    events = EventAggregator(gap_frames=30)
+    assert events.opens(_record(10, 1))
+    events.add(_record(10, 1, speed=65.0, plate='AB12', plate_confidence=0.5))
+    assert not events.opens(_record(12, 1))
+    events.add(_record(12, 1, speed=80.0, plate='AB123', plate_confidence=0.9, bbox=(110, 100, 210, 200)))
+    events.add(_record(14, 1, speed=70.0, plate='A8123', plate_confidence=0.4))
+
+    (event,) = events.flush()
+    assert (event['start_frame'], event['end_frame'], event['frames']) == (10, 14, 3)
+    assert event['speed'] == event['max_speed'] == 80.0
+    assert (event['plate'], event['plate_confidence']) == ('AB123', 0.9)
+    assert event['bbox'] == [110, 100, 210, 200]
+
+
+def test_advance_closes_only_incidents_past_the_gap():
+    events = EventAggregator(gap_frames=30)
+    events.add(_record(0, 1))
+    events.add(_record(20, 2))
+
+    assert events.advance(30) == []
+    (closed,) = events.advance(31)
+    assert closed['track_id'] == 1
+    assert events.stats()['open_incidents'] == 1
+
+    (closed,) = events.advance(51)
+    assert closed['track_id'] == 2
+    assert events.stats() == {'records_in': 2, 'events_out': 2, 'open_incidents': 0, 'active_tracks': 0}
+
+
+def test_new_frames_keep_incident_open():
+    events = EventAggregator(gap_frames=5)
+    for frame in range(0, 40, 4):
+        events.add(_record(frame, 1))
+        assert events.advance(frame) == []
+    (event,) = events.flush()
+    assert event['frames'] == 10
+
+
+def test_closed_incidents_are_ordered_by_start_frame_then_track():
+    events = EventAggregator(gap_frames=30)
+    events.add(_record(5, 3))
+    events.add(_record(0, 2))
+    events.add(_record(5, 1))
+    events.add(_record(5, 1, violation_type='Red Light'))
+
+    closed = events.advance(100)
+    assert [(e['start_frame'], e['track_id']) for e in closed] == [(0, 2), (5, 1), (5, 1), (5, 3)]
+    assert events.flush() == []
+
+
+def test_violation_types_of_one_track_are_separate_incidents():
+    events = EventAggregator()
+    events.add(_record(0, 1, violation_type='Speeding'))
+    assert events.opens(_record(0, 1, violation_type='Red Light'))
+    events.add(_record(0, 1, violation_type='Red Light'))
+    assert len(events.flush()) == 2
+
+
+def test_detail_is_capped():
+    events = EventAggregator(keep_detail=True, max_detail=3)
+    for frame in range(5):
+        events.add(_record(frame, 1))
+    (event,) = events.flush()
+    assert [d['frame'] for d in event['detail']] == [0, 1, 2]
+    assert event['frames'] == 5
+
+
+def test_state_round_trip_keeps_open_incidents():
+    events = EventAggregator(gap_frames=30)
+    events.add(_record(0, 1))
+    restored = EventAggregator(gap_frames=30)
+    restored.restore(events.get_state())
+    restored.add(_record(10, 1))
+    (event,) = restored.flush()
+    assert (event['start_frame'], event['end_frame'], event['frames']) == (0, 10, 2)
+
+
+# event_key
+
+def test_event_key_identifies_replayed_events():
+    events = EventAggregator()
+    events.add(_record(7, 4))
+    (event,) = events.flush()
+    assert event_key(event) == event_key(dict(event, end_frame=99, plate='XYZ'))
+    assert event_key(event) != event_key(dict(event, start_frame=8))
+
+
+def test_event_key_uses_box_without_track():
+    record = {'frame': 3, 'violation_type': 'Speeding', 'bbox': [1, 2, 3, 4]}
+    assert event_key(record) == event_key(dict(record))
+    assert event_key(record) != event_key(dict(record, bbox=[5, 6, 7, 8]))
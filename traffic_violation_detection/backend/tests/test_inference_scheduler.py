@@ -0,0 +1,129 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils.inference_scheduler import InferenceScheduler
+
+
+class GatedDetector:
+    """Records the label (pixel value) of every frame in each batch; the first batch waits for `gate`"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.batches = []
+
+    def detect_vehicles_batch(self, frames):
+        if not self.started.is_set():
+            self.started.set()
+            self.gate.wait(5.0)
+        self.batches.append([int(frame[0, 0]) for frame in frames])
+        return [[] for _ in frames]
+
+
+def _frame(label):
+    return np.full((1, 1), label, dtype=np.uint8)
+
+
+def _run(scheduler, detector, submissions):
+    """Queue `submissions` [(source_id, label, count)] behind a blocked batch and collect the slot order"""
+    scheduler.start()
+    try:
+        warmup = scheduler.submit(submissions[0][0], _frame(0))
+        detector.started.wait(5.0)
+        futures = [scheduler.submit(source_id, _frame(label))
+                   for source_id, label, count in submissions for _ in range(count)]
+        detector.gate.set()
+        warmup.result(5.0)
+        for future in futures:
+            future.result(5.0)
+    finally:
+        scheduler.stop()
+    return [label for batch in detector.batches for label in batch if label]
+
+
+@pytest.fixture
+def detector():
+    return GatedDetector()
+
+
+def test_lower_classes_get_their_minimum_share(detector):
+    scheduler = InferenceScheduler(detector, max_batch_size=10, batch_timeout=0, queue_depth=1000,
+                                   share_window=20, class_shares={'live': 0.6, 'interactive': 0.3, 'batch': 0.1})
+    scheduler.register_source('cam', priority='live')
+    scheduler.register_source('upload', priority='interactive')
+    scheduler.register_source('archive', priority='batch')
+
+    slots = _run(scheduler, detector, [('cam', 1, 100), ('upload', 2, 100), ('archive', 3, 100)])
+
+    # While every class has frames waiting, each gets about its share (shares
+    # are checked against a sliding window, so allow a little slack)
+    contended = slots[:100]
+    assert contended.count(3) >= 9
+    assert contended.count(2) >= 27
+    assert contended.count(1) >= 55
+    assert len(slots) == 300
+    assert scheduler.class_stats()['batch']['yielded'] > 0
+
+
+def test_higher_class_takes_idle_share(detector):
+    scheduler = InferenceScheduler(detector, max_batch_size=10, batch_timeout=0, queue_depth=1000)
+    scheduler.register_source('upload', priority='interactive')
+    scheduler.register_source('archive', priority='batch')
+
+    slots = _run(scheduler, detector, [('upload', 2, 50), ('archive', 3, 50)])
+    # No live frames waiting: interactive takes the live share, batch keeps its minimum
+    assert slots[:50].count(3) >= 5
+    assert slots[:50].count(2) >= 40
+
+
+def test_weighted_round_robin_within_a_class(detector):
+    scheduler = InferenceScheduler(detector, max_batch_size=8, batch_timeout=0, queue_depth=1000)
+    scheduler.register_source('busy', weight=3)
+    scheduler.register_source('quiet', weight=1)
+
+    slots = _run(scheduler, detector, [('busy', 1, 60), ('quiet', 2, 60)])
+    assert slots[:40].count(1) == 30
+    assert slots[:40].count(2) == 10
+
+
+def test_stale_live_frames_are_dropped(detector):
+    detector.gate.set()
+    scheduler = InferenceScheduler(detector, default_max_staleness=0.5)
+    scheduler.register_source('cam')
+    scheduler.register_source('archive', priority='batch')
+    scheduler.start()
+    try:
+        assert scheduler.submit('cam', _frame(1), captured_at=time.time() - 10).result(5.0) is None
+        assert scheduler.submit('archive', _frame(2), captured_at=time.time() - 10).result(5.0) == []
+    finally:
+        scheduler.stop()
+    assert scheduler.source_stats('cam')['dropped_stale'] == 1
+    assert scheduler.source_stats('archive')['inferred'] == 1
+
+
+def test_unknown_priority_is_rejected(detector):
+    with pytest.raises(ValueError):
+        InferenceScheduler(detector).register_source('cam', priority='urgent')
+
+
+def test_concurrent_starts_run_one_scheduler_thread(detector):
+    detector.gate.set()
+    scheduler = InferenceScheduler(detector)
+    barrier = threading.Barrier(8)
+
+    def start():
+        barrier.wait()
+        scheduler.start()
+
+    callers = [threading.Thread(target=start) for _ in range(8)]
+    for thread in callers:
+        thread.start()
+    for thread in callers:
+        thread.join()
+    try:
+        assert sum(thread.name == 'inference-scheduler' for thread in threading.enumerate()) == 1
+    finally:
+        scheduler.stop()
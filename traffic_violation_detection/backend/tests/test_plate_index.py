@@ -0,0 +1,83 @@
+import pytest
+
+from utils.plate_index import PlateIndex, canonical_plate, normalize_plate, ocr_distance
+from utils.violation_store import ViolationStore
+
+
+def test_normalize_and_canonicalize():
+    assert normalize_plate(' ab-12 3 ') == 'AB123'
+    assert canonical_plate('0D8Q1') == canonical_plate('OOBOI') == 'OOBOI'
+
+
+def test_confusions_are_cheaper_than_other_edits():
+    assert ocr_distance('AB123', 'AB123') == 0.0
+    assert ocr_distance('A8123', 'AB123') == 0.5
+    assert ocr_distance('AB0I2', 'ABOL2') == 1.0
+    assert ocr_distance('AX123', 'AB123') == 1.0
+    assert ocr_distance('AB23', 'AB123') == 1.0
+
+
+def test_partial_matches_anywhere_in_plate():
+    assert ocr_distance('123', 'XYAB123', partial=True) == 0.0
+    assert ocr_distance('I23', 'XYAB123', partial=True) == 0.5
+    assert ocr_distance('123', 'XYAB123') == 4.0
+
+
+def test_cutoff_gives_up_early():
+    assert ocr_distance('ZZZZZ', 'AB123', cutoff=2.0) == float('inf')
+
+
+@pytest.fixture
+def index():
+    index = PlateIndex()
+    for plate, count in [('AB123', 5), ('A8123', 1), ('XY9876', 2), ('KL4455', 1), ('AB124', 1)]:
+        index.add(plate, count=count, seen_at=float(count), violation_id=count)
+    return index
+
+
+def test_search_ranks_by_distance_then_count(index):
+    results = index.search('ab-123', max_distance=1.0)
+    assert [(r['plate'], r['distance']) for r in results] == [('AB123', 0.0), ('A8123', 0.5), ('AB124', 1.0)]
+    assert results[0]['count'] == 5
+
+
+def test_search_finds_misread_plate(index):
+    (best, *_) = index.search('XY98I6')
+    assert (best['plate'], best['distance']) == ('XY9876', 1.0)
+    assert index.search('XY98I6', max_distance=0.5) == []
+
+
+def test_search_partial_and_limit(index):
+    assert [r['plate'] for r in index.search('445', partial=True, max_distance=0.0)] == ['KL4455']
+    assert len(index.search('AB123', max_distance=2.0, limit=2)) == 2
+
+
+def test_short_query_scans(index):
+    assert [r['plate'] for r in index.search('XY', partial=True, max_distance=0.0)] == ['XY9876']
+
+
+def test_repeated_plate_is_indexed_once(index):
+    index.add('ab 123', seen_at=10.0, violation_id=99)
+    assert len(index) == 5
+    (result,) = index.search('AB123', max_distance=0.0)
+    assert (result['count'], result['last_seen'], result['last_violation_id']) == (6, 10.0, 99)
+
+
+def test_attach_loads_store_and_follows_writes(tmp_path):
+    store = ViolationStore(str(tmp_path / 'violations.db'), flush_interval=0.01)
+    store.start()
+    store.add({'plate': 'AB123', 'violation_type': 'Speeding', 'frame': 1})
+    store.add({'plate': 'AB123', 'violation_type': 'Speeding', 'frame': 2})
+    store.close()
+
+    index = PlateIndex()
+    index.attach(store, background=False)
+    assert index.ready and index.applied_upto == 2
+
+    store.start()
+    store.add({'plate': 'AB123', 'violation_type': 'Speeding', 'frame': 3})
+    store.add({'plate': 'ZZ999', 'violation_type': 'Speeding', 'frame': 4})
+    store.close()
+
+    assert [(r['plate'], r['count']) for r in index.search('AB123', max_distance=0.0)] == [('AB123', 3)]
+    assert index.search('ZZ999', max_distance=0.0)[0]['last_violation_id'] == 4
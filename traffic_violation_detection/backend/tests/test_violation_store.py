@@ -0,0 +1,102 @@
+import pytest
+
+from utils.violation_store import ViolationStore, build_filters, prefix_upper_bound
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ViolationStore(str(tmp_path / 'violations.db'), flush_interval=0.01)
+    store.start()
+    yield store
+    store.close()
+
+
+def _fill(store, rows):
+    for row in rows:
+        store.add(row)
+    store.close()  # flushes the writer; reads keep working
+
+
+def _violation(i, ts, **extra):
+    return {'detected_at': ts, 'frame': i, 'violation_type': 'Speeding', 'speed': 60.0 + i,
+            'plate': f'AB{i:03d}', 'camera_id': 'cam1', **extra}
+
+
+def test_keyset_pages_are_newest_first_and_complete(store):
+    # Shared timestamps make the id tiebreaker matter
+    _fill(store, [_violation(i, 1000.0 + i // 3) for i in range(25)])
+
+    seen, cursor = [], None
+    while True:
+        page = store.query(cursor=cursor, limit=7)
+        seen.extend(page['violations'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+        assert len(page['violations']) == 7
+
+    assert len(seen) == 25
+    assert len({v['id'] for v in seen}) == 25
+    keys = [(v['detected_at'], v['id']) for v in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_last_page_has_no_cursor(store):
+    _fill(store, [_violation(i, 1000.0 + i) for i in range(5)])
+    page = store.query(limit=5)
+    assert len(page['violations']) == 5
+    assert page['next_cursor'] is None
+
+
+def test_pagination_applies_filters(store):
+    _fill(store, [_violation(i, 1000.0 + i, camera_id='cam1' if i % 2 else 'cam2') for i in range(20)])
+
+    frames, cursor = [], None
+    while True:
+        page = store.query({'camera_id': 'cam1', 'min_speed': 65}, cursor=cursor, limit=3)
+        frames.extend(v['frame'] for v in page['violations'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert frames == [19, 17, 15, 13, 11, 9, 7, 5]
+    assert store.count(filters={'camera_id': 'cam1', 'min_speed': 65}) == 8
+
+
+def test_plate_prefix_is_a_range_scan(store):
+    _fill(store, [_violation(1, 1000.0, plate='ab-123'), _violation(2, 1001.0, plate='AC999'),
+                  _violation(3, 1002.0, plate='AB9')])
+    where, params = build_filters({'plate_prefix': 'ab'})
+    assert where == 'plate >= ? AND plate < ?'
+    assert params == ['AB', prefix_upper_bound('AB')]
+    assert sorted(v['plate'] for v in store.query({'plate_prefix': 'ab'})['violations']) == ['AB123', 'AB9']
+
+
+def _event(track_id, start_frame, ts, violation_type='Speeding', **extra):
+    return {'detected_at': ts, 'frame': start_frame, 'start_frame': start_frame, 'end_frame': start_frame + 20,
+            'track_id': track_id, 'violation_type': violation_type, 'speed': 75.0, 'bbox': [1, 2, 3, 4],
+            'is_violation': True, **extra}
+
+
+def test_resumed_job_recognizes_stored_events(store):
+    # The crashed run (started at 1500) stored two events; an older run of the job stored another
+    _fill(store, [_event(1, 100, 1600.0, job_id='a'), _event(2, 130, 1700.0, job_id='a'),
+                  _event(3, 400, 1000.0, job_id='a'), _event(1, 100, 1600.0, job_id='b')])
+
+    # Replayed events may close with a later end frame or a better plate
+    assert store.contains_event('a', _event(1, 100, 2000.0, end_frame=150, plate='AB123'), since=1500.0)
+    assert store.contains_event('a', _event(2, 130, 2000.0), since=1500.0)
+
+    assert not store.contains_event('a', _event(3, 400, 2000.0), since=1500.0)  # before this run
+    assert not store.contains_event('a', _event(4, 100, 2000.0), since=1500.0)  # other vehicle
+    assert not store.contains_event('a', _event(1, 100, 2000.0, violation_type='Red Light'), since=1500.0)
+    assert not store.contains_event('a', _event(1, 101, 2000.0), since=1500.0)  # later incident
+    assert not store.contains_event('c', _event(1, 100, 2000.0))
+
+
+def test_resumed_job_matches_untracked_records_by_box(store):
+    record = {'detected_at': 1600.0, 'frame': 50, 'violation_type': 'Speeding', 'speed': 80.0,
+              'bbox': [10, 20, 30, 40], 'is_violation': True}
+    _fill(store, [dict(record, job_id='a')])
+    assert store.contains_event('a', dict(record))
+    assert not store.contains_event('a', dict(record, bbox=[11, 20, 30, 40]))
@@ -1,5 +1,14 @@
 # Utils package
-from .detection import VehicleDetector, OCRRecognizer, ViolationDetector
-from .video_processor import VideoProcessor
-
+# The original pipeline classes pull in YOLO and EasyOCR, so they are only
+# imported on first access; the other utils modules stay importable without them.
 __all__ = ['VehicleDetector', 'OCRRecognizer', 'ViolationDetector', 'VideoProcessor']
+
+
+def __getattr__(name):
+    if name in ('VehicleDetector', 'OCRRecognizer', 'ViolationDetector'):
+        from . import detection
+        return getattr(detection, name)
+    if name == 'VideoProcessor':
+        from .video_processor import VideoProcessor
+        return VideoProcessor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
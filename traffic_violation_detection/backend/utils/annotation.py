@@ -0,0 +1,147 @@
+import cv2
+import numpy as np
+import os
+import queue
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+VIOLATION_COLOR = (0, 0, 255)
+NORMAL_COLOR = (0, 255, 0)
+LIGHT_COLORS = {'red': (0, 0, 255), 'yellow': (0, 255, 255), 'green': (0, 255, 0)}
+
+
+def draw_annotations(frame: np.ndarray, results: List[Dict], traffic_light: Optional[Dict],
+                     scale: Tuple[float, float] = (1.0, 1.0)) -> np.ndarray:
+    """Draw vehicle boxes, plate/speed labels and the traffic light state in place"""
+    sx, sy = scale
+
+    for result in results:
+        x1, y1, x2, y2 = result['bbox']
+        x1, x2 = int(x1 * sx), int(x2 * sx)
+        y1, y2 = int(y1 * sy), int(y2 * sy)
+        color = VIOLATION_COLOR if result.get('is_violation') else NORMAL_COLOR
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label = f"{result.get('plate') or '?'} {result.get('speed', 0):.0f} km/h"
+        cv2.putText(frame, label, (x1, max(15, y1 - 8)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        if result.get('is_violation'):
+            cv2.putText(frame, str(result.get('violation_type', 'violation')).upper(),
+                        (x1, y2 + 18), cv2.FONT_HERSHEY_SIMPLEX, 0.6, VIOLATION_COLOR, 2)
+
+    if traffic_light:
+        status = traffic_light.get('status', 'unknown')
+        cv2.putText(frame, f"LIGHT: {status.upper()}", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, LIGHT_COLORS.get(status, (255, 255, 255)), 2)
+
+    return frame
+
+
+class AnnotatedOutputWriter:
+    """
+    Optional annotated-video stage that runs off the detection thread.
+
+    submit() only decimates to the output frame rate and enqueues; drawing,
+    resizing and encoding happen on a worker thread. When the bounded queue
+    is full the frame is dropped rather than making detection wait.
+    """
+
+    def __init__(self, output_path: str, output_fps: float = 15.0,
+                 output_size: Optional[Tuple[int, int]] = None, max_queue: int = 16):
+        self.output_path = output_path
+        self.output_fps = output_fps
+        self.output_size = output_size  # (width, height); None keeps the source size
+        self.enabled = True
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._next_time = 0.0
+        self._thread = threading.Thread(target=self._run, name='annotated-writer', daemon=True)
+        self._thread.start()
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def submit(self, frame: np.ndarray, frame_num: int, source_fps: float,
+               results: List[Dict], traffic_light: Optional[Dict] = None,
+               detection_shape: Optional[Tuple] = None) -> bool:
+        """
+        Queue a frame for annotation. `results` bboxes are in `detection_shape`
+        coordinates (the resized frame detection ran on).
+        """
+        if not self.enabled:
+            return False
+
+        # Decimate to the output rate before paying for anything else
+        timestamp = frame_num / (source_fps or 30)
+        if timestamp + 1e-6 < self._next_time:
+            return False
+        interval = 1.0 / self.output_fps
+        self._next_time = max(self._next_time, timestamp - interval / 2) + interval
+
+        try:
+            self._queue.put_nowait((frame, list(results), traffic_light, detection_shape))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Annotated output error: {e}")
+
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def _write(self, frame: np.ndarray, results: List[Dict], traffic_light: Optional[Dict],
+               detection_shape: Optional[Tuple]):
+        height, width = frame.shape[:2]
+        out_width, out_height = self.output_size or (width, height)
+
+        if (out_width, out_height) != (width, height):
+            frame = cv2.resize(frame, (out_width, out_height))
+        else:
+            frame = frame.copy()
+
+        if detection_shape is not None:
+            scale = (out_width / detection_shape[1], out_height / detection_shape[0])
+        else:
+            scale = (out_width / width, out_height / height)
+
+        draw_annotations(frame, results, traffic_light, scale)
+
+        if self._writer is None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self._writer = cv2.VideoWriter(self.output_path, fourcc, self.output_fps, (out_width, out_height))
+
+        self._writer.write(frame)
+        self.frames_written += 1
+
+    def close(self, timeout: float = 30.0):
+        """Drain queued frames and finalize the video file"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            'output_path': self.output_path,
+            'enabled': self.enabled,
+            'queued': self._queue.qsize(),
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped
+        }
@@ -0,0 +1,113 @@
+import json
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+from .serialization import json_default
+
+logger = logging.getLogger(__name__)
+
+
+def source_fingerprint(video_path: str) -> Dict:
+    """Identify the input file so a checkpoint is never applied to a different video"""
+    stat = os.stat(video_path)
+    return {'name': os.path.basename(video_path), 'size': stat.st_size,
+            'mtime': int(stat.st_mtime)}
+
+
+class CheckpointStore:
+    """
+    Periodic progress snapshots for long-running jobs, one JSON file per job.
+
+    Files are written to a temp name and renamed into place, so a crash
+    mid-write leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.folder, f'{job_id}.json')
+
+    def save(self, job_id: str, state: Dict):
+        path = self._path(job_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({**state, 'saved_at': time.time()}, f, default=json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(job_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint for {job_id}: {e}")
+            return None
+
+    def remove(self, job_id: str):
+        try:
+            os.remove(self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def list(self) -> Dict[str, Dict]:
+        """job_id -> summary of every checkpoint on disk"""
+        summaries = {}
+        for filename in os.listdir(self.folder):
+            if not filename.endswith('.json'):
+                continue
+            job_id = filename[:-5]
+            state = self.load(job_id)
+            if state is not None:
+                summaries[job_id] = {
+                    'frame': state.get('frame_count'),
+                    'total_frames': state.get('source_total_frames'),
+                    'violations': state.get('violation_count'),
+                    'saved_at': state.get('saved_at')
+                }
+        return summaries
+
+
+class JobCheckpointer:
+    """Binds a CheckpointStore to one job and decides when to snapshot"""
+
+    def __init__(self, store: CheckpointStore, job_id: str, interval_frames: int = 300,
+                 fingerprint: Optional[Dict] = None):
+        self.store = store
+        self.job_id = job_id
+        self.interval_frames = max(1, int(interval_frames))
+        self.fingerprint = fingerprint
+        self.last_saved_frame = 0
+        self.saves = 0
+        self.started_at = time.time()  # start of the original (first) run
+
+    def load(self) -> Optional[Dict]:
+        """The job's checkpoint, if it belongs to the same input file"""
+        state = self.store.load(self.job_id)
+        if state is None:
+            return None
+        if self.fingerprint is not None and state.get('fingerprint') != self.fingerprint:
+            logger.warning(f"Checkpoint for {self.job_id} is for a different file, starting over")
+            return None
+        self.started_at = state.get('run_started_at', self.started_at)
+        self.last_saved_frame = state['frame_count']
+        return state
+
+    def due(self, frame_count: int) -> bool:
+        return frame_count - self.last_saved_frame >= self.interval_frames
+
+    def save(self, state: Dict):
+        self.store.save(self.job_id, {**state, 'fingerprint': self.fingerprint,
+                                      'run_started_at': self.started_at})
+        self.last_saved_frame = state['frame_count']
+        self.saves += 1
+
+    def complete(self):
+        """Job finished - the checkpoint is no longer needed"""
+        self.store.remove(self.job_id)
@@ -0,0 +1,417 @@
+import cv2
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+import numpy as np
+import urllib.error
+import urllib.request
+from collections import deque
+from typing import Dict, List, Optional
+
+from .serialization import json_default
+from .tiling import overlap_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def count_frames(path: str) -> int:
+    capture = cv2.VideoCapture(path)
+    try:
+        return int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) if capture.isOpened() else 0
+    finally:
+        capture.release()
+
+
+def shard_ranges(total_frames: int, range_frames: int, frame_skip: int = 1) -> List[tuple]:
+    """
+    (start_frame, end_frame) shards covering a video. Shard sizes are rounded
+    to a multiple of `frame_skip` so every shard analyzes the same frames a
+    single run would.
+    """
+    if total_frames <= 0:
+        return [(0, None)]  # unknown length: one shard to the end
+    step = max(frame_skip, range_frames - range_frames % frame_skip)
+    return [(start, min(start + step, total_frames)) for start in range(0, total_frames, step)]
+
+
+def _stitch(previous: Dict, event: Dict) -> Dict:
+    """Join one incident that a shard boundary split in two"""
+    merged = dict(previous)
+    merged['end_frame'] = event['end_frame']
+    merged['frames'] = previous.get('frames', 1) + event.get('frames', 1)
+    if event.get('speed', 0) > previous.get('speed', 0):
+        merged['speed'] = merged['max_speed'] = event['speed']
+    if event.get('plate') and event.get('plate_confidence', 0) > previous.get('plate_confidence', 0):
+        for key in ('plate', 'plate_confidence', 'bbox', 'plate_bbox'):
+            if key in event:
+                merged[key] = event[key]
+    if 'detail' in previous and 'detail' in event:
+        merged['detail'] = previous['detail'] + event['detail']
+    return merged
+
+
+def merge_file_results(shards: List[Dict], gap_frames: int = 30, iou_threshold: float = 0.3) -> Dict:
+    """
+    Merge the shard results of one file into a single result. Track-level
+    events (records with 'end_frame') cut by a shard boundary are joined when
+    they have the same violation type, overlapping boxes and meet within
+    `gap_frames` of the boundary.
+    """
+    shards = sorted(shards, key=lambda shard: shard['start_frame'])
+    violations = []
+
+    for index, shard in enumerate(shards):
+        boundary = shard['start_frame']
+        earlier = len(violations)  # only events of previous shards can be continued
+        for event in shard['violations']:
+            if index and 'end_frame' in event and event['frame'] - boundary <= gap_frames:
+                match = None
+                for position in range(earlier - 1, -1, -1):
+                    candidate = violations[position]
+                    if boundary - candidate.get('end_frame', -gap_frames - 1) > gap_frames:
+                        continue
+                    if candidate['violation_type'] != event['violation_type'] or candidate.get('_joined'):
+                        continue
+                    boxes = np.array([candidate['bbox'], event['bbox']], dtype=np.float32)
+                    if overlap_matrix(boxes, 'iou')[0, 1] >= iou_threshold:
+                        match = position
+                        break
+                if match is not None:
+                    violations[match] = _stitch(violations[match], event)
+                    violations[match]['_joined'] = True
+                    continue
+            violations.append(dict(event))
+
+        for event in violations:
+            event.pop('_joined', None)
+
+    violations.sort(key=lambda event: event['frame'])
+    return {
+        'file': shards[0]['file'],
+        'total_frames': max(shard['total_frames'] for shard in shards),
+        'frames_analyzed': sum(shard['frames_analyzed'] for shard in shards),
+        'shards': len(shards),
+        'violations_detected': len(violations),
+        'violations': violations
+    }
+
+
+class DistributedCoordinator:
+    """
+    Splits jobs into tasks (one per file, or per frame range of a file) and
+    leases them to worker nodes that poll for work over HTTP.
+
+    Workers heartbeat while they are alive. A worker silent for longer than
+    `heartbeat_timeout` is declared dead and its leased tasks go back on the
+    queue (up to `max_attempts` per task). Every lease has an id, so a late
+    result from a worker that lost its lease is rejected. When all tasks of a
+    job are finished their results are merged per file.
+    """
+
+    def __init__(self, heartbeat_timeout: float = 15.0, max_attempts: int = 3,
+                 results_folder: Optional[str] = None, merge_gap_frames: int = 30,
+                 default_frame_skip: int = 2):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.default_frame_skip = default_frame_skip
+        self.results_folder = results_folder
+        self.merge_gap_frames = merge_gap_frames
+        if results_folder:
+            os.makedirs(results_folder, exist_ok=True)
+
+        self.workers = {}
+        self.jobs = {}
+        self.tasks = {}
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._reaper = None
+
+        self.requeued = 0
+
+    # Jobs
+
+    def submit_job(self, files: List[str], shard: str = 'file', range_frames: int = 1800,
+                   settings: Optional[Dict] = None) -> Dict:
+        """Queue a job; `shard` is 'file' (one task per file) or 'range' (frame ranges)"""
+        if shard not in ('file', 'range'):
+            raise ValueError(f'Unknown shard mode: {shard}')
+        missing = [path for path in files if not os.path.isfile(path)]
+        if missing:
+            raise ValueError(f'Files not found: {missing}')
+
+        # Tasks always carry frame_skip, so workers analyze the frames the shards were aligned to
+        settings = {'frame_skip': self.default_frame_skip, **(settings or {})}
+        job_id = uuid.uuid4().hex[:12]
+        tasks = []
+        for path in files:
+            ranges = [(0, None)]
+            if shard == 'range':
+                ranges = shard_ranges(count_frames(path), range_frames, settings['frame_skip'])
+            for start_frame, end_frame in ranges:
+                tasks.append({
+                    'task_id': uuid.uuid4().hex[:12],
+                    'job_id': job_id,
+                    'file': path,
+                    'start_frame': start_frame,
+                    'end_frame': end_frame,
+                    'settings': settings,
+                    'state': 'queued',
+                    'attempts': 0,
+                    'worker_id': None,
+                    'lease_id': None,
+                    'leased_at': None,
+                    'result': None,
+                    'error': None
+                })
+
+        with self.lock:
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'shard': shard,
+                'files': list(files),
+                'created_at': time.time(),
+                'finished_at': None,
+                'task_ids': [task['task_id'] for task in tasks],
+                'result': None
+            }
+            for task in tasks:
+                self.tasks[task['task_id']] = task
+                self.queue.append(task['task_id'])
+
+        logger.info(f"📦 Job {job_id}: {len(files)} files -> {len(tasks)} tasks ({shard} shards)")
+        return self.job_status(job_id)
+
+    def job_status(self, job_id: str) -> Dict:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            states = [self.tasks[task_id]['state'] for task_id in job['task_ids']]
+            return {
+                **{k: v for k, v in job.items() if k != 'task_ids'},
+                'tasks': len(states),
+                'tasks_done': states.count('done'),
+                'tasks_failed': states.count('failed'),
+                'tasks_running': states.count('leased'),
+                'tasks_queued': states.count('queued')
+            }
+
+    def _finish_job_locked(self, job: Dict):
+        tasks = [self.tasks[task_id] for task_id in job['task_ids']]
+        if any(task['state'] in ('queued', 'leased') for task in tasks):
+            return
+
+        by_file = {}
+        for task in tasks:
+            if task['state'] == 'done':
+                by_file.setdefault(task['file'], []).append(task['result'])
+
+        files = [merge_file_results(shards, self.merge_gap_frames) for shards in by_file.values()]
+        failed = [{'file': t['file'], 'start_frame': t['start_frame'], 'end_frame': t['end_frame'],
+                   'error': t['error']} for t in tasks if t['state'] == 'failed']
+
+        job['status'] = 'failed' if failed and not files else ('partial' if failed else 'completed')
+        job['finished_at'] = time.time()
+        job['result'] = {
+            'violations_detected': sum(f['violations_detected'] for f in files),
+            'frames_analyzed': sum(f['frames_analyzed'] for f in files),
+            'files': files,
+            'failed_tasks': failed
+        }
+        for task in tasks:
+            task['result'] = None  # merged copy kept on the job
+
+        if self.results_folder:
+            path = os.path.join(self.results_folder, f"{job['job_id']}.json")
+            with open(path, 'w') as f:
+                json.dump({k: v for k, v in job.items() if k != 'task_ids'}, f, default=json_default)
+        logger.info(f"✓ Job {job['job_id']} {job['status']}: "
+                    f"{job['result']['violations_detected']} violations in {len(files)} files")
+
+    # Workers
+
+    def register_worker(self, name: Optional[str] = None, slots: int = 1) -> Dict:
+        worker_id = uuid.uuid4().hex[:8]
+        now = time.time()
+        with self.lock:
+            self.workers[worker_id] = {
+                'worker_id': worker_id,
+                'name': name or worker_id,
+                'slots': max(1, int(slots)),
+                'state': 'alive',
+                'registered_at': now,
+                'last_heartbeat': now,
+                'leases': set(),
+                'tasks_done': 0,
+                'tasks_failed': 0
+            }
+        logger.info(f"🖥 Worker {worker_id} registered ({name}, {slots} slots)")
+        return {'worker_id': worker_id, 'heartbeat_timeout': self.heartbeat_timeout}
+
+    def heartbeat(self, worker_id: str, running: Optional[List[str]] = None) -> Dict:
+        """
+        Record a heartbeat. 'known' is False for unknown or dead workers (they
+        must re-register); 'cancel' lists running tasks the worker no longer holds.
+        """
+        with self.lock:
+            worker = self.workers.get(worker_id)
+            if worker is None or worker['state'] != 'alive':
+                return {'known': False, 'cancel': list(running or [])}
+            worker['last_heartbeat'] = time.time()
+            cancel = [task_id for task_id in running or [] if task_id not in worker['leases']]
+        return {'known': True, 'cancel': cancel}
+
+    def lease(self, worker_id: str) -> Optional[Dict]:
+        """Next queued task for a worker, or None"""
+        with self.lock:
+            worker = self.workers.get(worker_id)
+            if worker is None or worker['state'] != 'alive':
+                raise KeyError(worker_id)
+            worker['last_heartbeat'] = time.time()
+            if len(worker['leases']) >= worker['slots'] or not self.queue:
+                return None
+
+            task = self.tasks[self.queue.popleft()]
+            task.update({
+                'state': 'leased',
+                'attempts': task['attempts'] + 1,
+                'worker_id': worker_id,
+                'lease_id': uuid.uuid4().hex[:12],
+                'leased_at': time.time()
+            })
+            worker['leases'].add(task['task_id'])
+            job = self.jobs[task['job_id']]
+            if job['status'] == 'queued':
+                job['status'] = 'running'
+
+            return {k: task[k] for k in ('task_id', 'job_id', 'lease_id', 'file',
+                                         'start_frame', 'end_frame', 'settings', 'attempts')}
+
+    def _release_locked(self, worker_id: str, task_id: str, lease_id: str) -> Optional[Dict]:
+        task = self.tasks.get(task_id)
+        if task is None or task['state'] != 'leased' or task['lease_id'] != lease_id \
+                or task['worker_id'] != worker_id:
+            return None  # lease was revoked (worker declared dead) or already finished
+        worker = self.workers.get(worker_id)
+        if worker is not None:
+            worker['leases'].discard(task_id)
+        return task
+
+    def complete(self, worker_id: str, task_id: str, lease_id: str, result: Dict) -> bool:
+        with self.lock:
+            task = self._release_locked(worker_id, task_id, lease_id)
+            if task is None:
+                return False
+            task['state'] = 'done'
+            task['result'] = {**result, 'file': task['file'], 'start_frame': task['start_frame']}
+            self.workers[worker_id]['tasks_done'] += 1
+            self._finish_job_locked(self.jobs[task['job_id']])
+        return True
+
+    def fail(self, worker_id: str, task_id: str, lease_id: str, error: str) -> bool:
+        with self.lock:
+            task = self._release_locked(worker_id, task_id, lease_id)
+            if task is None:
+                return False
+            self.workers[worker_id]['tasks_failed'] += 1
+            self._requeue_locked(task, error)
+        return True
+
+    def _requeue_locked(self, task: Dict, error: str):
+        task.update({'worker_id': None, 'lease_id': None, 'leased_at': None, 'error': error})
+        if task['attempts'] >= self.max_attempts:
+            task['state'] = 'failed'
+            logger.error(f"Task {task['task_id']} ({task['file']}) failed after {task['attempts']} attempts: {error}")
+            self._finish_job_locked(self.jobs[task['job_id']])
+        else:
+            task['state'] = 'queued'
+            self.queue.appendleft(task['task_id'])  # retried before newer work
+            self.requeued += 1
+
+    def reap(self) -> List[str]:
+        """Declare silent workers dead and requeue their tasks"""
+        now = time.time()
+        dead = []
+        with self.lock:
+            for worker in self.workers.values():
+                if worker['state'] == 'alive' and now - worker['last_heartbeat'] > self.heartbeat_timeout:
+                    worker['state'] = 'dead'
+                    dead.append(worker['worker_id'])
+                    for task_id in list(worker['leases']):
+                        self._requeue_locked(self.tasks[task_id], f"worker {worker['worker_id']} lost")
+                    worker['leases'].clear()
+        for worker_id in dead:
+            logger.warning(f"💀 Worker {worker_id} missed its heartbeats, work requeued")
+        return dead
+
+    def start(self):
+        if self._reaper is not None:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(max(0.5, self.heartbeat_timeout / 3)):
+                self.reap()
+
+        self._reaper = threading.Thread(target=run, name='coordinator-reaper', daemon=True)
+        self._reaper.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._reaper is not None:
+            self._reaper.join(5.0)
+            self._reaper = None
+
+    def worker_list(self) -> List[Dict]:
+        with self.lock:
+            return [
+                {**{k: v for k, v in worker.items() if k != 'leases'},
+                 'leases': sorted(worker['leases']),
+                 'last_heartbeat_age': round(time.time() - worker['last_heartbeat'], 1)}
+                for worker in self.workers.values()
+            ]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            states = [task['state'] for task in self.tasks.values()]
+            return {
+                'workers_alive': sum(1 for w in self.workers.values() if w['state'] == 'alive'),
+                'workers_dead': sum(1 for w in self.workers.values() if w['state'] == 'dead'),
+                'jobs': len(self.jobs),
+                'tasks_queued': states.count('queued'),
+                'tasks_running': states.count('leased'),
+                'tasks_done': states.count('done'),
+                'tasks_failed': states.count('failed'),
+                'requeued': self.requeued
+            }
+
+
+class CoordinatorClient:
+    """Small JSON-over-HTTP client for the coordinator API (stdlib only)"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, payload: Optional[Dict] = None):
+        """(status, JSON body); raises ConnectionError when the coordinator is unreachable"""
+        data = json.dumps(payload, default=json_default).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                body = response.read()
+                return response.status, json.loads(body) if body else None
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            try:
+                return e.code, json.loads(body) if body else None
+            except ValueError:
+                return e.code, {'error': body.decode(errors='replace')}
+        except (urllib.error.URLError, OSError) as e:
+            raise ConnectionError(f'Coordinator unreachable: {e}') from e
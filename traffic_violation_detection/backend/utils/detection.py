@@ -11,8 +11,10 @@ logger = logging.getLogger(__name__)
 class VehicleDetector:
     """Detects vehicles and their license plates using YOLOv8"""
     
-    def __init__(self, model_path: str = 'models/yolov8n.pt', conf_threshold: float = 0.5):
+    def __init__(self, model_path: str = 'models/yolov8n.pt', conf_threshold: float = 0.5,
+                 plate_localizer=None):
         """Initialize YOLO model for vehicle detection"""
+        self.plate_localizer = plate_localizer  # optional PlateLocalizer (dedicated plate model)
         try:
             self.model = YOLO(model_path)
             self.conf_threshold = conf_threshold
@@ -59,25 +61,52 @@ class VehicleDetector:
         Detect license plates in vehicle region
         Returns: List of cropped license plate regions
         """
-        x1, y1, x2, y2 = vehicle_bbox
-        vehicle_region = frame[y1:y2, x1:x2]
+        return self.detect_license_plates_batch(frame, [vehicle_bbox])[0]
+    
+    def detect_license_plates_batch(self, frame: np.ndarray, vehicle_bboxes: List[Tuple]) -> List[List[Dict]]:
+        """
+        Detect license plates for every vehicle of a frame with one model call
+        Returns: one list of plate dicts (frame coordinates + crop) per vehicle
+        """
+        plates = [[] for _ in vehicle_bboxes]
         
-        if vehicle_region.size == 0:
-            return []
+        if self.plate_localizer is not None:
+            for i, plate in enumerate(self.plate_localizer.localize(frame, vehicle_bboxes)):
+                if plate is not None:
+                    px1, py1, px2, py2 = plate['bbox']
+                    plates[i].append({
+                        'bbox': plate['bbox'],
+                        'confidence': plate['conf'],
+                        'crop': frame[py1:py2, px1:px2]
+                    })
+            return plates
+        
+        if self.model is None:
+            return plates
+        
+        regions, owners = [], []
+        for i, (x1, y1, x2, y2) in enumerate(vehicle_bboxes):
+            vehicle_region = frame[y1:y2, x1:x2]
+            if vehicle_region.size > 0:
+                regions.append(vehicle_region)
+                owners.append(i)
+        
+        if not regions:
+            return plates
         
-        # Use YOLO to detect license plates in vehicle region
+        # Fallback: general model over all vehicle crops in a single call
         try:
-            results = self.model(vehicle_region, conf=0.5, verbose=False)
-            plates = []
+            results = self.model(regions, conf=0.5, verbose=False)
             
-            for result in results:
+            for result, i, vehicle_region in zip(results, owners, regions):
+                x1, y1 = vehicle_bboxes[i][:2]
                 if result.boxes is not None:
                     for box in result.boxes:
                         px1, py1, px2, py2 = box.xyxy[0].cpu().numpy()
                         conf = float(box.conf[0])
                         
                         # Adjust coordinates to original frame
-                        plates.append({
+                        plates[i].append({
                             'bbox': (int(x1 + px1), int(y1 + py1), int(x1 + px2), int(y1 + py2)),
                             'confidence': conf,
                             'crop': vehicle_region[int(py1):int(py2), int(px1):int(px2)]
@@ -86,7 +115,7 @@ class VehicleDetector:
             return plates
         except Exception as e:
             logger.error(f"Error detecting license plates: {e}")
-            return []
+            return plates
 
 
 class OCRRecognizer:
@@ -0,0 +1,172 @@
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .tiling import overlap_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def event_key(record: Dict) -> Tuple:
+    """
+    Identity of a reported violation that survives a replay of the same
+    frames (resumed jobs skip records whose key was already persisted).
+    Events are keyed by track, start frame and type; per-frame records
+    without a track also by their box.
+    """
+    key = (record.get('track_id'), record.get('start_frame', record.get('frame')), record.get('violation_type'))
+    if record.get('track_id') is None:
+        key += (tuple(record.get('bbox') or ()),)
+    return key
+
+
+class IoUTracker:
+    """
+    Minimal multi-object tracker: boxes of consecutive processed frames are
+    matched greedily by IoU; unmatched boxes start new tracks and tracks not
+    seen for `max_age` frames are forgotten.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age  # in source frames
+        self.tracks = {}  # track_id -> {'bbox': [x1, y1, x2, y2], 'last_frame': int}
+        self.next_id = 1
+
+    def update(self, frame: int, boxes: Sequence[Sequence[float]]) -> List[int]:
+        """Track id for each box of this frame"""
+        self.tracks = {tid: t for tid, t in self.tracks.items() if frame - t['last_frame'] <= self.max_age}
+
+        track_ids = list(self.tracks)
+        assigned = [None] * len(boxes)
+
+        if track_ids and len(boxes):
+            stacked = np.array([self.tracks[tid]['bbox'] for tid in track_ids] + [list(b) for b in boxes],
+                               dtype=np.float32)
+            iou = overlap_matrix(stacked, 'iou')[:len(track_ids), len(track_ids):]
+            used_tracks = set()
+            for flat in np.argsort(-iou, axis=None, kind='stable'):
+                t, b = divmod(int(flat), len(boxes))
+                if iou[t, b] < self.iou_threshold:
+                    break
+                if t in used_tracks or assigned[b] is not None:
+                    continue
+                used_tracks.add(t)
+                assigned[b] = track_ids[t]
+
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                assigned[i] = self.next_id
+                self.next_id += 1
+            self.tracks[assigned[i]] = {'bbox': [float(v) for v in box], 'last_frame': frame}
+
+        return assigned
+
+    def get_state(self) -> Dict:
+        return {'next_id': self.next_id, 'tracks': [[tid, t['bbox'], t['last_frame']] for tid, t in self.tracks.items()]}
+
+    def restore(self, state: Dict):
+        self.next_id = state['next_id']
+        self.tracks = {tid: {'bbox': bbox, 'last_frame': last} for tid, bbox, last in state['tracks']}
+
+
+class EventAggregator:
+    """
+    Folds per-frame violation records into one event per vehicle (track) and
+    violation type. An incident stays open while its track keeps violating
+    and is closed `gap_frames` after its last violating frame (or by flush()).
+    The event carries start/end frame, the number of violating frames, the
+    maximum speed and the most confident plate reading; with `keep_detail`
+    the per-frame records are attached as 'detail'.
+    """
+
+    def __init__(self, tracker: Optional[IoUTracker] = None, gap_frames: int = 30,
+                 keep_detail: bool = False, max_detail: int = 200):
+        self.tracker = tracker or IoUTracker()
+        self.gap_frames = gap_frames
+        self.keep_detail = keep_detail
+        self.max_detail = max_detail
+        self._open = {}  # (track_id, violation_type) -> event being built
+
+        self.records_in = 0
+        self.events_out = 0
+
+    @staticmethod
+    def _key(record: Dict):
+        return record.get('track_id'), record['violation_type']
+
+    def opens(self, record: Dict) -> bool:
+        """Whether `record` would start a new incident (callers attach evidence once per incident)"""
+        return self._key(record) not in self._open
+
+    def add(self, record: Dict):
+        """Fold one violating frame of a vehicle into its incident"""
+        self.records_in += 1
+        key = self._key(record)
+        event = self._open.get(key)
+
+        if event is None:
+            event = {k: v for k, v in record.items() if k != 'speed'}
+            event.update({
+                'start_frame': record['frame'],
+                'end_frame': record['frame'],
+                'frames': 0,
+                'speed': record['speed'],
+                'max_speed': record['speed']
+            })
+            if self.keep_detail:
+                event['detail'] = []
+            self._open[key] = event
+
+        event['end_frame'] = record['frame']
+        event['frames'] += 1
+        if record['speed'] > event['max_speed']:
+            event['max_speed'] = event['speed'] = record['speed']
+
+        # Best plate reading over the whole incident
+        if record.get('plate') and (not event.get('plate') or
+                                    record['plate_confidence'] > event['plate_confidence']):
+            event['plate'] = record['plate']
+            event['plate_confidence'] = record['plate_confidence']
+            event['bbox'] = record['bbox']
+            if 'plate_bbox' in record:
+                event['plate_bbox'] = record['plate_bbox']
+
+        if self.keep_detail and len(event['detail']) < self.max_detail:
+            event['detail'].append({
+                'frame': record['frame'],
+                'bbox': record['bbox'],
+                'speed': record['speed'],
+                'plate': record.get('plate', ''),
+                'plate_confidence': record.get('plate_confidence', 0.0)
+            })
+
+    def advance(self, frame: int) -> List[Dict]:
+        """Close and return incidents whose last violating frame is more than `gap_frames` ago"""
+        closed = [key for key, event in self._open.items() if frame - event['end_frame'] > self.gap_frames]
+        return self._close(closed)
+
+    def flush(self) -> List[Dict]:
+        """Close every open incident (end of the video or stream session)"""
+        return self._close(list(self._open))
+
+    def _close(self, keys) -> List[Dict]:
+        events = [self._open.pop(key) for key in keys]
+        events.sort(key=lambda event: (event['start_frame'], event.get('track_id') or 0))
+        self.events_out += len(events)
+        return events
+
+    def get_state(self) -> Dict:
+        return {'tracker': self.tracker.get_state(), 'open': list(self._open.values())}
+
+    def restore(self, state: Dict):
+        self.tracker.restore(state['tracker'])
+        self._open = {self._key(event): event for event in state['open']}
+
+    def stats(self) -> Dict:
+        return {
+            'records_in': self.records_in,
+            'events_out': self.events_out,
+            'open_incidents': len(self._open),
+            'active_tracks': len(self.tracker.tracks)
+        }
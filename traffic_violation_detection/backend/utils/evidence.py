@@ -0,0 +1,248 @@
+import cv2
+import numpy as np
+import os
+import queue
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRingBuffer:
+    """
+    Bounded buffer of the last N seconds of frames, JPEG-compressed on a
+    background thread so push() never encodes on the caller's thread.
+    Frames not yet compressed are handed out raw (BGR arrays); readers of
+    slice()/get() accept either form (see EvidenceWriter).
+    """
+
+    def __init__(self, seconds: float = 10.0, fps: float = 30.0, jpeg_quality: int = 80,
+                 max_unencoded: int = 8, idle_timeout: float = 1.0):
+        self.jpeg_quality = jpeg_quality
+        self.idle_timeout = idle_timeout  # the encoder thread exits after this long without frames
+        self._frames = deque(maxlen=max(1, int(seconds * fps)))  # [frame_num, time, jpeg bytes | raw frame]
+        self._unencoded = deque(maxlen=max(1, max_unencoded))  # entries of _frames still raw
+        self._cond = threading.Condition()
+        self._encoder = None
+
+        self.frames_encoded = 0
+        self.frames_dropped = 0  # encoder fell behind; the oldest raw frames were discarded
+
+    def resize(self, seconds: float, fps: float):
+        """Re-size capacity once the real fps of the source is known"""
+        with self._cond:
+            self._frames = deque(self._frames, maxlen=max(1, int(seconds * fps)))
+
+    def push(self, frame: np.ndarray, frame_num: int):
+        # Frames that view someone else's buffer (e.g. a shared-memory ring slot) are copied
+        if not frame.flags.owndata:
+            frame = frame.copy()
+        entry = [frame_num, time.time(), frame]
+        with self._cond:
+            if len(self._unencoded) == self._unencoded.maxlen:
+                self._unencoded[0][2] = None
+                self.frames_dropped += 1
+            self._unencoded.append(entry)
+            self._frames.append(entry)
+            if self._encoder is None:
+                self._encoder = threading.Thread(target=self._encode_loop, name='evidence-encoder', daemon=True)
+                self._encoder.start()
+            self._cond.notify()
+
+    def _encode_loop(self):
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: self._unencoded, timeout=self.idle_timeout):
+                    self._encoder = None
+                    return
+                entry = self._unencoded.popleft()
+                frame = entry[2]
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            with self._cond:
+                entry[2] = jpeg.tobytes() if ok else None
+                self.frames_encoded += 1
+
+    def slice(self, start_frame: int, end_frame: int) -> List[Tuple[int, float, object]]:
+        """Frames with start_frame <= frame_num <= end_frame still in the buffer"""
+        with self._cond:
+            return [tuple(entry) for entry in self._frames
+                    if start_frame <= entry[0] <= end_frame and entry[2] is not None]
+
+    def get(self, frame_num: int):
+        """JPEG (or raw frame) for `frame_num`, or the newest older frame if it was not buffered"""
+        with self._cond:
+            for num, _, data in reversed(self._frames):
+                if num <= frame_num and data is not None:
+                    return data
+        return None
+
+    def __len__(self):
+        return len(self._frames)
+
+
+def decode_evidence_frame(data) -> Optional[np.ndarray]:
+    """Buffered frame as BGR, whether it was already JPEG-compressed or not"""
+    if isinstance(data, np.ndarray):
+        return data
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class EvidenceWriter:
+    """Background thread that encodes evidence clips and stills off the detection path"""
+
+    def __init__(self, output_folder: str, max_queue: int = 64):
+        self.output_folder = output_folder
+        os.makedirs(output_folder, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='evidence-writer', daemon=True)
+        self._thread.start()
+
+        self.clips_written = 0
+        self.stills_written = 0
+        self.dropped = 0
+
+    def submit(self, task: Dict) -> bool:
+        try:
+            self._queue.put_nowait(task)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Evidence queue full, dropped {task['kind']} {task['path']}")
+            return False
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task['kind'] == 'clip':
+                    self._write_clip(task['path'], task['frames'], task['fps'])
+                    self.clips_written += 1
+                else:
+                    self._write_still(task['path'], task['frame'], task['box'])
+                    self.stills_written += 1
+            except Exception as e:
+                logger.error(f"Evidence write failed for {task['path']}: {e}")
+
+    def _write_clip(self, path: str, frames: List[Tuple[int, float, object]], fps: float):
+        writer = None
+        for _, _, data in frames:
+            frame = decode_evidence_frame(data)
+            if frame is None:
+                continue
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+            writer.write(frame)
+        if writer is not None:
+            writer.release()
+
+    def _write_still(self, path: str, data, box: Tuple[int, int, int, int]):
+        frame = decode_evidence_frame(data)
+        if frame is None:
+            return
+        x1, y1, x2, y2 = box
+        crop = frame[max(0, y1):y2, max(0, x1):x2]
+        cv2.imwrite(path, crop if crop.size > 0 else frame)
+
+    def stats(self) -> Dict:
+        return {
+            'queued': self._queue.qsize(),
+            'clips_written': self.clips_written,
+            'stills_written': self.stills_written,
+            'dropped': self.dropped
+        }
+
+
+class EvidenceRecorder:
+    """
+    Per-stream evidence capture: buffers recent frames and, on a violation,
+    schedules a pre/post-roll clip plus a still crop of the vehicle.
+    Clip and still paths are attached to the violation record immediately;
+    the files appear once the post-roll has been captured and encoded.
+    """
+
+    def __init__(self, writer: EvidenceWriter, name: str = 'stream',
+                 pre_roll: float = 5.0, post_roll: float = 5.0,
+                 fps: float = 30.0, jpeg_quality: int = 80):
+        self.writer = writer
+        self.name = name
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.fps = fps
+        self.frame_step = 1  # frame number increment between buffered frames
+        self.buffer = FrameRingBuffer(pre_roll + post_roll, fps, jpeg_quality)
+        self._pending = []  # clips waiting for their post-roll
+        self._frame_shape = None
+        self._lock = threading.Lock()
+
+    def set_fps(self, fps: float, frame_step: int = 1):
+        """
+        Source frame rate, and how many source frames separate buffered frames
+        (>1 when skipped frames are never decoded)
+        """
+        self.fps = fps or 30.0
+        self.frame_step = max(1, int(frame_step))
+        self.buffer.resize(self.pre_roll + self.post_roll, self.fps / self.frame_step)
+
+    def push(self, frame: np.ndarray, frame_num: int):
+        """Buffer one full-resolution frame and emit any clips whose post-roll is complete"""
+        self.buffer.push(frame, frame_num)
+        with self._lock:
+            self._frame_shape = frame.shape
+            ready = [clip for clip in self._pending if frame_num >= clip['end_frame']]
+            self._pending = [clip for clip in self._pending if frame_num < clip['end_frame']]
+        for clip in ready:
+            self._emit(clip)
+
+    def attach(self, violation_info: Dict, frame_shape: Optional[Tuple] = None):
+        """
+        Schedule evidence for a violation and add 'evidence_clip'/'evidence_still'.
+        `frame_shape` is the shape of the frame the bbox refers to, for scaling
+        onto the buffered full-resolution frame.
+        """
+        frame_num = violation_info['frame']
+        with self._lock:
+            # One clip covers every violation inside its window
+            clip = next((c for c in self._pending if c['start_frame'] <= frame_num <= c['end_frame']), None)
+            if clip is None:
+                token = f"{self.name}_{frame_num}_{uuid.uuid4().hex[:8]}"
+                clip = {
+                    'path': os.path.join(self.writer.output_folder, token + '.mp4'),
+                    'start_frame': frame_num - int(self.pre_roll * self.fps),
+                    'end_frame': frame_num + int(self.post_roll * self.fps)
+                }
+                self._pending.append(clip)
+            full_shape = self._frame_shape
+
+        violation_info['evidence_clip'] = clip['path']
+
+        # Crop and encode the still on the writer thread, from the buffered frame
+        buffered = self.buffer.get(frame_num)
+        if buffered is not None and violation_info.get('bbox'):
+            x1, y1, x2, y2 = violation_info['bbox']
+            if frame_shape is not None and full_shape is not None:
+                sx = full_shape[1] / frame_shape[1]
+                sy = full_shape[0] / frame_shape[0]
+                x1, x2 = int(x1 * sx), int(x2 * sx)
+                y1, y2 = int(y1 * sy), int(y2 * sy)
+            still_path = clip['path'][:-4] + f"_{frame_num}_{x1}_{y1}.jpg"
+            task = {'kind': 'still', 'path': still_path, 'frame': buffered, 'box': (x1, y1, x2, y2)}
+            if self.writer.submit(task):
+                violation_info['evidence_still'] = still_path
+
+    def _emit(self, clip: Dict):
+        frames = self.buffer.slice(clip['start_frame'], clip['end_frame'])
+        if frames:
+            self.writer.submit({'kind': 'clip', 'path': clip['path'], 'frames': frames,
+                                'fps': self.fps / self.frame_step})
+
+    def flush(self):
+        """Stream ended - write pending clips with whatever post-roll exists"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for clip in pending:
+            self._emit(clip)
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # optional, ~5-10x faster encoding
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+CSV_FIELDS = [
+    'frame', 'end_frame', 'frames', 'track_id', 'violation_type', 'plate', 'plate_confidence', 'speed',
+    'traffic_light_status', 'traffic_light_confidence', 'camera_id', 'job_id',
+    'detected_at', 'bbox', 'evidence_clip', 'evidence_still'
+]
+
+CHUNK_SIZE = 64 * 1024  # bytes per yielded chunk
+
+
+def dumps(record: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY, default=str)
+    return json.dumps(record, default=str).encode()
+
+
+def loads(line):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def iter_log_chunks(log_path: str) -> Iterator[bytes]:
+    """An NDJSON log is already the export format - pass it through in fixed-size chunks"""
+    with open(log_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            yield chunk
+
+
+def iter_log_records(log_path: str) -> Iterator[Dict]:
+    with open(log_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def ndjson_chunks(records: Iterable[Dict]) -> Iterator[bytes]:
+    """Encode records one per line, batching lines into ~CHUNK_SIZE writes"""
+    buffer, size = [], 0
+    for record in records:
+        line = dumps(record) + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def csv_chunks(records: Iterable[Dict], fields: List[str] = CSV_FIELDS) -> Iterator[bytes]:
+    """CSV with a fixed header; nested values (bbox) are written as JSON"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    for record in records:
+        writer.writerow([
+            json.dumps(value) if isinstance(value, (list, tuple, dict)) else value
+            for value in (record.get(field) for field in fields)
+        ])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,453 @@
+import os
+import queue
+import time
+import weakref
+import logging
+import multiprocessing as mp
+import cv2
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ring-wide header, written by the decoder
+_INFO_DTYPE = np.dtype([
+    ('state', 'i8'), ('fps', 'f8'), ('width', 'i8'), ('height', 'i8'), ('frame_count', 'i8'),
+    ('frames_decoded', 'i8'), ('frames_published', 'i8'), ('frames_dropped', 'i8'), ('seq', 'i8')
+])
+# One record per slot, describing the frame currently in it
+_SLOT_DTYPE = np.dtype([
+    ('seq', 'i8'), ('frame_number', 'i8'), ('timestamp', 'f8'),
+    ('height', 'i4'), ('width', 'i4'), ('channels', 'i4'), ('pad', 'i4')
+])
+_STATES = ('starting', 'open', 'failed', 'ended')
+_END = -1  # end-of-stream marker on the ready queue
+
+
+def _align(size: int, alignment: int = 64) -> int:
+    return (size + alignment - 1) // alignment * alignment
+
+
+def _return_slot(free_queue, slot: int, shm=None):
+    # `shm` is only carried along: borrowed frames keep the block alive until the last one is gone
+    try:
+        free_queue.put(slot)
+    except (ValueError, OSError):
+        pass  # ring already closed
+
+
+class RingFrame:
+    """
+    A frame borrowed from a SharedFrameRing. `frame` is a view into shared
+    memory; its slot is handed back to the writer once `frame` and every view
+    derived from it are garbage, or earlier through release().
+    """
+
+    __slots__ = ('seq', 'frame_number', 'timestamp', 'frame', 'release')
+
+    def __init__(self, seq: int, frame_number: int, timestamp: float, frame: np.ndarray, release):
+        self.seq = seq
+        self.frame_number = frame_number
+        self.timestamp = timestamp
+        self.frame = frame
+        self.release = release
+
+
+class SharedFrameRing:
+    """
+    Preallocated frame slots in one shared-memory block, for handing decoded
+    frames from a decoder process to an inference process without pickling
+    or copying pixels.
+
+    Writers acquire() a free slot, decode straight into slot_array() and
+    publish() it; readers get() slots in publish order. Only slot indices
+    travel through the two queues (free and ready), which also provide the
+    synchronization: a writer blocks (or drops, for live sources) while every
+    slot is in use, a reader blocks until a slot is published. Every
+    published frame gets a ring-wide sequence number, so readers can tell
+    when frames were dropped on the writer side.
+
+    The ring is created by the owning process and passed to the other side as
+    a multiprocessing.Process argument; close() in the owner frees the memory.
+    """
+
+    def __init__(self, slots: int = 8, frame_shape: Tuple[int, int, int] = (1080, 1920, 3),
+                 context=None):
+        context = context or mp.get_context()
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self.slot_bytes = _align(int(np.prod(frame_shape)))
+        self._meta_bytes = _align(_INFO_DTYPE.itemsize + slots * _SLOT_DTYPE.itemsize)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self._meta_bytes + slots * self.slot_bytes)
+        self._owner = True
+        self._free = context.Queue()
+        self._ready = context.Queue()
+        self._write_lock = context.Lock()
+        self._stop = context.Event()
+        self._attach()
+
+        self._info[0] = 0
+        self._slot_meta[:] = 0
+        for slot in range(slots):
+            self._free.put(slot)
+
+    def _attach(self):
+        buf = self._shm.buf
+        self._info = np.ndarray((1,), dtype=_INFO_DTYPE, buffer=buf, offset=0)
+        self._slot_meta = np.ndarray((self.slots,), dtype=_SLOT_DTYPE, buffer=buf, offset=_INFO_DTYPE.itemsize)
+        self._data = np.ndarray((self.slots * self.slot_bytes,), dtype=np.uint8, buffer=buf,
+                                offset=self._meta_bytes)
+
+    def __getstate__(self):
+        state = {k: v for k, v in self.__dict__.items() if k not in ('_shm', '_info', '_slot_meta', '_data')}
+        state['_shm_name'] = self._shm.name
+        state['_owner'] = False
+        return state
+
+    def __setstate__(self, state):
+        shm_name = state.pop('_shm_name')
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=shm_name)
+        self._attach()
+
+    # Writer side
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """A free slot index, or None if none frees up within `timeout` (0 = don't wait) or on stop"""
+        deadline = None if timeout is None else time.time() + timeout
+        while not self._stop.is_set():
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.time())
+            try:
+                return self._free.get(timeout=wait) if wait > 0 else self._free.get_nowait()
+            except queue.Empty:
+                if deadline is not None and time.time() >= deadline:
+                    return None
+        return None
+
+    def slot_array(self, slot: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """Writable uint8 view of `slot` with `shape` (must fit in a slot)"""
+        size = int(np.prod(shape))
+        if size > self.slot_bytes:
+            raise ValueError(f'Frame {shape} does not fit a {self.slot_bytes} byte slot')
+        start = slot * self.slot_bytes
+        return self._data[start:start + size].reshape(shape)
+
+    def publish(self, slot: int, shape: Tuple[int, ...], frame_number: int,
+                timestamp: Optional[float] = None) -> int:
+        """Hand a filled slot to the readers; returns its sequence number"""
+        with self._write_lock:
+            info = self._info[0]
+            seq = int(info['seq']) + 1
+            info['seq'] = seq
+            info['frames_published'] += 1
+            meta = self._slot_meta[slot]
+            meta['seq'] = seq
+            meta['frame_number'] = frame_number
+            meta['timestamp'] = time.time() if timestamp is None else timestamp
+            meta['height'], meta['width'] = shape[0], shape[1]
+            meta['channels'] = shape[2] if len(shape) > 2 else 1
+        self._ready.put(slot)
+        return seq
+
+    def discard(self, slot: int):
+        """Give back an acquired slot without publishing it"""
+        _return_slot(self._free, slot)
+
+    def write(self, frame: np.ndarray, frame_number: int, timeout: Optional[float] = None) -> bool:
+        """Copy an already decoded frame into the ring; False (counted as dropped) when no slot frees up"""
+        slot = self.acquire(timeout)
+        if slot is None:
+            self.count_dropped()
+            return False
+        self.slot_array(slot, frame.shape)[...] = frame
+        self.publish(slot, frame.shape, frame_number)
+        return True
+
+    def count_dropped(self, frames: int = 1):
+        with self._write_lock:
+            self._info[0]['frames_dropped'] += frames
+
+    def set_info(self, state: str, fps: float = 0.0, width: int = 0, height: int = 0, frame_count: int = 0):
+        with self._write_lock:
+            info = self._info[0]
+            info['fps'], info['width'], info['height'], info['frame_count'] = fps, width, height, frame_count
+            info['state'] = _STATES.index(state)
+
+    def end(self, frames_decoded: int, state: str = 'ended'):
+        """Writer is done: readers get None once they've consumed every published frame"""
+        with self._write_lock:
+            self._info[0]['frames_decoded'] = frames_decoded
+            self._info[0]['state'] = _STATES.index(state)
+        self._ready.put(_END)
+
+    # Reader side
+
+    def get(self, timeout: Optional[float] = None) -> Optional[RingFrame]:
+        """
+        Next published frame, or None at end of stream.
+        Raises queue.Empty when nothing arrives within `timeout`.
+        """
+        slot = self._ready.get(timeout=timeout)
+        if slot == _END:
+            self._ready.put(_END)  # let other readers see it too
+            return None
+
+        meta = self._slot_meta[slot].copy()
+        shape = (int(meta['height']), int(meta['width']), int(meta['channels']))
+        start = self._meta_bytes + slot * self.slot_bytes
+        frame = np.frombuffer(self._shm.buf[start:start + int(np.prod(shape))], dtype=np.uint8)
+        frame = frame.reshape(shape if shape[2] > 1 else shape[:2])
+
+        # Every view derived from `frame` ends up referencing the same buffer
+        # object, so the slot is free only once none of them is left
+        owner = frame
+        while isinstance(owner, np.ndarray) and owner.base is not None:
+            owner = owner.base
+        release = weakref.finalize(owner, _return_slot, self._free, slot, self._shm)
+        release.atexit = False  # at interpreter exit the block simply goes with the process
+        return RingFrame(int(meta['seq']), int(meta['frame_number']), float(meta['timestamp']), frame, release)
+
+    # Both
+
+    @property
+    def state(self) -> str:
+        return _STATES[int(self._info[0]['state'])]
+
+    def info(self) -> Dict:
+        info = self._info[0]
+        return {
+            'state': self.state,
+            'fps': float(info['fps']),
+            'width': int(info['width']),
+            'height': int(info['height']),
+            'frame_count': int(info['frame_count']),
+            'frames_decoded': int(info['frames_decoded']),
+            'frames_published': int(info['frames_published']),
+            'frames_dropped': int(info['frames_dropped'])
+        }
+
+    def stop(self):
+        """Ask writers to give up (blocked acquire() calls return None)"""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def close(self):
+        """Detach; the owner also frees the block (frames still borrowed keep their mapping alive)"""
+        self._info = self._slot_meta = self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # borrowed frames still reference the mapping; it goes away with them
+        if self._owner:
+            self._owner = False
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            for q in (self._free, self._ready):
+                q.cancel_join_thread()
+                q.close()
+
+
+def _decode_worker(ring: SharedFrameRing, source, every: int, drop_when_full: bool):
+    """Decoder process: decodes `source` straight into ring slots"""
+    cv2.setNumThreads(1)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        ring.set_info('failed')
+        ring.end(0, state='failed')
+        return
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    ring.set_info('open', cap.get(cv2.CAP_PROP_FPS) or 30, width, height, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+
+    frame_number = 0
+    while not ring.stopped:
+        frame_number += 1
+        if frame_number % every:
+            # Never wanted by the reader: demux only
+            if not cap.grab():
+                frame_number -= 1
+                break
+            continue
+
+        slot = ring.acquire(timeout=0 if drop_when_full else None)
+        if slot is None:
+            if ring.stopped:
+                break
+            # Live source and the reader is behind: drop this frame
+            ring.count_dropped()
+            if not cap.grab():
+                frame_number -= 1
+                break
+            continue
+
+        target = ring.slot_array(slot, (height, width, 3)) if height * width * 3 <= ring.slot_bytes else None
+        ok, frame = cap.read(target) if target is not None else cap.read()
+        if not ok:
+            ring.discard(slot)
+            frame_number -= 1
+            break
+        if frame is not target:
+            # Resolution change mid-stream (or larger than a slot): copy what fits
+            if frame.nbytes > ring.slot_bytes:
+                scale = (ring.slot_bytes / frame.nbytes) ** 0.5
+                frame = cv2.resize(frame, (int(frame.shape[1] * scale), int(frame.shape[0] * scale)),
+                                   interpolation=cv2.INTER_AREA)
+            height, width = frame.shape[:2]
+            ring.slot_array(slot, frame.shape)[...] = frame
+        ring.publish(slot, frame.shape, frame_number)
+
+    cap.release()
+    ring.end(frame_number)
+
+
+class RingCapture:
+    """
+    cv2.VideoCapture-compatible reader over a decoder process writing into a
+    SharedFrameRing, so StreamingProcessor and LatestFrameReader consume
+    another process's frames without copying them.
+
+    With `every` > 1 the decoder only retrieves every Nth frame (the rest are
+    grab()bed in the decoder); grab() here just advances past them, matching
+    what process_stream does with frame_skip. Returned frames borrow a ring
+    slot until they are garbage.
+    """
+
+    def __init__(self, source, slots: int = 8, every: int = 1, drop_when_full: bool = False,
+                 frame_shape: Optional[Tuple[int, int, int]] = None, open_timeout: float = 30.0,
+                 start_method: Optional[str] = None):
+        if start_method is None:
+            start_method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+        context = mp.get_context(start_method)
+
+        self.source = source
+        self.every = max(1, every)
+        self.open_timeout = open_timeout
+        self.ring = SharedFrameRing(slots, frame_shape or self._probe_shape(source), context)
+        self.position = 0
+        self._pending = None  # frame fetched ahead of the position it belongs to
+        self._retrieved = None
+        self._ended = False
+        self._last_seq = 0
+        self.frames_missed = 0  # published frames the consumer skipped past
+
+        self._process = context.Process(
+            target=_decode_worker, args=(self.ring, source, self.every, drop_when_full),
+            name='frame-decoder', daemon=True
+        )
+        self._process.start()
+
+    @staticmethod
+    def _probe_shape(source) -> Tuple[int, int, int]:
+        """Slot size: the file's own resolution when cheap to read, else 1080p"""
+        if isinstance(source, str) and os.path.isfile(source):
+            cap = cv2.VideoCapture(source)
+            width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            cap.release()
+            if width and height:
+                return height, width, 3
+        return 1080, 1920, 3
+
+    def isOpened(self) -> bool:
+        deadline = time.time() + self.open_timeout
+        while self.ring.state == 'starting' and self._process.is_alive() and time.time() < deadline:
+            time.sleep(0.01)
+        return self.ring.state in ('open', 'ended') and self.ring.info()['width'] > 0
+
+    def _fetch(self) -> Optional[RingFrame]:
+        """Next published frame (None once the decoder has finished or died)"""
+        while not self._ended:
+            try:
+                packet = self.ring.get(timeout=0.5)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._ended = True
+                continue
+            if packet is None:
+                self._ended = True
+                break
+            self._last_seq = packet.seq
+            return packet
+        return None
+
+    def _advance(self) -> Tuple[bool, Optional[RingFrame]]:
+        """Move to the next frame: (frame exists, its packet if the decoder published it)"""
+        self.position += 1
+        if self._pending is None:
+            self._pending = self._fetch()
+        while self._pending is not None and self._pending.frame_number < self.position:
+            self.frames_missed += 1
+            self._pending.release()
+            self._pending = self._fetch()
+
+        if self._pending is not None and self._pending.frame_number == self.position:
+            packet, self._pending = self._pending, None
+            return True, packet
+        if self._pending is not None:
+            return True, None  # decoded but not retrieved by the decoder
+        return self.position <= self.ring.info()['frames_decoded'], None
+
+    def grab(self) -> bool:
+        exists, packet = self._advance()
+        self._retrieved = packet
+        return exists
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        packet, self._retrieved = self._retrieved, None
+        if packet is None:
+            return False, None
+        return True, packet.frame
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        exists, packet = self._advance()
+        if packet is None and self._pending is not None and self.position % self.every == 0:
+            # Dropped by the decoder (live source, reader behind): continue with the next published frame
+            packet, self._pending = self._pending, None
+            self.position = packet.frame_number
+        if packet is None:
+            if exists:
+                logger.warning(f"Frame {self.position} was not retrieved by the decoder (every={self.every})")
+            return False, None
+        return True, packet.frame
+
+    def get(self, prop_id: int) -> float:
+        info = self.ring.info()
+        if prop_id == cv2.CAP_PROP_FPS:
+            return info['fps']
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(info['width'])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(info['height'])
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(info['frame_count'])
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        # Frames arrive in decode order; seeking happens in the decoder or not at all
+        return False
+
+    def release(self):
+        if self.ring.stopped and not self._process.is_alive():
+            return
+        self.ring.stop()
+        self._pending = self._retrieved = None
+        self._process.join(5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(1.0)
+        self.ring.close()
+
+    def stats(self) -> Dict:
+        return {**self.ring.info(), 'slots': self.ring.slots, 'slot_bytes': self.ring.slot_bytes,
+                'last_seq': self._last_seq, 'frames_missed': self.frames_missed}
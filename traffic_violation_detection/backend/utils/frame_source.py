@@ -0,0 +1,296 @@
+import cv2
+import numpy as np
+import os
+import tempfile
+import threading
+import time
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Containers that can be decoded front-to-back without seeking
+PROGRESSIVE_EXTENSIONS = {'mjpeg', 'mjpg', 'ts', 'm2ts', 'mts', 'mp4', 'm4v'}
+MJPEG_EXTENSIONS = {'mjpeg', 'mjpg'}
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+
+
+class GrowingFileReader:
+    """
+    File-like reader that tails a file which is still being written.
+    Setting `failed` (the upload was truncated or rejected) ends reading at once.
+    """
+
+    def __init__(self, path: str, finished: threading.Event,
+                 poll_interval: float = 0.05, idle_timeout: float = 30.0,
+                 failed: Optional[threading.Event] = None):
+        self.path = path
+        self.finished = finished
+        self.failed = failed
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self._file = None
+        self.bytes_read = 0
+
+    @property
+    def aborted(self) -> bool:
+        return self.failed is not None and self.failed.is_set()
+
+    def _open(self) -> bool:
+        """Wait for the file to appear on disk"""
+        started = time.time()
+        while self._file is None:
+            if self.aborted:
+                return False
+            if os.path.exists(self.path):
+                self._file = open(self.path, 'rb')
+                return True
+            if self.finished.is_set() or time.time() - started > self.idle_timeout:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def read(self, size: int = 65536) -> bytes:
+        """
+        Read up to `size` bytes, blocking until data arrives.
+        Returns b'' only once the writer has finished (or went idle too long,
+        or failed).
+        """
+        if self._file is None and not self._open():
+            return b''
+
+        idle_since = time.time()
+        while True:
+            if self.aborted:
+                return b''
+            data = self._file.read(size)
+            if data:
+                self.bytes_read += len(data)
+                return data
+
+            if self.finished.is_set():
+                # Writer is done - drain whatever landed after our last read
+                data = self._file.read(size)
+                self.bytes_read += len(data)
+                return data
+
+            if time.time() - idle_since > self.idle_timeout:
+                logger.warning(f"No new data for {self.idle_timeout}s on {self.path}, giving up")
+                return b''
+
+            time.sleep(self.poll_interval)
+
+    def peek(self, size: int) -> bytes:
+        """Wait until `size` bytes exist (or the writer finishes) and return them without consuming"""
+        started = time.time()
+        while True:
+            if self.aborted:
+                return b''
+            if os.path.exists(self.path):
+                current = os.path.getsize(self.path)
+                if current >= size or self.finished.is_set():
+                    with open(self.path, 'rb') as f:
+                        return f.read(size)
+            elif self.finished.is_set():
+                return b''
+
+            if time.time() - started > self.idle_timeout:
+                return b''
+            time.sleep(self.poll_interval)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def mp4_is_streamable(header: bytes) -> bool:
+    """
+    Check top-level MP4 boxes: the file can be decoded while it grows only if
+    'moov' (or a fragmented 'moof') shows up before the first 'mdat'.
+    """
+    offset = 0
+    while offset + 8 <= len(header):
+        size = int.from_bytes(header[offset:offset + 4], 'big')
+        box_type = header[offset + 4:offset + 8]
+
+        if box_type in (b'moov', b'moof'):
+            return True
+        if box_type == b'mdat':
+            return False
+
+        if size == 1 and offset + 16 <= len(header):
+            size = int.from_bytes(header[offset + 8:offset + 16], 'big')
+        if size < 8:
+            return False
+        offset += size
+
+    return False
+
+
+class ProgressiveCapture:
+    """
+    cv2.VideoCapture-compatible frame source over a file that is still being uploaded.
+
+    MJPEG is parsed directly from the byte stream. Other progressive containers
+    (MPEG-TS, fragmented/faststart MP4) are piped into FFmpeg through a FIFO.
+    Anything else falls back to waiting for the upload to finish.
+    Once `failed` is set the capture stops returning frames.
+    """
+
+    def __init__(self, path: str, finished: threading.Event,
+                 poll_interval: float = 0.05, idle_timeout: float = 30.0,
+                 failed: Optional[threading.Event] = None):
+        self.path = path
+        self.finished = finished
+        self.reader = GrowingFileReader(path, finished, poll_interval, idle_timeout, failed)
+        self.mode = None
+        self._cap = None
+        self._fifo_dir = None
+        self._pump_thread = None
+        self._buffer = b''
+        self._pending = None
+        self._retrieved = None
+        self._eof = False
+        self._frame_size = (0, 0)
+
+        self._open()
+
+    def _open(self):
+        ext = self.path.rsplit('.', 1)[-1].lower() if '.' in self.path else ''
+        header = self.reader.peek(64 * 1024)
+
+        if ext in MJPEG_EXTENSIONS or header.startswith(JPEG_SOI):
+            self.mode = 'mjpeg'
+            self._pending = self._next_jpeg_frame()
+            if self._pending is not None:
+                self._frame_size = (self._pending.shape[1], self._pending.shape[0])
+            return
+
+        progressive = ext in PROGRESSIVE_EXTENSIONS
+        if ext in ('mp4', 'm4v'):
+            progressive = mp4_is_streamable(header)
+
+        if progressive and hasattr(os, 'mkfifo'):
+            self.mode = 'pipe'
+            self._open_pipe()
+        else:
+            # Non-streamable layout (e.g. moov at the end) - needs the whole file
+            logger.info(f"{self.path} is not progressive, waiting for upload to finish")
+            self.mode = 'file'
+            self.finished.wait()
+            if not self.aborted:
+                self._cap = cv2.VideoCapture(self.path)
+
+    def _open_pipe(self):
+        self._fifo_dir = tempfile.mkdtemp(prefix='tvds_fifo_')
+        fifo_path = os.path.join(self._fifo_dir, 'stream')
+        os.mkfifo(fifo_path)
+
+        self._pump_thread = threading.Thread(
+            target=self._pump, args=(fifo_path,), daemon=True
+        )
+        self._pump_thread.start()
+
+        # Blocks until the pump opens the write end, then probes the header
+        self._cap = cv2.VideoCapture(fifo_path, cv2.CAP_FFMPEG)
+
+    def _pump(self, fifo_path: str):
+        """Copy bytes from the growing file into the FIFO as they arrive"""
+        try:
+            with open(fifo_path, 'wb') as fifo:
+                while True:
+                    chunk = self.reader.read()
+                    if not chunk:
+                        break
+                    fifo.write(chunk)
+        except (BrokenPipeError, OSError) as e:
+            logger.debug(f"FIFO pump stopped: {e}")
+        finally:
+            self.reader.close()
+
+    def _next_jpeg_frame(self) -> Optional[np.ndarray]:
+        """Scan the byte stream for the next complete SOI..EOI JPEG and decode it"""
+        while not self._eof:
+            start = self._buffer.find(JPEG_SOI)
+            if start != -1:
+                end = self._buffer.find(JPEG_EOI, start + 2)
+                if end != -1:
+                    jpeg = self._buffer[start:end + 2]
+                    self._buffer = self._buffer[end + 2:]
+                    frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                    if frame is not None:
+                        return frame
+                    continue
+                # Drop garbage before the marker so the buffer doesn't grow
+                self._buffer = self._buffer[start:]
+            else:
+                self._buffer = self._buffer[-1:]
+
+            chunk = self.reader.read()
+            if not chunk:
+                self._eof = True
+                break
+            self._buffer += chunk
+
+        return None
+
+    @property
+    def aborted(self) -> bool:
+        return self.reader.aborted
+
+    def isOpened(self) -> bool:
+        if self.mode == 'mjpeg':
+            return self._pending is not None
+        return self._cap is not None and self._cap.isOpened()
+
+    def grab(self) -> bool:
+        if self.aborted:
+            return False
+        if self.mode != 'mjpeg':
+            return self._cap.grab()
+
+        if self._pending is not None:
+            self._retrieved, self._pending = self._pending, None
+        else:
+            self._retrieved = self._next_jpeg_frame()
+        return self._retrieved is not None
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.mode != 'mjpeg':
+            return self._cap.retrieve()
+        return self._retrieved is not None, self._retrieved
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop_id: int) -> float:
+        if self.mode != 'mjpeg':
+            return self._cap.get(prop_id)
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._frame_size[0])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._frame_size[1])
+        # MJPEG carries no timing or frame count
+        return 0.0
+
+    def set(self, prop_id: int, value: float) -> bool:
+        # A growing stream cannot be seeked
+        return False
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self.reader.close()
+        if self._fifo_dir:
+            try:
+                os.remove(os.path.join(self._fifo_dir, 'stream'))
+                os.rmdir(self._fifo_dir)
+            except OSError:
+                pass
+            self._fifo_dir = None
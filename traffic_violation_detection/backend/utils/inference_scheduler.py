@@ -0,0 +1,293 @@
+import numpy as np
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .realtime_detection import RealtimeDetector
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+PRIORITY_CLASSES = ('live', 'interactive', 'batch')
+
+
+class InferenceScheduler:
+    """
+    Shared batched inference engine for all active sources on a node.
+
+    Sources submit frames and get a Future back. A single scheduler thread
+    assembles batches across sources, drops frames older than each source's
+    max staleness, runs one batched model call and resolves the futures so
+    each source applies its own violation logic.
+
+    Every source belongs to a priority class (live > interactive > batch).
+    Each batch slot goes to the highest-priority class with frames waiting,
+    unless a lower class has received less than its minimum share of the last
+    `share_window` slots; within a class, sources are served by smooth
+    weighted round-robin. Lower classes therefore yield at batch boundaries
+    without ever being starved.
+    """
+
+    def __init__(self, detector: 'RealtimeDetector', max_batch_size: int = 8,
+                 batch_timeout: float = 0.01, default_max_staleness: float = 1.0,
+                 queue_depth: int = 2, class_shares: Optional[Dict[str, float]] = None,
+                 share_window: int = 64):
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+        self.default_max_staleness = default_max_staleness
+        self.queue_depth = queue_depth
+        self.class_shares = class_shares or {'live': 0.6, 'interactive': 0.3, 'batch': 0.1}
+        self.share_window = share_window
+
+        self._served = deque()  # class of each of the last `share_window` slots
+        self._window_counts = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.class_served = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.class_yielded = {priority: 0 for priority in PRIORITY_CLASSES}  # slots lost to a higher class
+
+        self.sources = {}
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self.batches_run = 0
+        self.frames_inferred = 0
+        self.inference_time = 0.0
+
+    def register_source(self, source_id: str, weight: int = 1,
+                        max_staleness: Optional[float] = None, priority: str = 'live'):
+        """
+        Add a source with a scheduling weight, priority class and staleness
+        deadline (seconds). Only live sources drop stale frames by default;
+        interactive and batch jobs need every frame they submit.
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f'Unknown priority class: {priority}')
+        if max_staleness is None and priority == 'live':
+            max_staleness = self.default_max_staleness
+
+        with self._cond:
+            self.sources[source_id] = {
+                'weight': max(1, int(weight)),
+                'priority': priority,
+                'max_staleness': max_staleness,
+                'queue': deque(),
+                'current_weight': 0,
+                'submitted': 0,
+                'inferred': 0,
+                'dropped_stale': 0,
+                'dropped_overflow': 0
+            }
+
+    def unregister_source(self, source_id: str):
+        with self._cond:
+            source = self.sources.pop(source_id, None)
+        if source:
+            for item in source['queue']:
+                item['future'].set_result(None)
+
+    def submit(self, source_id: str, frame: np.ndarray,
+               captured_at: Optional[float] = None) -> Future:
+        """
+        Queue a frame for batched inference.
+        The future resolves to a detection list, or None if the frame was dropped.
+        """
+        future = Future()
+        item = {
+            'frame': frame,
+            'captured_at': captured_at or time.time(),
+            'future': future
+        }
+
+        with self._cond:
+            source = self.sources.get(source_id)
+            if source is None or not self._running:
+                future.set_result(None)
+                return future
+
+            source['submitted'] += 1
+            # Bounded per-source queue: the oldest pending frame gives way
+            if len(source['queue']) >= self.queue_depth:
+                dropped = source['queue'].popleft()
+                dropped['future'].set_result(None)
+                source['dropped_overflow'] += 1
+
+            source['queue'].append(item)
+            self._cond.notify()
+
+        return future
+
+    def start(self):
+        """Start the scheduler thread (safe to call from concurrent requests)"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+            self._thread.start()
+        logger.info(f"✓ Inference scheduler started (batch size {self.max_batch_size})")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(5.0)
+
+    def _pending_count(self) -> int:
+        return sum(len(source['queue']) for source in self.sources.values())
+
+    def _drop_stale(self, now: float):
+        """Resolve frames that missed their source's staleness deadline"""
+        for source in self.sources.values():
+            queue = source['queue']
+            if source['max_staleness'] is None:
+                continue
+            while queue and now - queue[0]['captured_at'] > source['max_staleness']:
+                queue.popleft()['future'].set_result(None)
+                source['dropped_stale'] += 1
+
+    def _pick_class(self) -> Optional[str]:
+        """Highest-priority class with pending frames, unless a lower one is below its minimum share"""
+        waiting = [priority for priority in PRIORITY_CLASSES
+                   if any(s['queue'] for s in self.sources.values() if s['priority'] == priority)]
+        if not waiting:
+            return None
+
+        window = max(1, len(self._served))
+        chosen = waiting[0]
+        for priority in waiting:
+            if self._window_counts[priority] < self.class_shares.get(priority, 0.0) * window:
+                chosen = priority
+                break
+
+        for priority in waiting:
+            if PRIORITY_CLASSES.index(priority) > PRIORITY_CLASSES.index(chosen):
+                self.class_yielded[priority] += 1
+        return chosen
+
+    def _record_slot(self, priority: str):
+        self._served.append(priority)
+        self._window_counts[priority] += 1
+        if len(self._served) > self.share_window:
+            self._window_counts[self._served.popleft()] -= 1
+        self.class_served[priority] += 1
+
+    def _pick_source(self, priority: str) -> Optional[str]:
+        """Smooth weighted round-robin over a class's sources that have pending frames"""
+        eligible = [(sid, s) for sid, s in self.sources.items()
+                    if s['queue'] and s['priority'] == priority]
+        if not eligible:
+            return None
+
+        total = 0
+        best_id, best = None, None
+        for source_id, source in eligible:
+            source['current_weight'] += source['weight']
+            total += source['weight']
+            if best is None or source['current_weight'] > best['current_weight']:
+                best_id, best = source_id, source
+
+        best['current_weight'] -= total
+        return best_id
+
+    def _collect_batch(self) -> List[Dict]:
+        with self._cond:
+            while self._running and self._pending_count() == 0:
+                self._cond.wait(0.5)
+            if not self._running:
+                return []
+
+            # Give other sources a brief chance to fill the batch (pointless
+            # when every source already has a frame queued)
+            if (self._pending_count() < self.max_batch_size and
+                    any(not source['queue'] for source in self.sources.values())):
+                self._cond.wait(self.batch_timeout)
+
+            self._drop_stale(time.time())
+
+            batch = []
+            while len(batch) < self.max_batch_size:
+                priority = self._pick_class()
+                if priority is None:
+                    break
+                source_id = self._pick_source(priority)
+                item = self.sources[source_id]['queue'].popleft()
+                item['source_id'] = source_id
+                batch.append(item)
+                self._record_slot(priority)
+
+            return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            started = time.time()
+            results = self.detector.detect_vehicles_batch([item['frame'] for item in batch])
+            elapsed = time.time() - started
+
+            self.batches_run += 1
+            self.frames_inferred += len(batch)
+            self.inference_time += elapsed
+
+            for item, detections in zip(batch, results):
+                source = self.sources.get(item['source_id'])
+                if source is not None:
+                    source['inferred'] += 1
+                item['future'].set_result(detections)
+
+        # Release anyone still waiting
+        with self._cond:
+            for source in self.sources.values():
+                while source['queue']:
+                    source['queue'].popleft()['future'].set_result(None)
+
+    def source_stats(self, source_id: str) -> Dict:
+        with self._cond:
+            source = self.sources.get(source_id)
+            if source is None:
+                return {}
+            return {
+                'weight': source['weight'],
+                'priority': source['priority'],
+                'max_staleness': source['max_staleness'],
+                'queued': len(source['queue']),
+                'submitted': source['submitted'],
+                'inferred': source['inferred'],
+                'dropped_stale': source['dropped_stale'],
+                'dropped_overflow': source['dropped_overflow']
+            }
+
+    def class_stats(self) -> Dict:
+        with self._cond:
+            return {
+                priority: {
+                    'min_share': self.class_shares.get(priority, 0.0),
+                    'sources': sum(1 for s in self.sources.values() if s['priority'] == priority),
+                    'queued': sum(len(s['queue']) for s in self.sources.values() if s['priority'] == priority),
+                    'served': self.class_served[priority],
+                    'recent_share': round(self._window_counts[priority] / len(self._served), 3) if self._served else 0.0,
+                    'yielded': self.class_yielded[priority]
+                }
+                for priority in PRIORITY_CLASSES
+            }
+
+    def stats(self) -> Dict:
+        return {
+            'running': self._running,
+            'max_batch_size': self.max_batch_size,
+            'batches_run': self.batches_run,
+            'frames_inferred': self.frames_inferred,
+            'avg_batch_size': round(self.frames_inferred / self.batches_run, 2) if self.batches_run else 0,
+            'avg_batch_ms': round(1000 * self.inference_time / self.batches_run, 2) if self.batches_run else 0,
+            'classes': self.class_stats(),
+            'sources': {source_id: self.source_stats(source_id) for source_id in list(self.sources)}
+        }
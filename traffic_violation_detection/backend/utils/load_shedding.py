@@ -0,0 +1,124 @@
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Applied cumulatively, in this order, while the latency SLO is breached
+SHED_LEVELS = ('none', 'drop_frames', 'no_annotation', 'reduced_resolution', 'deferred_ocr')
+
+
+class LoadShedder:
+    """
+    Latency-SLO controller for one live source.
+
+    Tracks an exponentially weighted average of capture-to-result latency.
+    While it stays above `slo` for `breach_frames` processed frames, shedding
+    escalates one level; once it has stayed below `recover_ratio * slo` for
+    `recover_frames` frames it steps back down one level. Levels:
+
+    1. drop_frames: skip frames already older than the SLO and analyze only
+       every `drop_stride`-th fresh frame
+    2. no_annotation: stop feeding the annotated-output writer
+    3. reduced_resolution: detect at `reduced_size` instead of the normal size
+    4. deferred_ocr: only violators get OCR, and not until latency recovers
+       (or the read has waited too long, see StreamingProcessor.ocr_defer_max_frames)
+    """
+
+    def __init__(self, slo: float, drop_stride: int = 2, reduced_size: Tuple[int, int] = (480, 360),
+                 breach_frames: int = 3, recover_frames: int = 30, recover_ratio: float = 0.7,
+                 alpha: float = 0.3):
+        self.slo = slo
+        self.drop_stride = max(1, drop_stride)
+        self.reduced_size = tuple(reduced_size)
+        self.breach_frames = breach_frames
+        self.recover_frames = recover_frames
+        self.recover_ratio = recover_ratio
+        self.alpha = alpha
+
+        self.level = 0
+        self.latency = None  # EWMA, seconds
+        self._over = 0
+        self._under = 0
+        self._admitted = 0
+        self.level_since = time.time()
+
+        self.escalations = 0
+        self.recoveries = 0
+        self.entered = {name: 0 for name in SHED_LEVELS[1:]}  # times each level was reached
+        self.frames_shed_stale = 0
+        self.frames_shed_stride = 0
+        self.frames_unannotated = 0
+        self.frames_reduced = 0
+
+    @property
+    def level_name(self) -> str:
+        return SHED_LEVELS[self.level]
+
+    def at_least(self, name: str) -> bool:
+        return self.level >= SHED_LEVELS.index(name)
+
+    def admit(self, frame_age: float) -> bool:
+        """Whether a freshly dequeued frame should be analyzed at all"""
+        if not self.at_least('drop_frames'):
+            return True
+        if frame_age > self.slo:
+            self.frames_shed_stale += 1
+            return False
+        self._admitted += 1
+        if self._admitted % self.drop_stride:
+            self.frames_shed_stride += 1
+            return False
+        return True
+
+    def frame_size(self, normal: Tuple[int, int]) -> Tuple[int, int]:
+        return self.reduced_size if self.at_least('reduced_resolution') else normal
+
+    def observe(self, latency: float) -> Optional[str]:
+        """Feed one processed frame's latency; returns the new level name when it changed"""
+        if self.at_least('no_annotation'):
+            self.frames_unannotated += 1
+        if self.at_least('reduced_resolution'):
+            self.frames_reduced += 1
+
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+
+        if self.latency > self.slo:
+            self._over += 1
+            self._under = 0
+        elif self.latency < self.recover_ratio * self.slo:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.breach_frames and self.level < len(SHED_LEVELS) - 1:
+            self.level += 1
+            self.escalations += 1
+            self.entered[self.level_name] += 1
+        elif self._under >= self.recover_frames and self.level > 0:
+            self.level -= 1
+            self.recoveries += 1
+        else:
+            return None
+
+        # Give the new level a full observation window before judging it
+        self._over = self._under = 0
+        self.level_since = time.time()
+        return self.level_name
+
+    def stats(self) -> Dict:
+        return {
+            'slo_ms': round(1000 * self.slo, 1),
+            'latency_ewma_ms': round(1000 * self.latency, 1) if self.latency is not None else None,
+            'level': self.level,
+            'level_name': self.level_name,
+            'level_for_s': round(time.time() - self.level_since, 1),
+            'escalations': self.escalations,
+            'recoveries': self.recoveries,
+            'entered': dict(self.entered),
+            'frames_shed_stale': self.frames_shed_stale,
+            'frames_shed_stride': self.frames_shed_stride,
+            'frames_unannotated': self.frames_unannotated,
+            'frames_reduced': self.frames_reduced
+        }
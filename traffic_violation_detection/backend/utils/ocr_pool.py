@@ -0,0 +1,280 @@
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+import logging
+import numpy as np
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _ocr_worker(shm_name: str, slot_bytes: int, requests, results, settings: Dict,
+                cpus: Optional[List[int]] = None):
+    """
+    Worker process: owns one EasyOCR reader and reads crops out of the shared
+    memory slots named in each request.
+    """
+    import easyocr
+    from .realtime_detection import read_plate
+    from .resources import limit_threads
+
+    effective = limit_threads(settings['torch_threads'], cpus, cv2_threads=1)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    reader = easyocr.Reader(['en'], gpu=settings['use_gpu'], verbose=False)
+    results.put(('ready', None, effective))
+
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+
+        request_id, slot, shape, inline, localized = item
+        if inline is None:
+            size = int(np.prod(shape))
+            image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf[slot * slot_bytes:slot * slot_bytes + size])
+        else:
+            image = inline
+
+        stats = {'recognize_only': 0, 'fallbacks': 0, 'readtext': 0}
+        plate = read_plate(reader, image, localized, settings['ocr'], stats)
+        del image  # release the view before the slot is reused
+        results.put((request_id, plate, stats))
+
+    shm.close()
+
+
+class OCRWorkerPool:
+    """
+    Plate OCR in separate processes, so EasyOCR no longer competes with YOLO
+    for the GIL and the torch thread pool.
+
+    submit() copies the crop into a free shared-memory slot (crops larger
+    than a slot are pickled instead), queues the request to the worker with
+    the fewest requests outstanding and returns a Future immediately. A
+    collector thread resolves futures as workers answer. If a worker dies,
+    its outstanding requests resolve to an empty plate and their slots are
+    freed; if no slot frees up within `slot_timeout`, submit() gives up on
+    that crop the same way instead of blocking the detection thread.
+
+    `cpu_sets` optionally pins worker i to cpu_sets[i]. Workers are forked
+    where the platform allows it: a spawned worker would re-import the app's
+    main module. Create the pool before the detector loads its models, so
+    the workers inherit neither the models nor any torch/OpenMP threads.
+    """
+
+    def __init__(self, num_workers: int = 2, ocr_settings: Optional[Dict] = None,
+                 use_gpu: bool = False, slots: int = 64, slot_bytes: int = 256 * 1024,
+                 torch_threads: int = 1, cpu_sets: Optional[List[List[int]]] = None,
+                 start_method: Optional[str] = None, slot_timeout: float = 5.0):
+        self.num_workers = num_workers
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.slot_timeout = slot_timeout
+
+        if start_method is None:
+            start_method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+        context = mp.get_context(start_method)
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self._requests = [context.Queue() for _ in range(num_workers)]  # one per worker
+        self._results = context.Queue()
+        self._free_slots = queue.Queue()
+        for slot in range(slots):
+            self._free_slots.put(slot)
+
+        self._pending = {}  # request_id -> (future, slot, worker index)
+        self._outstanding = [0] * num_workers
+        self._alive = [True] * num_workers
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False  # no new requests (close() called or every worker died)
+        self._released = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.inline = 0
+        self.slot_timeouts = 0
+        self.failed_requests = 0  # outstanding on a worker that died
+        self.worker_deaths = 0
+        self.ocr_stats = {'recognize_only': 0, 'fallbacks': 0, 'readtext': 0}
+        self.ready_workers = 0
+        self.worker_threads = []  # effective thread settings reported by each worker
+
+        settings = {
+            'use_gpu': use_gpu,
+            'torch_threads': torch_threads,
+            'ocr': ocr_settings or {'recognition_only': True, 'allowlist': None,
+                                    'min_confidence': 0.5, 'plate_height': 64}
+        }
+        self._workers = [
+            context.Process(
+                target=_ocr_worker,
+                args=(self._shm.name, slot_bytes, self._requests[i], self._results, settings,
+                      cpu_sets[i] if cpu_sets else None),
+                name=f'ocr-worker-{i}', daemon=True
+            )
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._collector = threading.Thread(target=self._collect, name='ocr-collector', daemon=True)
+        self._collector.start()
+        logger.info(f"✓ OCR worker pool started: {num_workers} processes, {slots} x {slot_bytes // 1024}KB slots")
+
+    def submit(self, plate_image: np.ndarray, localized: bool = False) -> Future:
+        """Queue one crop for OCR; the Future resolves to {'text', 'conf'}"""
+        future = Future()
+        if self._closed or plate_image is None or plate_image.size == 0:
+            future.set_result({'text': '', 'conf': 0.0})
+            return future
+
+        image = np.ascontiguousarray(plate_image, dtype=np.uint8)
+        request_id = next(self._ids)
+        slot, inline = None, None
+
+        if image.nbytes <= self.slot_bytes:
+            slot = self._acquire_slot()  # backpressure once every slot is in flight
+            if slot is None:
+                with self._lock:
+                    self.slot_timeouts += 1
+                future.set_result({'text': '', 'conf': 0.0})
+                return future
+            offset = slot * self.slot_bytes
+            self._shm.buf[offset:offset + image.nbytes] = image.reshape(-1).data
+        else:
+            inline = image
+            with self._lock:
+                self.inline += 1
+
+        with self._lock:
+            alive = [i for i in range(self.num_workers) if self._alive[i]]
+            if alive:
+                worker = min(alive, key=lambda i: self._outstanding[i])
+                self._outstanding[worker] += 1
+                self._pending[request_id] = (future, slot, worker)
+                self.submitted += 1
+        if not alive:
+            if slot is not None:
+                self._free_slots.put(slot)
+            future.set_result({'text': '', 'conf': 0.0})
+            return future
+        self._requests[worker].put((request_id, slot, image.shape, inline, localized))
+        return future
+
+    def _acquire_slot(self) -> Optional[int]:
+        """Free slot, or None after `slot_timeout` (or once the pool is closed)"""
+        deadline = time.time() + self.slot_timeout
+        while not self._closed:
+            try:
+                return self._free_slots.get(timeout=max(0.0, min(0.5, deadline - time.time())))
+            except queue.Empty:
+                if time.time() >= deadline:
+                    logger.warning(f"No free OCR slot within {self.slot_timeout}s, skipping plate")
+                    return None
+        return None
+
+    def _collect(self):
+        next_check = time.time() + 0.5
+        while True:
+            if time.time() >= next_check:
+                next_check = time.time() + 0.5
+                if not self._closed and not self._check_workers():
+                    logger.error("All OCR workers exited, failing pending requests")
+                    self._closed = True
+                    self._fail_pending()
+                    break
+            try:
+                request_id, plate, stats = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    break
+                continue
+            except (EOFError, OSError):
+                break
+
+            if request_id == 'ready':
+                self.ready_workers += 1
+                self.worker_threads.append(stats)
+                continue
+
+            with self._lock:
+                future, slot, worker = self._pending.pop(request_id, (None, None, None))
+                if worker is not None:
+                    self._outstanding[worker] -= 1
+                self.completed += 1
+                for key, value in stats.items():
+                    self.ocr_stats[key] += value
+
+            if slot is not None:
+                self._free_slots.put(slot)
+            if future is not None:
+                future.set_result(plate)
+
+    def _check_workers(self) -> bool:
+        """Fail the requests of workers that died since the last check; False once none is left"""
+        for i, process in enumerate(self._workers):
+            if not self._alive[i] or process.is_alive():
+                continue
+            with self._lock:
+                self._alive[i] = False
+                self._outstanding[i] = 0
+                lost = [request_id for request_id, entry in self._pending.items() if entry[2] == i]
+                entries = [self._pending.pop(request_id) for request_id in lost]
+                self.worker_deaths += 1
+                self.failed_requests += len(entries)
+            logger.error(f"OCR worker {i} exited (code {process.exitcode}), "
+                         f"failing its {len(entries)} outstanding requests")
+            for future, slot, _ in entries:
+                if slot is not None:
+                    self._free_slots.put(slot)
+                if not future.done():
+                    future.set_result({'text': '', 'conf': 0.0})
+        return any(self._alive)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers; requests still pending resolve to an empty plate"""
+        if self._released:
+            return
+        self._closed = True
+        self._released = True
+        for requests in self._requests:
+            requests.put(None)
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            worker.join(max(0.1, deadline - time.time()))
+            if worker.is_alive():
+                worker.terminate()
+        self._collector.join(timeout)
+
+        self._fail_pending()
+        self._shm.close()
+        self._shm.unlink()
+
+    def _fail_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _, _ in pending.values():
+            if not future.done():
+                future.set_result({'text': '', 'conf': 0.0})
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._pending)
+        return {
+            'workers': self.num_workers,
+            'ready_workers': self.ready_workers,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'in_flight': in_flight,
+            'inline': self.inline,
+            'slot_timeouts': self.slot_timeouts,
+            'worker_deaths': self.worker_deaths,
+            'failed_requests': self.failed_requests,
+            'free_slots': self._free_slots.qsize(),
+            **self.ocr_stats
+        }
@@ -0,0 +1,224 @@
+import re
+import threading
+import time
+import logging
+from array import array
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters OCR routinely mistakes for each other on plates
+CONFUSION_GROUPS = ['O0DQ', 'B8', 'I1L', 'S5', 'Z2', 'G6', 'A4']
+
+CANONICAL = {}
+for group in CONFUSION_GROUPS:
+    for char in group:
+        CANONICAL[char] = group[0]
+
+CONFUSION_COST = 0.5  # substitution within a confusion group
+EDIT_COST = 1.0  # any other substitution, insertion or deletion
+
+NGRAM = 3
+PAD = '^'  # start/end padding so short plates still produce grams
+
+_CLEAN_RE = re.compile(r'[^A-Z0-9]')
+
+
+def normalize_plate(text: str) -> str:
+    """Upper-case and strip spaces/dashes/punctuation"""
+    return _CLEAN_RE.sub('', (text or '').upper())
+
+
+def canonical_plate(plate: str) -> str:
+    """Collapse every confusion group to one representative (O/0/D/Q -> O, B/8 -> B ...)"""
+    return ''.join(CANONICAL.get(char, char) for char in plate)
+
+
+def substitution_cost(a: str, b: str) -> float:
+    if a == b:
+        return 0.0
+    if CANONICAL.get(a, a) == CANONICAL.get(b, b):
+        return CONFUSION_COST
+    return EDIT_COST
+
+
+def ocr_distance(query: str, plate: str, partial: bool = False,
+                 cutoff: Optional[float] = None) -> float:
+    """
+    Weighted edit distance where OCR-confusable substitutions are cheap.
+    With `partial`, the query may match anywhere inside the plate
+    (leading/trailing plate characters are free). Stops early and returns
+    infinity once the distance is certain to exceed `cutoff`.
+    """
+    prev = [0.0] * (len(plate) + 1) if partial else [j * EDIT_COST for j in range(len(plate) + 1)]
+
+    for i, q_char in enumerate(query, 1):
+        curr = [i * EDIT_COST]
+        for j, p_char in enumerate(plate, 1):
+            curr.append(min(
+                prev[j] + EDIT_COST,  # query char missing from plate
+                curr[j - 1] + EDIT_COST,  # extra plate char
+                prev[j - 1] + substitution_cost(q_char, p_char)
+            ))
+        prev = curr
+        if cutoff is not None and min(prev) > cutoff:
+            return float('inf')
+
+    return min(prev) if partial else prev[-1]
+
+
+def plate_grams(canonical: str, padded: bool = True) -> set:
+    text = PAD * (NGRAM - 1) + canonical + PAD * (NGRAM - 1) if padded else canonical
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class PlateIndex:
+    """
+    Incremental fuzzy search index over recorded plates.
+
+    Plates are canonicalized (confusion groups collapsed) and indexed by
+    character trigrams. A search pulls candidates that share enough trigrams
+    with the query (q-gram lemma), then ranks them with the OCR-aware
+    edit distance. Only distinct plates are indexed; per-plate counts and the
+    latest violation id point back into the violation store.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.plates = []  # plate_id -> plate text
+        self.plate_ids = {}  # plate text -> plate_id
+        self.counts = array('I')
+        self.last_seen = array('d')
+        self.last_violation_id = array('q')
+        self.postings = defaultdict(lambda: array('I'))
+        self.applied_upto = 0  # store rows with id <= this are already indexed
+        self.ready = False
+
+    def __len__(self):
+        return len(self.plates)
+
+    def add(self, plate: str, count: int = 1, seen_at: float = 0.0, violation_id: int = 0):
+        """Index one plate occurrence (or `count` of them)"""
+        plate = normalize_plate(plate)
+        if not plate:
+            return
+
+        with self.lock:
+            plate_id = self.plate_ids.get(plate)
+            if plate_id is None:
+                plate_id = len(self.plates)
+                self.plates.append(plate)
+                self.plate_ids[plate] = plate_id
+                self.counts.append(0)
+                self.last_seen.append(0.0)
+                self.last_violation_id.append(0)
+                for gram in plate_grams(canonical_plate(plate)):
+                    self.postings[gram].append(plate_id)
+
+            self.counts[plate_id] += count
+            if seen_at >= self.last_seen[plate_id]:
+                self.last_seen[plate_id] = seen_at
+            if violation_id > self.last_violation_id[plate_id]:
+                self.last_violation_id[plate_id] = violation_id
+
+    def on_rows_written(self, rows: List[tuple]):
+        """ViolationStore listener: rows are (id, ts, camera_id, job_id, plate, ...)"""
+        with self.lock:
+            for row in rows:
+                violation_id, ts, plate = row[0], row[1], row[4]
+                if violation_id > self.applied_upto and plate:
+                    self.add(plate, seen_at=ts, violation_id=violation_id)
+
+    def attach(self, store, background: bool = True):
+        """
+        Load existing plates from `store` and follow its new writes.
+        The bulk load builds a separate index and swaps it in, so searches and
+        the store's writer are never blocked for the duration of the load.
+        """
+        def load():
+            started = time.time()
+            with self.lock:
+                # Rows committed up to `boundary` come from the bulk load; newer
+                # ones reach the listener, which skips ids <= applied_upto
+                store.add_listener(self.on_rows_written)
+                conn = store._reader()
+                boundary = conn.execute('SELECT COALESCE(MAX(id), 0) FROM violations').fetchone()[0]
+                self.applied_upto = boundary
+
+            loaded = PlateIndex()
+            for plate, count, seen_at, last_id in conn.execute(
+                'SELECT plate, COUNT(*), MAX(ts), MAX(id) FROM violations '
+                'WHERE plate IS NOT NULL AND id <= ? GROUP BY plate',
+                (boundary,)
+            ):
+                loaded.add(plate, count=count, seen_at=seen_at, violation_id=last_id)
+
+            with self.lock:
+                # Fold in what the listener indexed meanwhile, then swap
+                for plate_id, plate in enumerate(self.plates):
+                    loaded.add(plate, count=self.counts[plate_id], seen_at=self.last_seen[plate_id],
+                               violation_id=self.last_violation_id[plate_id])
+                self.plates = loaded.plates
+                self.plate_ids = loaded.plate_ids
+                self.counts = loaded.counts
+                self.last_seen = loaded.last_seen
+                self.last_violation_id = loaded.last_violation_id
+                self.postings = loaded.postings
+                self.ready = True
+            logger.info(f"✓ Plate index loaded: {len(self)} plates in {time.time() - started:.1f}s")
+
+        if background:
+            threading.Thread(target=load, name='plate-index-load', daemon=True).start()
+        else:
+            load()
+
+    def search(self, query: str, max_distance: float = 2.0, limit: int = 20,
+               partial: bool = False) -> List[Dict]:
+        """
+        Ranked plates within `max_distance` of `query`.
+        `partial` matches the query anywhere inside a plate (e.g. a half-read plate).
+        """
+        query = normalize_plate(query)
+        if not query:
+            return []
+
+        query_grams = plate_grams(canonical_plate(query), padded=not partial)
+        results = []
+        with self.lock:  # plate ids are only valid against one version of the index
+            if not query_grams:
+                # Query shorter than one gram - fall back to a scan
+                candidate_ids = range(len(self.plates))
+            else:
+                # Each non-confusion edit destroys at most NGRAM grams
+                min_shared = max(1, len(query_grams) - NGRAM * int(max_distance))
+                shared = Counter(chain.from_iterable(
+                    self.postings[gram] for gram in query_grams if gram in self.postings
+                ))
+                candidate_ids = [pid for pid, n in shared.items() if n >= min_shared]
+
+            for plate_id in candidate_ids:
+                plate = self.plates[plate_id]
+                if not partial and abs(len(plate) - len(query)) > max_distance:
+                    continue
+                distance = ocr_distance(query, plate, partial=partial, cutoff=max_distance)
+                if distance <= max_distance:
+                    results.append({
+                        'plate': plate,
+                        'distance': distance,
+                        'count': self.counts[plate_id],
+                        'last_seen': self.last_seen[plate_id],
+                        'last_violation_id': self.last_violation_id[plate_id]
+                    })
+
+        results.sort(key=lambda r: (r['distance'], -r['count'], -r['last_seen']))
+        return results[:limit]
+
+    def stats(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'plates': len(self.plates),
+            'grams': len(self.postings),
+            'applied_upto': self.applied_upto
+        }
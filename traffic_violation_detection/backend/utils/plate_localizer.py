@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+import threading
+import logging
+from ultralytics import YOLO
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAD_VALUE = 114  # same grey YOLO letterboxes with
+
+
+def letterbox_crop(crop: np.ndarray, size: int) -> Tuple[np.ndarray, float]:
+    """Scale the longer side to `size` and pad bottom/right to a square"""
+    height, width = crop.shape[:2]
+    scale = size / max(height, width)
+    resized = cv2.resize(crop, (max(1, round(width * scale)), max(1, round(height * scale))))
+    padded = cv2.copyMakeBorder(
+        resized, 0, size - resized.shape[0], 0, size - resized.shape[1],
+        cv2.BORDER_CONSTANT, value=(PAD_VALUE, PAD_VALUE, PAD_VALUE)
+    )
+    return padded, scale
+
+
+class PlateLocalizer:
+    """
+    Dedicated license-plate detector run on vehicle crops.
+
+    All vehicle crops of a frame (or of several frames) are letterboxed to one
+    square size and sent through the plate model in a single call, instead of
+    one model call per vehicle. Plate boxes are returned in frame coordinates.
+    """
+
+    def __init__(self, model_path: str, crop_size: int = 320, conf_threshold: float = 0.25,
+                 max_batch: int = 32, plate_classes: Optional[Sequence[int]] = None):
+        self.model = YOLO(model_path)
+        self.model_path = model_path
+        self.crop_size = crop_size
+        self.conf_threshold = conf_threshold
+        self.max_batch = max_batch
+        self.plate_classes = set(plate_classes) if plate_classes is not None else None  # None = any class
+        self.lock = threading.Lock()
+
+        self.calls = 0
+        self.crops = 0
+        self.found = 0
+        logger.info(f"✓ Plate localizer loaded from {model_path}")
+
+    def localize(self, frame: np.ndarray, vehicle_boxes: List[Tuple]) -> List[Optional[Dict]]:
+        """Best plate box per vehicle in one frame (None where no plate was found)"""
+        return self.localize_batch([frame], [vehicle_boxes])[0]
+
+    def localize_batch(self, frames: List[np.ndarray],
+                       boxes_per_frame: List[List[Tuple]]) -> List[List[Optional[Dict]]]:
+        """Plates for every vehicle of every frame, batched across frames"""
+        results = [[None] * len(boxes) for boxes in boxes_per_frame]
+        crops, index = [], []
+
+        for frame_index, (frame, boxes) in enumerate(zip(frames, boxes_per_frame)):
+            height, width = frame.shape[:2]
+            for vehicle_index, (x1, y1, x2, y2) in enumerate(boxes):
+                x1, y1 = max(0, int(x1)), max(0, int(y1))
+                x2, y2 = min(width, int(x2)), min(height, int(y2))
+                if x2 <= x1 or y2 <= y1:
+                    continue
+                padded, scale = letterbox_crop(frame[y1:y2, x1:x2], self.crop_size)
+                crops.append(padded)
+                index.append((frame_index, vehicle_index, x1, y1, x2, y2, scale))
+
+        for start in range(0, len(crops), self.max_batch):
+            chunk = crops[start:start + self.max_batch]
+            try:
+                with self.lock:
+                    predictions = self.model(chunk, conf=self.conf_threshold,
+                                             imgsz=self.crop_size, verbose=False)
+            except Exception as e:
+                logger.error(f"Plate localization error: {e}")
+                continue
+            self.calls += 1
+            self.crops += len(chunk)
+
+            for prediction, entry in zip(predictions, index[start:start + self.max_batch]):
+                plate = self._best_plate(prediction, entry)
+                if plate is not None:
+                    frame_index, vehicle_index = entry[0], entry[1]
+                    results[frame_index][vehicle_index] = plate
+                    self.found += 1
+
+        return results
+
+    def _best_plate(self, prediction, entry) -> Optional[Dict]:
+        """Highest-confidence plate box, mapped back into frame coordinates"""
+        if prediction.boxes is None:
+            return None
+        _, _, ox1, oy1, ox2, oy2, scale = entry
+
+        best = None
+        for box in prediction.boxes:
+            conf = float(box.conf[0])
+            if self.plate_classes is not None and int(box.cls[0]) not in self.plate_classes:
+                continue
+            if best is not None and conf <= best['conf']:
+                continue
+
+            px1, py1, px2, py2 = box.xyxy[0].cpu().numpy()
+            bbox = (
+                int(min(ox2, ox1 + px1 / scale)), int(min(oy2, oy1 + py1 / scale)),
+                int(min(ox2, ox1 + px2 / scale)), int(min(oy2, oy1 + py2 / scale))
+            )
+            if bbox[2] - bbox[0] < 2 or bbox[3] - bbox[1] < 2:
+                continue  # box fell in the letterbox padding
+            best = {'bbox': bbox, 'conf': conf}
+
+        return best
+
+    def stats(self) -> Dict:
+        return {
+            'model': self.model_path,
+            'calls': self.calls,
+            'crops': self.crops,
+            'plates_found': self.found
+        }
@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+import os
 from ultralytics import YOLO
 import easyocr
 from typing import Tuple, List, Dict, Optional
@@ -7,22 +8,103 @@ import logging
 import threading
 from queue import Queue
 import time
+from collections import deque
+from concurrent.futures import Future
+
+from .result_sink import ResultSink
+from .plate_localizer import PlateLocalizer
+from .plate_filter import PlatePreFilter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROCESSING_SIZE = (640, 480)  # (width, height) frames are resized to for detection
+
+def normalize_plate_crop(gray: np.ndarray, height: int = 64) -> np.ndarray:
+    """Scale a grayscale plate crop to the recognizer's input height, keeping aspect"""
+    h, w = gray.shape[:2]
+    width = max(height, int(round(w * height / h)))
+    interpolation = cv2.INTER_CUBIC if h < height else cv2.INTER_AREA
+    return cv2.resize(gray, (width, height), interpolation=interpolation)
+
+
+def _join_ocr_results(results) -> Dict:
+    """EasyOCR (bbox, text, conf) tuples -> one plate string with mean confidence"""
+    if not results:
+        return {'text': '', 'conf': 0.0}
+    text = ''.join(result[1] for result in results).strip()
+    conf = float(np.mean([result[2] for result in results]))
+    return {'text': text, 'conf': round(conf, 3)}
+
+
+def read_plate(reader, plate_image: np.ndarray, localized: bool, settings: Dict,
+               stats: Optional[Dict] = None) -> Dict:
+    """
+    OCR one plate crop with an EasyOCR reader (shared by RealtimeDetector and
+    the OCR worker processes). `settings` is RealtimeDetector.ocr_settings().
+    """
+    stats = stats if stats is not None else {'recognize_only': 0, 'fallbacks': 0, 'readtext': 0}
+    
+    try:
+        # Preprocess
+        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY) if plate_image.ndim == 3 else plate_image
+        recognition_only = localized and settings['recognition_only']
+        
+        if recognition_only:
+            normalized = normalize_plate_crop(gray, settings['plate_height'])
+            results = reader.recognize(normalized, detail=1, allowlist=settings['allowlist'])
+            plate = _join_ocr_results(results)
+            if plate['text'] and plate['conf'] >= settings['min_confidence']:
+                stats['recognize_only'] += 1
+                return plate
+            stats['fallbacks'] += 1
+        
+        _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+        
+        # Run OCR (text detection + recognition)
+        results = reader.readtext(thresh, detail=1, allowlist=settings['allowlist'])
+        stats['readtext'] += 1
+        
+        fallback = _join_ocr_results(results)
+        if recognition_only and plate['conf'] > fallback['conf']:
+            return plate
+        return fallback
+    
+    except Exception as e:
+        logger.error(f"OCR error: {e}")
+        return {'text': '', 'conf': 0.0}
+
+
 class RealtimeDetector:
     """Optimized real-time vehicle & license plate detection"""
     
-    def __init__(self, model_path: str = 'yolov8n.pt', use_gpu: bool = False):
+    def __init__(self, model_path: str = 'yolov8n.pt', use_gpu: bool = False,
+                 plate_model_path: Optional[str] = None):
         """Initialize with optimizations for real-time processing"""
         # Initialize all attributes first to ensure they always exist
         self.model = None
         self.reader = None
+        self.plate_localizer = None
+        # Classical plate check so OCR only runs on crops that look like a plate
+        self.plate_filter = PlatePreFilter()
+        self.model_path = model_path
+        self.model_version = self._model_version(model_path)
         self.frame_skip = 2  # Process every 2nd frame
+        
+        # OCR: tight plate crops skip EasyOCR's text detector (recognize() only)
+        self.ocr_recognition_only = True
+        self.ocr_allowlist = None  # e.g. 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+        self.ocr_min_confidence = 0.5  # below this, fall back to full readtext()
+        self.ocr_plate_height = 64  # EasyOCR's recognizer input height
+        self.ocr_stats = {'recognize_only': 0, 'fallbacks': 0, 'readtext': 0}
         self.frame_count = 0
         self.conf_threshold = 0.5
         
+        # YOLO/EasyOCR predictors are not thread-safe; serialize calls when
+        # several streams share one detector
+        self.inference_lock = threading.Lock()
+        self.ocr_lock = threading.Lock()
+        
         try:
             # Load YOLO model
             self.model = YOLO(model_path)
@@ -37,6 +119,27 @@ class RealtimeDetector:
             logger.error(f"Initialization error: {e}")
             self.model = None
             self.reader = None
+        
+        # Optional dedicated plate model; without it the lower part of the
+        # vehicle box is used as the plate region
+        if plate_model_path:
+            if os.path.exists(plate_model_path):
+                try:
+                    self.plate_localizer = PlateLocalizer(plate_model_path)
+                    self.model_version += '+' + self._model_version(plate_model_path)
+                except Exception as e:
+                    logger.error(f"Plate model error: {e}")
+            else:
+                logger.warning(f"Plate model not found: {plate_model_path}, using heuristic plate regions")
+    
+    @staticmethod
+    def _model_version(model_path: str) -> str:
+        """Identify the weights in use (name + size/mtime when the file is local)"""
+        name = os.path.basename(model_path)
+        if os.path.exists(model_path):
+            stat = os.stat(model_path)
+            return f"{name}:{stat.st_size}:{int(stat.st_mtime)}"
+        return name
     
     def detect_vehicles_realtime(self, frame: np.ndarray, skip: bool = True) -> List[Dict]:
         """
@@ -53,24 +156,12 @@ class RealtimeDetector:
         
         try:
             # Run inference
-            results = self.model(frame, conf=self.conf_threshold, verbose=False)
+            with self.inference_lock:
+                results = self.model(frame, conf=self.conf_threshold, verbose=False)
             detections = []
             
             for result in results:
-                if result.boxes is not None:
-                    for box in result.boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf = float(box.conf[0])
-                        cls = int(box.cls[0])
-                        
-                        # Car=2, Bus=5, Truck=7
-                        if cls in [2, 5, 7]:
-                            detections.append({
-                                'bbox': (int(x1), int(y1), int(x2), int(y2)),
-                                'conf': conf,
-                                'class': cls,
-                                'area': (x2 - x1) * (y2 - y1)
-                            })
+                detections.extend(self._parse_vehicle_boxes(result))
             
             return sorted(detections, key=lambda x: x['conf'], reverse=True)
         
@@ -78,6 +169,54 @@ class RealtimeDetector:
             logger.error(f"Detection error: {e}")
             return []
     
+    def detect_vehicles_batch(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        """
+        Detect vehicles in several frames with a single batched model call.
+        Returns one detection list per input frame (no frame skipping).
+        """
+        if self.model is None or not frames:
+            return [[] for _ in frames]
+        
+        try:
+            with self.inference_lock:
+                results = self.model(frames, conf=self.conf_threshold, verbose=False)
+            
+            return [
+                sorted(self._parse_vehicle_boxes(result), key=lambda x: x['conf'], reverse=True)
+                for result in results
+            ]
+        
+        except Exception as e:
+            logger.error(f"Batch detection error: {e}")
+            return [[] for _ in frames]
+    
+    def _parse_vehicle_boxes(self, result) -> List[Dict]:
+        """Convert one YOLO result into vehicle detection dicts"""
+        detections = []
+        
+        if result.boxes is not None:
+            for box in result.boxes:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                conf = float(box.conf[0])
+                cls = int(box.cls[0])
+                
+                # Car=2, Bus=5, Truck=7
+                if cls in [2, 5, 7]:
+                    detections.append({
+                        'bbox': (int(x1), int(y1), int(x2), int(y2)),
+                        'conf': conf,
+                        'class': cls,
+                        'area': (x2 - x1) * (y2 - y1)
+                    })
+        
+        return detections
+    
+    def localize_plates(self, frame: np.ndarray, detections: List[Dict]) -> List[Optional[Dict]]:
+        """Plate box per vehicle from the dedicated plate model (one call per frame)"""
+        if self.plate_localizer is None or not detections:
+            return [None] * len(detections)
+        return self.plate_localizer.localize(frame, [det['bbox'] for det in detections])
+    
     def extract_plate_region(self, frame: np.ndarray, vehicle_bbox: Tuple) -> np.ndarray:
         """Extract license plate region from vehicle (lower 1/3)"""
         x1, y1, x2, y2 = vehicle_bbox
@@ -90,28 +229,26 @@ class RealtimeDetector:
         plate_region = frame[plate_y1:plate_y2, x1:x2]
         return plate_region if plate_region.size > 0 else None
     
-    def recognize_plate_fast(self, plate_image: np.ndarray) -> Dict:
-        """Fast OCR recognition with preprocessing"""
+    def recognize_plate_fast(self, plate_image: np.ndarray, localized: bool = False) -> Dict:
+        """
+        Fast OCR recognition with preprocessing.
+        `localized` crops are already tight around the plate, so EasyOCR's text
+        detector is skipped and the crop goes straight to the recognizer; full
+        readtext() only runs when that result is not confident enough.
+        """
         if self.reader is None or plate_image is None or plate_image.size == 0:
             return {'text': '', 'conf': 0.0}
         
-        try:
-            # Preprocess
-            gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
-            _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-            
-            # Run OCR
-            results = self.reader.readtext(thresh, detail=0)
-            
-            if not results:
-                return {'text': '', 'conf': 0.0}
-            
-            text = ''.join(results).strip()
-            return {'text': text, 'conf': 0.85}  # Simplified confidence
-        
-        except Exception as e:
-            logger.error(f"OCR error: {e}")
-            return {'text': '', 'conf': 0.0}
+        with self.ocr_lock:
+            return read_plate(self.reader, plate_image, localized, self.ocr_settings(), self.ocr_stats)
+    
+    def ocr_settings(self) -> Dict:
+        return {
+            'recognition_only': self.ocr_recognition_only,
+            'allowlist': self.ocr_allowlist,
+            'min_confidence': self.ocr_min_confidence,
+            'plate_height': self.ocr_plate_height
+        }
     
     def detect_traffic_light(self, frame: np.ndarray) -> Dict:
         """
@@ -205,23 +342,63 @@ class RealtimeDetector:
 class StreamingProcessor:
     """Stream-based video processing for real-time performance"""
     
-    def __init__(self, detector: RealtimeDetector, speed_limit: float = 60):
+    def __init__(self, detector: RealtimeDetector, speed_limit: float = 60,
+                 camera_id: Optional[str] = None, evidence=None, annotator=None,
+                 checkpoint=None, sink=None, tiler=None, ocr_pool=None,
+                 scheduler=None, scheduler_source: Optional[str] = None, events=None):
         self.detector = detector
         self.speed_limit = speed_limit
-        self.violations = []
+        self.camera_id = camera_id
+        self.evidence = evidence  # optional EvidenceRecorder
+        self.annotator = annotator  # optional AnnotatedOutputWriter
+        self.checkpoint = checkpoint  # optional JobCheckpointer (file sources only)
+        self.tiler = tiler  # optional TiledInference for high-resolution sources
+        self.ocr_pool = ocr_pool  # optional OCRWorkerPool (plates read out of process)
+        self._pending_ocr = deque()  # vehicles waiting for their plate, in frame order
+        self.scheduler = scheduler  # optional shared InferenceScheduler (file jobs yield to live cameras)
+        self.scheduler_source = scheduler_source
+        self.frames_dropped = 0  # frames the scheduler rejected (stopped, unregistered or stale)
+        self.events = events  # optional EventAggregator: one record per vehicle and incident
+        self._unadvanced = deque()  # (frame, output_callback) the event aggregator has not advanced past
+        
+        # Load-shedding knobs (flipped by the stream manager when a latency SLO is breached)
+        self.frame_size = PROCESSING_SIZE
+        self.annotate = True
+        self.defer_ocr = False
+        self._deferred_ocr = deque()  # (future, plate crop, localized, frame) waiting for spare capacity
+        # Deferred plates older than this (source frames) are read anyway, so
+        # the vehicles queued behind them (and their incidents) are not held back
+        self.ocr_defer_max_frames = 150
+        self.ocr_deferred = 0
+        # Bounded view of this run's violations; full history goes to the sink's log
+        self.sink = sink if sink is not None else ResultSink()
         self.detections_prev = []
         self.processing = False
         self.traffic_light_status = None
         self.red_light_frame_start = None
+        # Own RNG so its state can be checkpointed and a resumed run replays identically
+        self.rng = np.random.default_rng()
+        # Skip gaps at least this long are jumped with a seek instead of grab()
+        self.keyframe_seek_min_skip = 30
         
     def process_stream(self, video_source, 
                       output_callback=None, 
-                      frame_callback=None) -> Dict:
+                      frame_callback=None,
+                      start_frame: int = 0,
+                      end_frame: Optional[int] = None) -> Dict:
         """
         Process video stream with real-time updates
         Detects: speeding, red light running, parking violations
+
+        `video_source` is a path/URL/device index, or an already opened
+        cv2.VideoCapture-compatible object (e.g. ProgressiveCapture).
+        `start_frame`/`end_frame` restrict a file to frames
+        start_frame+1 .. end_frame (one shard of a distributed job).
         """
-        cap = cv2.VideoCapture(video_source)
+        if hasattr(video_source, 'read'):
+            cap = video_source
+        else:
+            cap = cv2.VideoCapture(video_source)
         
         if not cap.isOpened():
             return {'error': 'Cannot open video source'}
@@ -232,100 +409,452 @@ class StreamingProcessor:
         
         logger.info(f"Stream started: {fps}fps, {width}x{height}")
         
+        # Only every `frame_skip`-th frame is analyzed. The rest are grab()bed
+        # (no retrieve/colour conversion/resize) or, for large skips on a
+        # seekable file, jumped over with a seek.
+        frame_skip = max(1, int(self.detector.frame_skip))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        seekable = (isinstance(video_source, str) and os.path.isfile(video_source)
+                    and total_frames > 0 and frame_skip >= self.keyframe_seek_min_skip)
+        
+        if self.evidence is not None:
+            self.evidence.set_fps(fps, frame_step=frame_skip)
+        
         self.processing = True
         frame_count = 0
+        frames_analyzed = frames_grabbed = frames_seeked = 0
+        resumed_from = None
+        
+        checkpoint = self.checkpoint if isinstance(video_source, str) else None
+        state = checkpoint.load() if checkpoint is not None else None
+        if state is None:
+            self.sink.begin()
+            if start_frame > 0:
+                cap = self._seek_to(cap, video_source, start_frame)
+                if cap is None:
+                    return {'error': f'Cannot seek to frame {start_frame}'}
+                frame_count = start_frame
+        else:
+            cap = self._seek_to(cap, video_source, state['frame_count'])
+            if cap is None:
+                return {'error': 'Cannot resume video source'}
+            self.restore_state(state)
+            frame_count = resumed_from = state['frame_count']
+            frames_analyzed = state['frames_analyzed']
+            frames_grabbed = state['frames_grabbed']
+            frames_seeked = state['frames_seeked']
+            logger.info(f"↻ Resuming {checkpoint.job_id} from frame {frame_count}")
         
+        stop_at = min(total_frames, end_frame) if end_frame is not None else total_frames
         while self.processing:
-            ret, frame = cap.read()
-            if not ret:
+            if end_frame is not None and frame_count >= end_frame:
                 break
+            next_frame = frame_count + 1
             
-            frame_count += 1
-            
-            # Resize for faster processing
-            frame_resized = cv2.resize(frame, (640, 480))
-            
-            # Detect traffic light status
-            traffic_light = self.detector.detect_traffic_light(frame_resized)
-            self.traffic_light_status = traffic_light
-            
-            logger.debug(f"Frame {frame_count}: Traffic light = {traffic_light['status']}")
-            
-            # Detect vehicles
-            detections = self.detector.detect_vehicles_realtime(frame_resized)
-            
-            # Process detections
-            for det in detections:
-                plate_region = self.detector.extract_plate_region(
-                    frame_resized, det['bbox']
-                )
+            if next_frame % frame_skip != 0:
+                if seekable:
+                    target = next_frame + (frame_skip - next_frame % frame_skip)
+                    if target > stop_at:
+                        frame_count = stop_at
+                        break
+                    if cap.set(cv2.CAP_PROP_POS_FRAMES, target - 1):
+                        frames_seeked += target - next_frame
+                        frame_count = target - 1
+                        continue
+                    seekable = False
                 
-                if plate_region is not None:
-                    plate_text = self.detector.recognize_plate_fast(plate_region)
-                    det['plate'] = plate_text['text']
-                    det['plate_conf'] = plate_text['conf']
-                    
-                    # Estimate speed from movement
-                    speed = 55 + np.random.normal(0, 15)  # More realistic speed distribution
-                    speed = max(0, min(speed, 150))  # Clamp between 0-150
-                    
-                    violation_type = None
-                    is_violation = False
-                    confidence = traffic_light.get('confidence', 0.0)
-                    
-                    # Check for red light violation
-                    if traffic_light['status'] == 'red' and confidence > 0.5:
-                        violation_type = 'red_light'
-                        is_violation = True
-                        logger.warning(f"🚨 RED LIGHT VIOLATION detected at frame {frame_count} - Plate: {plate_text['text']}")
-                    
-                    # Check for speeding
-                    elif speed > self.speed_limit + 5:
-                        violation_type = 'speeding'
-                        is_violation = True
-                        logger.warning(f"⚠️ SPEEDING VIOLATION: {speed:.1f} km/h (limit: {self.speed_limit}) - Plate: {plate_text['text']}")
-                    
-                    violation_info = {
-                        'frame': frame_count,
-                        'bbox': det['bbox'],
-                        'plate': plate_text['text'],
-                        'plate_confidence': plate_text['conf'],
-                        'speed': round(speed, 2),
-                        'is_violation': is_violation,
-                        'violation_type': violation_type,
-                        'traffic_light_status': traffic_light['status'],
-                        'traffic_light_confidence': round(confidence, 3)
-                    }
-                    
-                    if is_violation:
-                        self.violations.append(violation_info)
-                    
-                    # Send to callback for real-time update
-                    if output_callback:
-                        output_callback(violation_info)
+                if not cap.grab():
+                    break
+                frames_grabbed += 1
+                frame_count = next_frame
+                continue
+            
+            ret, frame = cap.read()
+            if not ret:
+                break
             
-            # Send frame to callback
-            if frame_callback:
-                frame_callback({
-                    'frame_num': frame_count,
-                    'detections': len(detections),
-                    'violations': len(self.violations),
-                    'timestamp': frame_count / fps,
-                    'traffic_light': traffic_light['status']
-                })
+            frame_count = next_frame
+            if self.evidence is not None:
+                self.evidence.push(frame, frame_count)
+            if self.process_frame(frame, frame_count, fps, output_callback, frame_callback) is not None:
+                frames_analyzed += 1
             
-            self.detections_prev = detections
+            if checkpoint is not None and checkpoint.due(frame_count):
+                self.drain_ocr(block=True)
+                checkpoint.save(self.get_state(frame_count, total_frames, frames_analyzed,
+                                               frames_grabbed, frames_seeked))
         
+        completed = self.processing
         cap.release()
+        self.drain_ocr(block=True)
+        if checkpoint is not None and not completed:
+            # Stopped early - snapshot exactly where we are (open incidents are
+            # reported by the resumed run)
+            checkpoint.save(self.get_state(frame_count, total_frames, frames_analyzed,
+                                           frames_grabbed, frames_seeked))
+        else:
+            self.flush_events(output_callback)
+            if checkpoint is not None:
+                checkpoint.complete()
+        if self.evidence is not None:
+            self.evidence.flush()
+        if self.annotator is not None:
+            self.annotator.close()
+        self.sink.close()
         
         return {
             'success': True,
+            'start_frame': start_frame,
             'total_frames': frame_count,
+            'frames_analyzed': frames_analyzed,
+            'frames_grabbed': frames_grabbed,
+            'frames_seeked': frames_seeked,
+            'frames_dropped': self.frames_dropped,
             'fps': fps,
-            'violations': len(self.violations),
-            'violation_list': self.violations[:20]  # Top 20 violations
+            'violations': len(self.sink),
+            'violation_list': self.sink.head,  # First 20 violations
+            'results_log': self.sink.log_path,
+            'output_path': self.annotator.output_path if self.annotator is not None else None,
+            'resumed_from': resumed_from
         }
     
+    def _seek_to(self, cap, video_source, frame_count: int):
+        """
+        Position `cap` so the next read returns frame `frame_count + 1`.
+        Falls back to grabbing when the container cannot seek exactly: a path
+        is reopened first (a failed seek leaves the position undefined), a
+        capture object (ProgressiveCapture, RingCapture) is grabbed in place.
+        """
+        if frame_count <= 0:
+            return cap
+        if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count) and \
+                int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_count:
+            return cap
+        
+        logger.warning(f"Inexact seek, grabbing {frame_count} frames to resume")
+        if not hasattr(video_source, 'read'):
+            cap.release()
+            cap = cv2.VideoCapture(video_source)
+        for _ in range(frame_count):
+            if not cap.grab():
+                cap.release()
+                return None
+        return cap
+    
+    def get_state(self, frame_count: int, total_frames: int, frames_analyzed: int,
+                  frames_grabbed: int, frames_seeked: int) -> Dict:
+        """Everything needed to continue this run after frame `frame_count`"""
+        return {
+            'frame_count': frame_count,
+            'source_total_frames': total_frames,
+            'frames_analyzed': frames_analyzed,
+            'frames_grabbed': frames_grabbed,
+            'frames_seeked': frames_seeked,
+            'frame_skip': self.detector.frame_skip,
+            'frames_dropped': self.frames_dropped,
+            'detections_prev': self.detections_prev,
+            'traffic_light_status': self.traffic_light_status,
+            'red_light_frame_start': self.red_light_frame_start,
+            'rng_state': self.rng.bit_generator.state,
+            'tiler': self.tiler.get_state() if self.tiler is not None else None,
+            'events': self.events.get_state() if self.events is not None else None,
+            'violation_count': len(self.sink),
+            'sink': self.sink.snapshot()
+        }
+    
+    def restore_state(self, state: Dict):
+        """Inverse of get_state() (JSON turns bbox tuples into lists)"""
+        self.detections_prev = [{**det, 'bbox': tuple(det['bbox'])} for det in state['detections_prev']]
+        self.traffic_light_status = state['traffic_light_status']
+        self.red_light_frame_start = state['red_light_frame_start']
+        self.rng.bit_generator.state = state['rng_state']
+        self.frames_dropped = state.get('frames_dropped', 0)
+        self.sink.restore(state['sink'])
+        if self.tiler is not None:
+            self.tiler.restore(state.get('tiler'))
+        if self.events is not None and state.get('events'):
+            self.events.restore(state['events'])
+        if state.get('frame_skip') != self.detector.frame_skip:
+            logger.warning(f"Checkpoint used frame_skip={state.get('frame_skip')}, "
+                           f"now {self.detector.frame_skip}; results will differ")
+    
+    def prepare_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, Dict]:
+        """
+        Resize frame for processing and read its traffic light. The status is
+        applied by handle_detections(), so a frame the scheduler rejects
+        leaves the processor's traffic light state untouched.
+        """
+        # Resize for faster processing
+        frame_resized = cv2.resize(frame, self.frame_size)
+        
+        # Detect traffic light status
+        traffic_light = self.detector.detect_traffic_light(frame_resized)
+        
+        return frame_resized, traffic_light
+    
+    def process_frame(self, frame: np.ndarray, frame_count: int, fps: float,
+                      output_callback=None, frame_callback=None) -> Optional[List[Dict]]:
+        """
+        Run the full detection + violation pipeline on one decoded frame.
+        Frame skipping is the caller's job (process_stream never decodes skipped frames).
+        Returns None when the scheduler rejected the frame (it is skipped, not
+        treated as a frame without vehicles).
+        """
+        frame_resized, traffic_light = self.prepare_frame(frame)
+        
+        logger.debug(f"Frame {frame_count}: Traffic light = {traffic_light['status']}")
+        
+        # Detect vehicles - tiled mode works on the full-resolution frame, so
+        # boxes (and plate crops) are in full-frame coordinates
+        if self.tiler is not None:
+            detection_frame = frame
+            if self.frame_size != PROCESSING_SIZE:
+                # Shedding load: tile a proportionally downscaled frame (fewer tiles)
+                scale = min(1.0, self.frame_size[0] / PROCESSING_SIZE[0])
+                detection_frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            detections = self.tiler.detect(detection_frame)
+        elif self.scheduler is not None:
+            detections = self.scheduler.submit(self.scheduler_source, frame_resized).result()
+            if detections is None:
+                # Scheduler stopped, source unregistered or frame dropped as stale
+                self.frames_dropped += 1
+                logger.debug(f"Frame {frame_count} rejected by the inference scheduler, skipped")
+                return None
+            detection_frame = frame_resized
+        else:
+            detections = self.detector.detect_vehicles_realtime(frame_resized, skip=False)
+            detection_frame = frame_resized
+        
+        frame_results = self.handle_detections(
+            detection_frame, detections, traffic_light, frame_count, fps,
+            output_callback, frame_callback
+        )
+        
+        if self.annotator is not None and self.annotate:
+            self.annotator.submit(frame, frame_count, fps, frame_results,
+                                  traffic_light, detection_frame.shape)
+        
+        return frame_results
+    
+    def select_plate_region(self, frame: np.ndarray, det: Dict,
+                            plate: Optional[Dict]) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """
+        Region to OCR for one vehicle and how to OCR it:
+        'localized' for a tight plate crop (plate model box or pre-filter
+        re-crop), 'region' for the raw heuristic region, None to skip OCR.
+        """
+        if plate is not None:
+            x1, y1, x2, y2 = plate['bbox']
+            region = frame[y1:y2, x1:x2]
+            if region.size > 0:
+                det['plate_bbox'] = plate['bbox']
+                return region, 'localized'
+        
+        region = self.detector.extract_plate_region(frame, det['bbox'])
+        if region is None or self.detector.plate_filter is None:
+            return region, 'region'
+        
+        candidate = self.detector.plate_filter.find(region)
+        if candidate is None:
+            return region, None
+        return candidate['crop'], 'localized'
+    
+    def handle_detections(self, frame_resized: np.ndarray, detections: List[Dict],
+                          traffic_light: Dict, frame_count: int, fps: float,
+                          output_callback=None, frame_callback=None) -> List[Dict]:
+        """
+        Apply plate recognition and violation rules to a frame's detections.
+        With an OCR pool, plates are read asynchronously: results are returned
+        right away and each vehicle is reported (sink, evidence, callback), in
+        order, once its plate is back.
+        """
+        self.traffic_light_status = traffic_light
+        frame_results = []
+        plates = self.detector.localize_plates(frame_resized, detections)
+        
+        if self.events is not None:
+            track_ids = self.events.tracker.update(frame_count, [det['bbox'] for det in detections])
+            for det, track_id in zip(detections, track_ids):
+                det['track_id'] = track_id
+        
+        for det, plate in zip(detections, plates):
+            plate_region, ocr_mode = self.select_plate_region(frame_resized, det, plate)
+            
+            if plate_region is not None:
+                # Estimate speed from movement
+                speed = 55 + self.rng.normal(0, 15)  # More realistic speed distribution
+                speed = max(0, min(speed, 150))  # Clamp between 0-150
+                
+                violation_type = None
+                is_violation = False
+                confidence = traffic_light.get('confidence', 0.0)
+                
+                # Check for red light violation
+                if traffic_light['status'] == 'red' and confidence > 0.5:
+                    violation_type = 'red_light'
+                    is_violation = True
+                
+                # Check for speeding
+                elif speed > self.speed_limit + 5:
+                    violation_type = 'speeding'
+                    is_violation = True
+                
+                violation_info = {
+                    'frame': frame_count,
+                    'bbox': det['bbox'],
+                    'plate': '',
+                    'plate_confidence': 0.0,
+                    'speed': round(speed, 2),
+                    'is_violation': is_violation,
+                    'violation_type': violation_type,
+                    'traffic_light_status': traffic_light['status'],
+                    'traffic_light_confidence': round(confidence, 3)
+                }
+                if det.get('plate_bbox') is not None:
+                    violation_info['plate_bbox'] = det['plate_bbox']
+                if 'track_id' in det:
+                    violation_info['track_id'] = det['track_id']
+                if self.camera_id is not None:
+                    violation_info['camera_id'] = self.camera_id
+                
+                frame_results.append(violation_info)
+                
+                localized = ocr_mode == 'localized'
+                plate_text = {'text': '', 'conf': 0.0}
+                future = None
+                if ocr_mode is None:
+                    pass  # no plate visible, OCR skipped
+                elif self.defer_ocr:
+                    # Shedding load: only violators need a plate, read once there is capacity
+                    if is_violation:
+                        future = Future()
+                        self._deferred_ocr.append((future, plate_region.copy(), localized, frame_count))
+                        self.ocr_deferred += 1
+                elif self.ocr_pool is not None:
+                    future = self.ocr_pool.submit(plate_region, localized=localized)
+                else:
+                    plate_text = self.detector.recognize_plate_fast(plate_region, localized=localized)
+                
+                if future is None and self._pending_ocr:
+                    # Keep reports in order behind vehicles still waiting for their plate
+                    future = Future()
+                    future.set_result(plate_text)
+                if future is not None:
+                    self._pending_ocr.append((future, det, violation_info, frame_resized.shape, output_callback))
+                    continue
+                self._finish_vehicle(det, violation_info, plate_text, frame_resized.shape, output_callback)
+        
+        if self.events is not None:
+            self._unadvanced.append((frame_count, output_callback))
+        if self._deferred_ocr and self.ocr_defer_max_frames is not None:
+            self.run_deferred_ocr(up_to_frame=frame_count - self.ocr_defer_max_frames)
+        self.drain_ocr()
+        
+        # Send frame to callback
+        if frame_callback:
+            frame_callback({
+                'frame_num': frame_count,
+                'detections': len(detections),
+                'violations': len(self.sink),
+                'timestamp': frame_count / fps,
+                'traffic_light': traffic_light['status']
+            })
+        
+        self.detections_prev = detections
+        return frame_results
+    
+    def _finish_vehicle(self, det: Dict, violation_info: Dict, plate_text: Dict,
+                        detection_shape: Tuple, output_callback=None):
+        """Fill in the plate and report one vehicle"""
+        det['plate'] = plate_text['text']
+        det['plate_conf'] = plate_text['conf']
+        violation_info['plate'] = plate_text['text']
+        violation_info['plate_confidence'] = plate_text['conf']
+        
+        if self.events is not None:
+            # Aggregated: reported once per incident by _report_events()
+            if violation_info['is_violation']:
+                if self.events.opens(violation_info) and self.evidence is not None:
+                    self.evidence.attach(violation_info, detection_shape)
+                self.events.add(violation_info)
+            return
+        
+        self._log_violation(violation_info)
+        if violation_info['is_violation']:
+            if self.evidence is not None:
+                self.evidence.attach(violation_info, detection_shape)
+            self.sink.add(violation_info)
+        
+        # Send to callback for real-time update
+        if output_callback:
+            output_callback(violation_info)
+    
+    def _log_violation(self, record: Dict):
+        frames = f"frames {record['start_frame']}-{record['end_frame']}" if 'end_frame' in record else f"frame {record['frame']}"
+        if record['violation_type'] == 'red_light':
+            logger.warning(f"🚨 RED LIGHT VIOLATION detected at {frames} - Plate: {record['plate']}")
+        elif record['violation_type'] == 'speeding':
+            logger.warning(f"⚠️ SPEEDING VIOLATION: {record['speed']:.1f} km/h (limit: {self.speed_limit}) at {frames} - Plate: {record['plate']}")
+    
+    def _report_events(self, events: List[Dict], output_callback=None):
+        for event in events:
+            self._log_violation(event)
+            self.sink.add(event)
+            if output_callback:
+                output_callback(event)
+    
+    def flush_events(self, output_callback=None):
+        """Finish pending OCR and report every still-open incident"""
+        self.drain_ocr(block=True)
+        if self.events is not None:
+            self._unadvanced.clear()
+            self._report_events(self.events.flush(), output_callback)
+    
+    def run_deferred_ocr(self, max_items: Optional[int] = None, up_to_frame: Optional[int] = None):
+        """Read plates whose OCR was deferred while shedding load (oldest first)"""
+        count = 0
+        while self._deferred_ocr and (max_items is None or count < max_items):
+            if up_to_frame is not None and self._deferred_ocr[0][3] > up_to_frame:
+                break
+            future, region, localized, _ = self._deferred_ocr.popleft()
+            if self.ocr_pool is not None:
+                self.ocr_pool.submit(region, localized=localized).add_done_callback(
+                    lambda done, future=future: future.set_result(done.result())
+                )
+            else:
+                future.set_result(self.detector.recognize_plate_fast(region, localized=localized))
+            count += 1
+        self.drain_ocr()
+    
+    def ocr_backlog(self) -> Dict:
+        return {
+            'ocr_deferred': self.ocr_deferred,
+            'ocr_deferred_pending': len(self._deferred_ocr),
+            'ocr_pending': len(self._pending_ocr)
+        }
+    
+    def drain_ocr(self, block: bool = False):
+        """Report vehicles whose asynchronous OCR finished (all of them with `block`)"""
+        if block:
+            self.run_deferred_ocr()
+        while self._pending_ocr and (block or self._pending_ocr[0][0].done()):
+            future, det, violation_info, detection_shape, output_callback = self._pending_ocr.popleft()
+            self._finish_vehicle(det, violation_info, future.result(), detection_shape, output_callback)
+        self._advance_events()
+    
+    def _advance_events(self):
+        """
+        Close incidents up to the newest frame whose vehicles have all been
+        reported. Frames behind a pending plate read wait for it, so incidents
+        close exactly as they would with synchronous OCR.
+        """
+        if self.events is None:
+            return
+        oldest_pending = self._pending_ocr[0][2]['frame'] if self._pending_ocr else None
+        while self._unadvanced and (oldest_pending is None or self._unadvanced[0][0] < oldest_pending):
+            frame, output_callback = self._unadvanced.popleft()
+            self._report_events(self.events.advance(frame), output_callback)
+    
     def stop(self):
         """Stop processing stream"""
         self.processing = False
@@ -0,0 +1,160 @@
+import os
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+def available_cpus() -> List[int]:
+    """CPU ids this process may run on (respects container/taskset limits)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def limit_threads(threads: int, cpus: Optional[List[int]] = None,
+                  cv2_threads: Optional[int] = None) -> Dict:
+    """
+    Cap torch, OpenCV and OpenMP/BLAS threads for the current process and
+    optionally pin it to `cpus`. Call it before the process starts its own
+    threads: affinity is inherited by threads created afterwards, and the
+    environment variables only reach libraries loaded later and child processes.
+    """
+    threads = max(1, int(threads))
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            logger.warning(f"Could not pin to CPUs {cpus}: {e}")
+
+    import cv2
+    cv2.setNumThreads(max(1, int(cv2_threads or threads)))
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # only settable before the first parallel torch op
+    except ImportError:
+        pass
+
+    return effective_threads()
+
+
+def effective_threads() -> Dict:
+    """What the current process actually runs with"""
+    import cv2
+    info = {
+        'cv2_threads': cv2.getNumThreads(),
+        'torch_threads': None,
+        'torch_interop_threads': None,
+        'affinity': available_cpus(),
+        'env': {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    }
+    try:
+        import torch
+        info['torch_threads'] = torch.get_num_threads()
+        info['torch_interop_threads'] = torch.get_num_interop_threads()
+    except ImportError:
+        pass
+    return info
+
+
+class ResourceManager:
+    """
+    Splits a node's cores between the process pools that compete for them:
+    'inference' (YOLO, torch intra-op threads in the server process), 'decode'
+    (OpenCV/FFmpeg decoding and resizing) and 'ocr' (the OCR worker processes).
+
+    `budget` gives each pool a share of the cores left after `reserved_cores`
+    (OS, Flask request threads). Every pool gets at least one core; on small
+    machines pools wrap around and share cores rather than fail.
+    """
+
+    def __init__(self, budget: Dict[str, float], reserved_cores: int = 1,
+                 pin: bool = False, cpus: Optional[List[int]] = None):
+        self.cpus = list(cpus) if cpus is not None else available_cpus()
+        self.reserved_cores = min(max(0, reserved_cores), len(self.cpus) - 1)
+        self.reserved = self.cpus[:self.reserved_cores]
+        self.usable = self.cpus[self.reserved_cores:]
+        self.pin = pin
+        self.budget = {pool: share for pool, share in budget.items() if share > 0}
+        self.allocation = self._split()
+        self.applied = {}  # process -> effective settings, filled as processes apply them
+
+    def _split(self) -> Dict[str, List[int]]:
+        total = sum(self.budget.values())
+        if not total:
+            return {}
+
+        n = len(self.usable)
+        exact = {pool: share / total * n for pool, share in self.budget.items()}
+        counts = {pool: max(1, int(value)) for pool, value in exact.items()}
+        # Largest remainder for whatever is left over
+        spare = n - sum(counts.values())
+        for pool in sorted(exact, key=lambda p: exact[p] - int(exact[p]), reverse=True):
+            if spare <= 0:
+                break
+            counts[pool] += 1
+            spare -= 1
+
+        allocation, start = {}, 0
+        for pool, count in counts.items():
+            allocation[pool] = [self.usable[(start + i) % n] for i in range(count)]
+            start += count
+        return allocation
+
+    def cores(self, pool: str) -> List[int]:
+        """Cores assigned to a pool (all usable cores for pools outside the budget)"""
+        return self.allocation.get(pool, self.usable)
+
+    def threads(self, pool: str, workers: int = 1) -> int:
+        """Threads per worker process of a pool"""
+        return max(1, len(self.cores(pool)) // max(1, workers))
+
+    def worker_cores(self, pool: str, index: int, workers: int) -> List[int]:
+        """Slice of a pool's cores for worker `index` of `workers`"""
+        cores = self.cores(pool)
+        per_worker = self.threads(pool, workers)
+        start = (index * per_worker) % len(cores)
+        return [cores[(start + i) % len(cores)] for i in range(per_worker)]
+
+    def apply_server(self) -> Dict:
+        """
+        Configure the server process: torch gets the inference cores, OpenCV
+        and FFmpeg capture decoding the decode cores. When pinning, the process
+        is restricted to inference + decode + reserved cores, leaving the OCR
+        cores to the OCR workers.
+        """
+        decode_threads = self.threads('decode')
+        # FFmpeg decoder threads for every VideoCapture opened from now on
+        os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', f'threads;{decode_threads}')
+
+        cpus = None
+        if self.pin:
+            cpus = sorted(set(self.reserved + self.cores('inference') + self.cores('decode')))
+        effective = limit_threads(self.threads('inference'), cpus, cv2_threads=decode_threads)
+        self.applied['server'] = effective
+        logger.info(f"✓ CPU budget applied: {effective['torch_threads']} torch threads, "
+                    f"{effective['cv2_threads']} OpenCV threads on {len(effective['affinity'])} CPUs")
+        return effective
+
+    def report(self) -> Dict:
+        return {
+            'cpus': len(self.cpus),
+            'reserved': self.reserved,
+            'pinned': self.pin,
+            'budget': self.budget,
+            'pools': {
+                pool: {'cores': cores, 'count': len(cores)}
+                for pool, cores in self.allocation.items()
+            },
+            'effective': dict(self.applied)
+        }
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class ResultCache:
+    """
+    Content-addressed cache of processing results on disk.
+
+    Entries are keyed by the SHA-256 of the video bytes plus the effective
+    settings, so re-uploading the same clip under a new name still hits.
+    Total size is capped; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 512 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+        # key -> {'size', 'last_used', 'content_digest'}
+        self._entries = {}
+        # (path, size, mtime_ns) -> digest, so unchanged files are hashed once
+        self._digests = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    def _load_index(self):
+        for filename in os.listdir(self.folder):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.folder, filename)
+            content_digest, key = filename[:-5].split('_', 1)
+            stat = os.stat(path)
+            self._entries[key] = {
+                'size': stat.st_size,
+                'last_used': stat.st_mtime,
+                'content_digest': content_digest
+            }
+
+    def _path(self, key: str, content_digest: str) -> str:
+        return os.path.join(self.folder, f'{content_digest}_{key}.json')
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry['size'] for entry in self._entries.values())
+
+    def file_digest(self, video_path: str) -> str:
+        """SHA-256 of the file contents (memoized per path/size/mtime)"""
+        stat = os.stat(video_path)
+        memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(video_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._digests[memo_key] = digest
+        return digest
+
+    @staticmethod
+    def make_key(content_digest: str, settings: Dict) -> str:
+        payload = content_digest + json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = self._path(key, entry['content_digest'])
+
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            # Removed behind our back or half-written - treat as a miss
+            with self.lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        now = time.time()
+        os.utime(path, (now, now))  # mtime doubles as LRU timestamp across restarts
+        with self.lock:
+            entry['last_used'] = now
+            self.hits += 1
+        return result
+
+    def put(self, key: str, content_digest: str, result: Dict):
+        path = self._path(key, content_digest)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, default=str)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self._entries[key] = {
+                'size': os.path.getsize(path),
+                'last_used': time.time(),
+                'content_digest': content_digest
+            }
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits (caller holds the lock)"""
+        total = self.total_bytes
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key, entry['content_digest']))
+            except OSError:
+                pass
+            del self._entries[key]
+            total -= entry['size']
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[str] = None, content_digest: Optional[str] = None) -> int:
+        """
+        Remove one entry by key, every entry for a video's content digest,
+        or everything when neither is given. Returns the number removed.
+        """
+        with self.lock:
+            if key is not None:
+                targets = [key] if key in self._entries else []
+            elif content_digest is not None:
+                targets = [k for k, e in self._entries.items() if e['content_digest'] == content_digest]
+            else:
+                targets = list(self._entries)
+
+            for target in targets:
+                entry = self._entries.pop(target)
+                try:
+                    os.remove(self._path(target, entry['content_digest']))
+                except OSError:
+                    pass
+
+        return len(targets)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
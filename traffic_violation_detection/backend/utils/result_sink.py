@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import logging
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from .serialization import json_default
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSink:
+    """
+    Bounded in-memory view of a run's violations, with the full history
+    streamed to an append-only NDJSON log.
+
+    Memory holds the first `head_size` violations (the API's sample list)
+    and a sliding window of the latest `window_size` for live display;
+    everything else lives only on disk. Without a `log_path` the sink is
+    memory-only (e.g. live streams, whose history is in the violation store).
+    """
+
+    def __init__(self, log_path: Optional[str] = None, window_size: int = 200,
+                 head_size: int = 20):
+        self.log_path = log_path
+        self.head_size = head_size
+        self.head = []
+        self.window = deque(maxlen=window_size)
+        self.count = 0
+        self.lock = threading.Lock()
+        self._file = None  # opened by begin() or restore()
+
+        if log_path:
+            directory = os.path.dirname(log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def begin(self):
+        """Start a fresh run (replaces any log left by a previous run of the job)"""
+        with self.lock:
+            self.count = 0
+            self.head = []
+            self.window.clear()
+            if self.log_path:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.log_path, 'w')
+
+    def add(self, violation_info: Dict):
+        with self.lock:
+            self.count += 1
+            if len(self.head) < self.head_size:
+                self.head.append(violation_info)
+            self.window.append(violation_info)
+            if self._file is not None:
+                self._file.write(json.dumps(violation_info, default=json_default) + '\n')
+
+    def __len__(self):
+        return self.count
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """Newest violations still in the in-memory window, oldest first"""
+        with self.lock:
+            items = list(self.window)
+        return items[-limit:] if limit else items
+
+    def offset(self) -> int:
+        """Flush and return the log size; everything before it is durable"""
+        with self.lock:
+            if self._file is None:
+                return 0
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return self._file.tell()
+
+    def snapshot(self) -> Dict:
+        """State for a checkpoint (the log itself is referenced by offset)"""
+        return {
+            'count': self.count,
+            'offset': self.offset(),
+            'head': self.head,
+            'window': list(self.window)
+        }
+
+    def restore(self, snapshot: Dict):
+        """
+        Return to a checkpointed state: the log is reopened and cut back to
+        the checkpoint's offset, dropping lines written after it.
+        """
+        with self.lock:
+            self.count = snapshot['count']
+            self.head = [{**v, 'bbox': tuple(v['bbox'])} for v in snapshot['head']]
+            self.window.clear()
+            self.window.extend({**v, 'bbox': tuple(v['bbox'])} for v in snapshot['window'])
+            if self.log_path:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.log_path, 'r+' if os.path.exists(self.log_path) else 'w')
+                self._file.truncate(snapshot['offset'])
+                self._file.seek(snapshot['offset'])
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter_log(self.log_path) if self.log_path else iter(self.recent())
+
+    def stats(self) -> Dict:
+        return {
+            'count': self.count,
+            'in_memory': len(self.head) + len(self.window),
+            'log_path': self.log_path
+        }
+
+
+def iter_log(log_path: str) -> Iterator[Dict]:
+    """Read an NDJSON violation log one record at a time"""
+    with open(log_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,5 @@
+def json_default(value):
+    """json.dump(s) fallback: numpy scalars/arrays -> plain Python, anything else -> str"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
@@ -0,0 +1,516 @@
+import cv2
+import numpy as np
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from .realtime_detection import RealtimeDetector, StreamingProcessor, PROCESSING_SIZE
+from .inference_scheduler import PRIORITY_CLASSES
+from .frame_ring import RingCapture
+
+logger = logging.getLogger(__name__)
+
+
+def open_capture(uri):
+    """Open an RTSP/HTTP URL, file path or device index ("0" -> /dev/video0)"""
+    if isinstance(uri, str) and uri.isdigit():
+        uri = int(uri)
+    return cv2.VideoCapture(uri)
+
+
+def ring_capture_factory(slots: int = 8):
+    """
+    open_capture() replacement that decodes in a separate process into a
+    shared-memory frame ring. Live sources drop frames while every slot is
+    busy; file stand-ins block the decoder instead (the reader paces them).
+    """
+    def factory(uri):
+        live = not isinstance(uri, str) or uri.isdigit() or '://' in uri
+        return RingCapture(uri, slots=slots, drop_when_full=live)
+    return factory
+
+
+class LatestFrameReader:
+    """
+    Reader thread for one source that keeps only the newest decoded frame.
+    Reconnects with exponential backoff when the source fails or ends.
+    """
+
+    def __init__(self, source_id: str, uri, backoff_initial: float = 0.5,
+                 backoff_max: float = 30.0, loop_files: bool = False,
+                 capture_factory=open_capture, on_frame=None):
+        self.source_id = source_id
+        self.on_frame = on_frame  # called with (frame, seq) for every decoded frame
+        self.uri = uri
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.loop_files = loop_files
+        self.capture_factory = capture_factory
+
+        self.fps = 0.0
+        self.state = 'stopped'
+        self._frame = None
+        self._frame_seq = 0
+        self._frame_time = 0.0
+        self._consumed_seq = 0
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.connected_since = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f'reader-{self.source_id}', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.state = 'stopped'
+
+    def _run(self):
+        backoff = self.backoff_initial
+
+        while not self._stop_event.is_set():
+            self.state = 'connecting'
+            cap = self.capture_factory(self.uri)
+
+            if not cap.isOpened():
+                cap.release()
+                self.last_error = 'Cannot open source'
+                self.state = 'reconnecting'
+                logger.warning(f"[{self.source_id}] open failed, retrying in {backoff:.1f}s")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                self.reconnects += 1
+                continue
+
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+            self.state = 'running'
+            self.connected_since = time.time()
+            backoff = self.backoff_initial
+            logger.info(f"[{self.source_id}] connected: {self.uri}")
+
+            # File-backed stand-ins are paced to their native fps like a live camera
+            paced = isinstance(self.uri, str) and not self.uri.isdigit() and '://' not in self.uri
+            next_due = time.time()
+
+            while not self._stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self._publish(frame)
+
+                if paced:
+                    next_due += 1.0 / self.fps
+                    delay = next_due - time.time()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+                    else:
+                        next_due = time.time()
+
+            cap.release()
+            self.connected_since = None
+
+            if self._stop_event.is_set():
+                break
+
+            if paced and not self.loop_files:
+                self.state = 'finished'
+                logger.info(f"[{self.source_id}] reached end of file")
+                with self._cond:
+                    self._cond.notify_all()
+                break
+
+            # Live source dropped (or looping file ended) - reconnect
+            self.last_error = 'Stream ended'
+            self.state = 'reconnecting'
+            self.reconnects += 1
+            if not paced:
+                logger.warning(f"[{self.source_id}] stream lost, reconnecting in {backoff:.1f}s")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+
+    def _publish(self, frame: np.ndarray):
+        with self._cond:
+            # Previous frame never reached the consumer - count it as dropped
+            if self._frame_seq > self._consumed_seq:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._frame_seq += 1
+            self._frame_time = time.time()
+            self.frames_read += 1
+            seq = self._frame_seq
+            self._cond.notify_all()
+
+        if self.on_frame is not None:
+            try:
+                self.on_frame(frame, seq)
+            except Exception as e:
+                logger.error(f"[{self.source_id}] frame hook error: {e}")
+
+    def get_latest(self, timeout: float = 1.0) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Block until a frame newer than the last one returned is available"""
+        with self._cond:
+            if self._frame_seq <= self._consumed_seq:
+                self._cond.wait(timeout)
+            if self._frame_seq <= self._consumed_seq:
+                return None
+            self._consumed_seq = self._frame_seq
+            return self._frame_seq, self._frame_time, self._frame
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict:
+        return {
+            'state': self.state,
+            'fps': self.fps,
+            'frames_read': self.frames_read,
+            'frames_dropped': self.frames_dropped,
+            'reconnects': self.reconnects,
+            'last_error': self.last_error,
+            'last_frame_age': round(time.time() - self._frame_time, 3) if self._frame_time else None,
+            'uptime': round(time.time() - self.connected_since, 1) if self.connected_since else 0
+        }
+
+
+class StreamManager:
+    """
+    Registers many live sources and runs detection on each one's latest frame.
+    With an InferenceScheduler, YOLO calls from all sources are batched centrally;
+    otherwise every source calls the detector on its own.
+    """
+
+    def __init__(self, detector: RealtimeDetector, speed_limit: float = 60,
+                 output_callback=None, max_sources: int = 64,
+                 backoff_initial: float = 0.5, backoff_max: float = 30.0,
+                 scheduler=None, pipeline_depth: int = 2, evidence_factory=None,
+                 annotation_factory=None, tiling_factory=None, ocr_pool=None,
+                 shedding_factory=None, deferred_ocr_batch: int = 4, events_factory=None,
+                 ring_slots: int = 8, ocr_defer_max_frames: Optional[int] = 150):
+        self.detector = detector
+        self.speed_limit = speed_limit
+        self.output_callback = output_callback
+        self.max_sources = max_sources
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.scheduler = scheduler
+        self.pipeline_depth = pipeline_depth
+        self.evidence_factory = evidence_factory  # source_id -> EvidenceRecorder
+        self.annotation_factory = annotation_factory  # source_id -> AnnotatedOutputWriter
+        self.tiling_factory = tiling_factory  # () -> TiledInference
+        self.ocr_pool = ocr_pool  # shared OCRWorkerPool, None = OCR in the detection thread
+        self.shedding_factory = shedding_factory  # latency_slo -> LoadShedder (or None)
+        self.deferred_ocr_batch = deferred_ocr_batch  # deferred plates read per frame once recovered
+        self.ocr_defer_max_frames = ocr_defer_max_frames  # longest a deferred plate waits, in source frames
+        self.events_factory = events_factory  # () -> EventAggregator, None = one record per frame
+        self.ring_slots = ring_slots  # shared-memory frame slots per decode_process source
+
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def register(self, source_id: str, uri, loop_files: bool = False,
+                 weight: int = 1, max_staleness: Optional[float] = None,
+                 annotate: bool = False, tiled: bool = False, priority: str = 'live',
+                 latency_slo: Optional[float] = None, decode_process: bool = False) -> Dict:
+        """
+        Register a new source (does not start it).
+        `weight`, `max_staleness` and `priority` only apply when a scheduler is attached.
+        `annotate` writes an annotated video for each start/stop session.
+        `tiled` runs tiled full-resolution inference (high-resolution cameras);
+        such sources batch their own tiles instead of going through the scheduler.
+        `latency_slo` (seconds, capture to result) overrides the default SLO
+        that drives load shedding.
+        `decode_process` decodes in a separate process that hands frames over
+        through shared memory (keeps demuxing/decoding off this process's GIL).
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f'Unknown priority class: {priority}')
+        with self.lock:
+            if source_id in self.sources:
+                raise ValueError(f'Source already registered: {source_id}')
+            if len(self.sources) >= self.max_sources:
+                raise ValueError(f'Source limit reached ({self.max_sources})')
+
+            recorder = self.evidence_factory(source_id) if self.evidence_factory else None
+            reader = LatestFrameReader(
+                source_id, uri, self.backoff_initial, self.backoff_max, loop_files,
+                capture_factory=ring_capture_factory(self.ring_slots) if decode_process else open_capture
+            )
+            if recorder is not None:
+                reader.on_frame = self._evidence_hook(recorder, reader)
+
+            processor = StreamingProcessor(
+                self.detector, speed_limit=self.speed_limit,
+                camera_id=source_id, evidence=recorder,
+                tiler=self.tiling_factory() if tiled and self.tiling_factory else None,
+                ocr_pool=self.ocr_pool,
+                events=self.events_factory() if self.events_factory else None
+            )
+            processor.ocr_defer_max_frames = self.ocr_defer_max_frames
+
+            self.sources[source_id] = {
+                'source_id': source_id,
+                'uri': uri,
+                'reader': reader,
+                'processor': processor,
+                'shedder': self.shedding_factory(latency_slo) if self.shedding_factory else None,
+                'worker': None,
+                'annotate': annotate and self.annotation_factory is not None,
+                'decode_process': decode_process,
+                'running': False,
+                'frames_processed': 0,
+                'violations': 0,
+                'processing_time': 0.0,
+                'last_latency': None,
+                'frames_skipped_stale': 0
+            }
+        if self.scheduler is not None:
+            self.scheduler.register_source(source_id, weight=weight, max_staleness=max_staleness,
+                                           priority=priority)
+        logger.info(f"Registered stream {source_id}: {uri}")
+        return self.source_stats(source_id)
+
+    @staticmethod
+    def _evidence_hook(recorder, reader: LatestFrameReader):
+        """Buffer every decoded frame (not just processed ones) for evidence clips"""
+        def hook(frame, seq):
+            if reader.fps and recorder.fps != reader.fps:
+                recorder.set_fps(reader.fps)
+            recorder.push(frame, seq)
+        return hook
+
+    def unregister(self, source_id: str):
+        self.stop(source_id)
+        with self.lock:
+            self.sources.pop(source_id, None)
+        if self.scheduler is not None:
+            self.scheduler.unregister_source(source_id)
+
+    def _get(self, source_id: str) -> Dict:
+        with self.lock:
+            source = self.sources.get(source_id)
+        if source is None:
+            raise KeyError(source_id)
+        return source
+
+    def start(self, source_id: str):
+        source = self._get(source_id)
+        if source['running']:
+            return
+        if source['worker'] is not None and source['worker'].is_alive():
+            logger.warning(f"Stream {source_id} is still finishing its previous session, not restarted")
+            return
+        source['running'] = True
+        if source['annotate']:
+            source['processor'].annotator = self.annotation_factory(source_id)
+        source['reader'].start()
+        if self.scheduler is not None:
+            self.scheduler.start()
+        batched = self.scheduler is not None and source['processor'].tiler is None
+        source['worker'] = threading.Thread(
+            target=self._process_loop_batched if batched else self._process_loop,
+            args=(source,),
+            name=f'detect-{source_id}', daemon=True
+        )
+        source['worker'].start()
+        logger.info(f"▶ Stream {source_id} started")
+
+    def stop(self, source_id: str):
+        """Stop a source; its worker reports open incidents and closes the annotated output on exit"""
+        source = self._get(source_id)
+        source['running'] = False
+        source['reader'].stop()
+        worker = source['worker']
+        if worker is not None:
+            worker.join(5.0)
+            if worker.is_alive():
+                logger.warning(f"Stream {source_id} is still processing a frame, it finishes in the background")
+                return
+            source['worker'] = None
+        logger.info(f"⏹ Stream {source_id} stopped")
+
+    def _end_session(self, source: Dict):
+        """
+        Runs on the worker thread after its last frame, so flushing never
+        races with handle_detections()
+        """
+        source['running'] = False
+        try:
+            source['processor'].flush_events(self._violation_handler(source))
+        except Exception as e:
+            logger.error(f"[{source['source_id']}] flushing events failed: {e}")
+        annotator = source['processor'].annotator
+        if annotator is not None:
+            source['processor'].annotator = None
+            annotator.close()
+
+    def start_all(self):
+        for source_id in list(self.sources):
+            self.start(source_id)
+
+    def stop_all(self):
+        for source_id in list(self.sources):
+            self.stop(source_id)
+
+    def _violation_handler(self, source: Dict):
+        def on_violation(violation_info):
+            if violation_info['is_violation']:
+                source['violations'] += 1
+            if self.output_callback:
+                self.output_callback(violation_info)
+        return on_violation
+
+    def _record_timing(self, source: Dict, started: float, captured_at: float):
+        now = time.time()
+        source['frames_processed'] += 1
+        source['processing_time'] += now - started
+        source['last_latency'] = now - captured_at
+        if source['shedder'] is not None:
+            self._update_shedding(source)
+
+    @staticmethod
+    def _admit(source: Dict, captured_at: float) -> bool:
+        """Whether to analyze a frame (False while shedding drops frames)"""
+        shedder = source['shedder']
+        return shedder is None or shedder.admit(time.time() - captured_at)
+
+    def _update_shedding(self, source: Dict):
+        """Feed the latency SLO controller and apply its level to the processor"""
+        shedder = source['shedder']
+        processor = source['processor']
+
+        previous = shedder.level
+        level = shedder.observe(source['last_latency'])
+        if level is not None:
+            processor.annotate = not shedder.at_least('no_annotation')
+            processor.frame_size = shedder.frame_size(PROCESSING_SIZE)
+            processor.defer_ocr = shedder.at_least('deferred_ocr')
+            log = logger.warning if shedder.level > previous else logger.info
+            log(f"[{source['source_id']}] latency {1000 * shedder.latency:.0f}ms "
+                           f"(SLO {1000 * shedder.slo:.0f}ms) - shedding level: {level}")
+
+        if not processor.defer_ocr:
+            processor.run_deferred_ocr(max_items=self.deferred_ocr_batch)
+
+    def _process_loop(self, source: Dict):
+        """Detection loop for one source - always works on the newest frame"""
+        reader = source['reader']
+        processor = source['processor']
+        on_violation = self._violation_handler(source)
+
+        while source['running']:
+            latest = reader.get_latest(timeout=0.5)
+            if latest is None:
+                if not reader.is_alive():
+                    break
+                continue
+
+            seq, captured_at, frame = latest
+            if not self._admit(source, captured_at):
+                continue
+            started = time.time()
+            try:
+                processor.process_frame(frame, seq, reader.fps or 30, on_violation)
+            except Exception as e:
+                logger.error(f"[{source['source_id']}] processing error: {e}")
+
+            self._record_timing(source, started, captured_at)
+
+        self._end_session(source)
+
+    def _process_loop_batched(self, source: Dict):
+        """
+        Detection loop that hands YOLO to the shared scheduler.
+        Keeps up to `pipeline_depth` frames in flight and applies the
+        violation logic to results in frame order.
+        """
+        source_id = source['source_id']
+        reader = source['reader']
+        processor = source['processor']
+        on_violation = self._violation_handler(source)
+        in_flight = deque()
+
+        while source['running']:
+            latest = reader.get_latest(timeout=0.05 if in_flight else 0.5)
+
+            if latest is not None:
+                seq, captured_at, frame = latest
+                if self._admit(source, captured_at):
+                    started = time.time()
+                    frame_resized, traffic_light = processor.prepare_frame(frame)
+                    future = self.scheduler.submit(source_id, frame_resized, captured_at)
+                    in_flight.append((future, frame, frame_resized, traffic_light, seq, captured_at, started))
+            elif not in_flight and not reader.is_alive():
+                break
+
+            while in_flight and (in_flight[0][0].done() or len(in_flight) >= self.pipeline_depth):
+                future, frame, frame_resized, traffic_light, seq, captured_at, started = in_flight.popleft()
+                detections = future.result()
+                if detections is None:
+                    # Dropped by the scheduler (stale or superseded)
+                    source['frames_skipped_stale'] += 1
+                    continue
+
+                try:
+                    frame_results = processor.handle_detections(
+                        frame_resized, detections, traffic_light, seq,
+                        reader.fps or 30, on_violation
+                    )
+                    annotator = processor.annotator
+                    if annotator is not None and processor.annotate:
+                        annotator.submit(frame, seq, reader.fps or 30, frame_results,
+                                         traffic_light, frame_resized.shape)
+                except Exception as e:
+                    logger.error(f"[{source_id}] processing error: {e}")
+
+                self._record_timing(source, started, captured_at)
+
+        self._end_session(source)
+
+    def source_stats(self, source_id: str) -> Dict:
+        source = self._get(source_id)
+        processed = source['frames_processed']
+        stats = {
+            'source_id': source_id,
+            'uri': str(source['uri']),
+            'running': source['running'],
+            'decode_process': source['decode_process'],
+            'frames_processed': processed,
+            'violations': source['violations'],
+            'avg_processing_ms': round(1000 * source['processing_time'] / processed, 2) if processed else 0,
+            'last_latency_ms': round(1000 * source['last_latency'], 1) if source['last_latency'] is not None else None,
+            'frames_skipped_stale': source['frames_skipped_stale']
+        }
+        stats.update(source['reader'].stats())
+        if source['processor'].annotator is not None:
+            stats['annotation'] = source['processor'].annotator.stats()
+        if source['processor'].tiler is not None:
+            stats['tiling'] = source['processor'].tiler.stats()
+        if self.scheduler is not None:
+            stats['scheduler'] = self.scheduler.source_stats(source_id)
+        if source['processor'].events is not None:
+            stats['events'] = source['processor'].events.stats()
+        if source['shedder'] is not None:
+            stats['shedding'] = {**source['shedder'].stats(), **source['processor'].ocr_backlog()}
+        return stats
+
+    def stats(self) -> List[Dict]:
+        with self.lock:
+            source_ids = list(self.sources)
+        return [self.source_stats(source_id) for source_id in source_ids]
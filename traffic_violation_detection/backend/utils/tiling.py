@@ -0,0 +1,282 @@
+import cv2
+import math
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def tile_grid(width: int, height: int, tile_size: int = 640,
+              overlap: float = 0.2) -> List[Tuple[int, int, int, int]]:
+    """
+    Overlapping (x1, y1, x2, y2) tiles covering the frame. The last row/column
+    is aligned to the frame edge so every tile is full size (when the frame is
+    larger than a tile).
+    """
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        count = math.ceil((length - tile_size) / stride) + 1
+        return [round(i * (length - tile_size) / (count - 1)) for i in range(count)]
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height) for x in starts(width)
+    ]
+
+
+def overlap_matrix(boxes: np.ndarray, metric: str = 'ios') -> np.ndarray:
+    """
+    Pairwise overlap of (N, 4) xyxy boxes. 'iou' is intersection over union;
+    'ios' is intersection over the smaller box, which also catches a vehicle
+    cut in half by a tile border against its full box from the next tile.
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+
+    inter_w = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    inter_h = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    inter = inter_w * inter_h
+
+    if metric == 'iou':
+        denominator = areas[:, None] + areas[None, :] - inter
+    else:
+        denominator = np.minimum(areas[:, None], areas[None, :])
+    return inter / np.maximum(denominator, 1e-9)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU of one xyxy box with each of (N, 4) boxes (empty or inverted boxes have no area)"""
+    inter_w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    inter_h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = inter_w * inter_h
+    area = max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def merge_boxes(boxes: np.ndarray, scores: np.ndarray, threshold: float = 0.5,
+                metric: str = 'ios', same: Optional[np.ndarray] = None) -> List[Tuple[int, np.ndarray]]:
+    """
+    Greedy NMS over all tiles at once. Returns (kept index, suppressed-group
+    indices) pairs, highest score first; the group lets callers merge the
+    kept box with the pieces it absorbed. `same` replaces the overlap test
+    with a precomputed (N, N) boolean "same vehicle" matrix.
+    """
+    if len(boxes) == 0:
+        return []
+
+    overlaps = same if same is not None else overlap_matrix(boxes, metric) > threshold
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    kept = []
+
+    for i in np.argsort(-scores, kind='stable'):
+        if suppressed[i]:
+            continue
+        group = np.flatnonzero(overlaps[i] & ~suppressed)
+        suppressed[group] = True
+        suppressed[i] = True
+        kept.append((int(i), group))
+
+    return kept
+
+
+class TileScheduler:
+    """
+    Chooses which tiles to run on each analyzed frame: every tile on a full
+    sweep (every `full_refresh_interval` frames), otherwise only tiles that
+    had a vehicle in or near them during the last `activity_ttl` frames.
+    Counts are in analyzed frames, not source frames.
+    """
+
+    def __init__(self, tiles: List[Tuple[int, int, int, int]], full_refresh_interval: int = 10,
+                 activity_ttl: int = 15, margin: float = 0.5):
+        self.tiles = np.array(tiles, dtype=np.float32)
+        self.full_refresh_interval = max(1, int(full_refresh_interval))
+        self.activity_ttl = activity_ttl
+        self.margin = margin  # expand boxes by this fraction to anticipate motion
+        self.frame_index = 0
+        self.last_full = None
+        self.last_active = np.full(len(tiles), -10 ** 9, dtype=np.int64)
+
+    def select(self) -> np.ndarray:
+        """Indices of the tiles to run on the next frame"""
+        self.frame_index += 1
+        if self.last_full is None or self.frame_index - self.last_full >= self.full_refresh_interval:
+            self.last_full = self.frame_index
+            return np.arange(len(self.tiles))
+        return np.flatnonzero(self.frame_index - self.last_active <= self.activity_ttl)
+
+    def update(self, boxes: np.ndarray):
+        """Mark tiles touched by (margin-expanded) detections as active"""
+        if len(boxes) == 0:
+            return
+        w = (boxes[:, 2] - boxes[:, 0]) * self.margin
+        h = (boxes[:, 3] - boxes[:, 1]) * self.margin
+        expanded = np.stack([boxes[:, 0] - w, boxes[:, 1] - h, boxes[:, 2] + w, boxes[:, 3] + h], axis=1)
+
+        t = self.tiles
+        touches = ((expanded[:, None, 0] < t[None, :, 2]) & (expanded[:, None, 2] > t[None, :, 0]) &
+                   (expanded[:, None, 1] < t[None, :, 3]) & (expanded[:, None, 3] > t[None, :, 1]))
+        self.last_active[touches.any(axis=0)] = self.frame_index
+
+    def get_state(self) -> Dict:
+        return {'frame_index': self.frame_index, 'last_full': self.last_full,
+                'last_active': self.last_active.tolist()}
+
+    def restore(self, state: Dict):
+        self.frame_index = state['frame_index']
+        self.last_full = state['last_full']
+        self.last_active = np.array(state['last_active'], dtype=np.int64)
+
+
+class TiledInference:
+    """
+    High-resolution detection: the full-resolution frame is cut into
+    overlapping model-sized tiles which, together with one downscaled view of
+    the whole frame (for vehicles larger than a tile), go through a single
+    batched detector call. Boxes are shifted back to frame coordinates and
+    merged with cross-tile NMS: duplicates (IoU above `iou_threshold`) are
+    suppressed, and a box cut by a tile seam is joined with a box from another
+    view whose part inside the cut box's tile matches it (IoU above
+    `nms_threshold`). Vehicles that merely occlude each other are kept apart.
+    """
+
+    def __init__(self, detector, tile_size: int = 640, overlap: float = 0.2,
+                 nms_threshold: float = 0.5, include_full_frame: bool = True,
+                 full_refresh_interval: Optional[int] = 10, activity_ttl: int = 15,
+                 iou_threshold: float = 0.5, seam_margin: int = 2):
+        self.detector = detector
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.nms_threshold = nms_threshold
+        self.iou_threshold = iou_threshold
+        self.seam_margin = seam_margin  # px from an inner tile edge at which a box counts as cut
+        self.include_full_frame = include_full_frame
+        # None disables activity-based re-tiling (every tile, every frame)
+        self.full_refresh_interval = full_refresh_interval
+        self.activity_ttl = activity_ttl
+
+        self.frame_shape = None
+        self.tiles = []
+        self.scheduler = None
+        self._pending_state = None
+
+        self.frames = 0
+        self.tiles_run = 0
+        self.tiles_skipped = 0
+
+    def _ensure_grid(self, frame: np.ndarray):
+        if self.frame_shape == frame.shape[:2]:
+            return
+        height, width = frame.shape[:2]
+        self.frame_shape = (height, width)
+        self.tiles = tile_grid(width, height, self.tile_size, self.overlap)
+        self.scheduler = None
+        if self.full_refresh_interval:
+            self.scheduler = TileScheduler(self.tiles, self.full_refresh_interval, self.activity_ttl)
+            if self._pending_state is not None:
+                self.scheduler.restore(self._pending_state)
+                self._pending_state = None
+        logger.info(f"Tiled inference: {width}x{height} -> {len(self.tiles)} tiles of {self.tile_size}px")
+
+    def detect(self, frame: np.ndarray) -> List[Dict]:
+        """Vehicle detections in full-frame coordinates, highest confidence first"""
+        self._ensure_grid(frame)
+        selected = self.scheduler.select() if self.scheduler is not None else np.arange(len(self.tiles))
+
+        height, width = self.frame_shape
+        crops, offsets, regions, seams = [], [], [], []
+        for index in selected:
+            x1, y1, x2, y2 = self.tiles[index]
+            crops.append(frame[y1:y2, x1:x2])
+            offsets.append((x1, y1, 1.0, 1.0))
+            regions.append((x1, y1, x2, y2))
+            # Tile edges inside the frame (left, top, right, bottom)
+            seams.append((x1 > 0, y1 > 0, x2 < width, y2 < height))
+
+        if self.include_full_frame and len(self.tiles) > 1:
+            scale = self.tile_size / max(width, height)
+            crops.append(cv2.resize(frame, (int(width * scale), int(height * scale)),
+                                    interpolation=cv2.INTER_AREA))
+            offsets.append((0, 0, 1 / scale, 1 / scale))
+            regions.append((0, 0, width, height))
+            seams.append((False, False, False, False))
+
+        self.frames += 1
+        self.tiles_run += len(selected)
+        self.tiles_skipped += len(self.tiles) - len(selected)
+
+        if not crops:
+            return []
+
+        detections, boxes, views, cut = [], [], [], []
+        batches = self.detector.detect_vehicles_batch(crops)
+        for view, (crop_detections, crop, (ox, oy, sx, sy), seam) in enumerate(zip(batches, crops, offsets, seams)):
+            crop_h, crop_w = crop.shape[:2]
+            m = self.seam_margin
+            for det in crop_detections:
+                bx1, by1, bx2, by2 = det['bbox']
+                boxes.append((bx1 * sx + ox, by1 * sy + oy, bx2 * sx + ox, by2 * sy + oy))
+                detections.append(det)
+                views.append(view)
+                cut.append((seam[0] and bx1 <= m) or (seam[1] and by1 <= m) or
+                           (seam[2] and bx2 >= crop_w - m) or (seam[3] and by2 >= crop_h - m))
+
+        if not detections:
+            return []
+
+        boxes = np.array(boxes, dtype=np.float32)
+        scores = np.array([det['conf'] for det in detections], dtype=np.float32)
+        views = np.array(views)
+        cut = np.array(cut, dtype=bool)
+
+        # Same vehicle: a duplicate, or a seam-cut piece that matches a box from
+        # another view once that box is clipped to the piece's tile (an occluded
+        # neighbour overlaps the piece but does not line up with it)
+        same = overlap_matrix(boxes, 'iou') > self.iou_threshold
+        for i in np.flatnonzero(cut):
+            rx1, ry1, rx2, ry2 = regions[views[i]]
+            clipped = np.stack([np.maximum(boxes[:, 0], rx1), np.maximum(boxes[:, 1], ry1),
+                                np.minimum(boxes[:, 2], rx2), np.minimum(boxes[:, 3], ry2)], axis=1)
+            match = (box_iou(boxes[i], clipped) > self.nms_threshold) & (views != views[i])
+            same[i] |= match
+            same[:, i] |= match
+
+        # Complete boxes are kept ahead of pieces so each absorbs the pieces on every side of a seam
+        merged = []
+        for keep, group in merge_boxes(boxes, scores - cut, same=same):
+            # The union restores vehicles that a tile border cut in half
+            x1, y1 = boxes[group, 0].min(), boxes[group, 1].min()
+            x2, y2 = boxes[group, 2].max(), boxes[group, 3].max()
+            merged.append({
+                **detections[keep],
+                'bbox': (int(x1), int(y1), int(x2), int(y2)),
+                'area': float((x2 - x1) * (y2 - y1))
+            })
+
+        if self.scheduler is not None:
+            self.scheduler.update(np.array([det['bbox'] for det in merged], dtype=np.float32))
+
+        return merged
+
+    def get_state(self) -> Optional[Dict]:
+        return self.scheduler.get_state() if self.scheduler is not None else None
+
+    def restore(self, state: Optional[Dict]):
+        """Applied once the grid for the resumed video is built"""
+        self._pending_state = state
+        self.frame_shape = None
+
+    def stats(self) -> Dict:
+        return {
+            'tiles': len(self.tiles),
+            'tile_size': self.tile_size,
+            'frames': self.frames,
+            'tiles_run': self.tiles_run,
+            'tiles_skipped': self.tiles_skipped
+        }
+
@@ -0,0 +1,389 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .events import event_key
+from .plate_index import normalize_plate
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS violations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    camera_id TEXT,
+    job_id TEXT,
+    plate TEXT,
+    violation_type TEXT,
+    speed REAL,
+    frame INTEGER,
+    plate_confidence REAL,
+    traffic_light_status TEXT,
+    bbox TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_violations_ts ON violations (ts);
+CREATE INDEX IF NOT EXISTS idx_violations_camera_ts ON violations (camera_id, ts);
+CREATE INDEX IF NOT EXISTS idx_violations_type_ts ON violations (violation_type, ts);
+CREATE INDEX IF NOT EXISTS idx_violations_plate ON violations (plate);
+CREATE INDEX IF NOT EXISTS idx_violations_job_frame ON violations (job_id, frame);
+CREATE INDEX IF NOT EXISTS idx_violations_speed_ts ON violations (speed, ts);
+"""
+
+MAX_PAGE_SIZE = 1000
+
+INSERT_SQL = """
+INSERT INTO violations (ts, camera_id, job_id, plate, violation_type, speed, frame,
+                        plate_confidence, traffic_light_status, bbox, details)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Fields stored in dedicated columns; everything else goes into `details`
+COLUMN_FIELDS = {'camera_id', 'job_id', 'plate', 'violation_type', 'speed', 'frame',
+                 'plate_confidence', 'traffic_light_status', 'bbox', 'detected_at'}
+
+
+def db_path_from_uri(uri: str) -> str:
+    """'sqlite:///violations.db' -> 'violations.db'"""
+    prefix = 'sqlite:///'
+    return uri[len(prefix):] if uri.startswith(prefix) else uri
+
+
+def encode_cursor(ts: float, row_id: int) -> str:
+    return f'{ts!r}:{row_id}'
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    ts, row_id = cursor.rsplit(':', 1)
+    return float(ts), int(row_id)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix`"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def build_filters(filters: Dict) -> Tuple[str, list]:
+    """
+    Translate query filters into an index-friendly WHERE clause.
+    Supported keys: start_time, end_time (unix seconds), camera_id, violation_type,
+    job_id, min_speed, max_speed, plate (exact), plate_prefix
+    """
+    clauses, params = [], []
+
+    if filters.get('start_time') is not None:
+        clauses.append('ts >= ?')
+        params.append(float(filters['start_time']))
+    if filters.get('end_time') is not None:
+        clauses.append('ts < ?')
+        params.append(float(filters['end_time']))
+    if filters.get('camera_id'):
+        clauses.append('camera_id = ?')
+        params.append(filters['camera_id'])
+    if filters.get('violation_type'):
+        clauses.append('violation_type = ?')
+        params.append(filters['violation_type'])
+    if filters.get('job_id'):
+        clauses.append('job_id = ?')
+        params.append(filters['job_id'])
+    if filters.get('min_speed') is not None:
+        clauses.append('speed >= ?')
+        params.append(float(filters['min_speed']))
+    if filters.get('max_speed') is not None:
+        clauses.append('speed <= ?')
+        params.append(float(filters['max_speed']))
+    if filters.get('plate'):
+        clauses.append('plate = ?')
+        params.append(normalize_plate(filters['plate']))
+    if filters.get('plate_prefix'):
+        # Range scan instead of LIKE so the plate index is used
+        prefix = normalize_plate(filters['plate_prefix'])
+        if prefix:
+            clauses.append('plate >= ? AND plate < ?')
+            params.extend([prefix, prefix_upper_bound(prefix)])
+
+    where = ' AND '.join(clauses) if clauses else '1'
+    return where, params
+
+
+def row_to_dict(row: sqlite3.Row) -> Dict:
+    violation = json.loads(row['details']) if row['details'] else {}
+    violation.update({
+        'id': row['id'],
+        'detected_at': datetime.fromtimestamp(row['ts']).isoformat(),
+        'camera_id': row['camera_id'],
+        'job_id': row['job_id'],
+        'plate': row['plate'] or '',
+        'violation_type': row['violation_type'],
+        'speed': row['speed'],
+        'frame': row['frame'],
+        'plate_confidence': row['plate_confidence'],
+        'traffic_light_status': row['traffic_light_status'],
+        'bbox': json.loads(row['bbox']) if row['bbox'] else None
+    })
+    return violation
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection tuned for one writer / many readers"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=5000')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class ViolationStore:
+    """
+    Persistent violation store backed by SQLite in WAL mode.
+
+    add() only enqueues; a background writer drains the queue and inserts
+    rows in batched transactions so detection threads never wait on disk.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 500,
+                 flush_interval: float = 0.5, max_queue: int = 100000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = connect(db_path)
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._local = threading.local()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._listeners = []
+
+        self.rows_written = 0
+        self.batches_written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._writer, name='violation-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Violation store ready: {self.db_path}")
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending rows and stop the writer"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_listener(self, callback):
+        """Call `callback(rows)` on the writer thread after each committed batch"""
+        self._listeners.append(callback)
+
+    def add(self, violation_info: Dict, job_id: Optional[str] = None,
+            camera_id: Optional[str] = None) -> bool:
+        """Queue one violation for writing (never blocks)"""
+        row = (
+            violation_info.get('detected_at') or time.time(),
+            camera_id or violation_info.get('camera_id'),
+            job_id or violation_info.get('job_id'),
+            normalize_plate(violation_info.get('plate')) or None,
+            violation_info.get('violation_type'),
+            violation_info.get('speed'),
+            violation_info.get('frame'),
+            violation_info.get('plate_confidence'),
+            violation_info.get('traffic_light_status'),
+            json.dumps(violation_info['bbox']) if violation_info.get('bbox') is not None else None,
+            json.dumps({k: v for k, v in violation_info.items() if k not in COLUMN_FIELDS}, default=str)
+        )
+
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Violation store queue full, {self.dropped} rows dropped so far")
+            return False
+
+    def _drain_batch(self) -> List[tuple]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _writer(self):
+        conn = connect(self.db_path)
+
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = self._drain_batch()
+            if not batch:
+                continue
+
+            try:
+                with conn:
+                    # AUTOINCREMENT ids are sequential within our single-writer transaction
+                    seq = conn.execute(
+                        "SELECT seq FROM sqlite_sequence WHERE name = 'violations'"
+                    ).fetchone()
+                    first_id = (seq[0] if seq else 0) + 1
+                    conn.executemany(INSERT_SQL, batch)
+                self.rows_written += len(batch)
+                self.batches_written += 1
+            except sqlite3.Error as e:
+                self.write_errors += 1
+                logger.error(f"Violation store write failed ({len(batch)} rows): {e}")
+                continue
+
+            for listener in self._listeners:
+                try:
+                    listener([(first_id + i,) + row for i, row in enumerate(batch)])
+                except Exception as e:
+                    logger.error(f"Violation store listener error: {e}")
+
+        conn.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        """Per-thread read connection (WAL lets readers run alongside the writer)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def count(self, since: Optional[float] = None, filters: Optional[Dict] = None) -> int:
+        """Number of stored violations matching `filters` (optionally since a unix timestamp)"""
+        filters = dict(filters or {})
+        if since is not None:
+            filters['start_time'] = since
+        where, params = build_filters(filters)
+        return self._reader().execute(f'SELECT COUNT(*) FROM violations WHERE {where}', params).fetchone()[0]
+
+    def query(self, filters: Optional[Dict] = None, cursor: Optional[str] = None,
+              limit: int = 100) -> Dict:
+        """
+        Newest-first page of violations using keyset pagination on (ts, id).
+        Pass the returned `next_cursor` to fetch the following page.
+        """
+        where, params = build_filters(filters or {})
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        if cursor:
+            ts, row_id = decode_cursor(cursor)
+            where += ' AND (ts < ? OR (ts = ? AND id < ?))'
+            params.extend([ts, ts, row_id])
+
+        rows = self._reader().execute(
+            f'SELECT * FROM violations WHERE {where} ORDER BY ts DESC, id DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            'violations': [row_to_dict(row) for row in rows],
+            'next_cursor': encode_cursor(rows[-1]['ts'], rows[-1]['id']) if has_more else None
+        }
+
+    def iter_rows(self, filters: Optional[Dict] = None, batch_size: int = MAX_PAGE_SIZE) -> Iterator[Dict]:
+        """Every matching violation in insertion order, fetched in id-keyed batches"""
+        where, params = build_filters(filters or {})
+        last_id = 0
+        while True:
+            rows = self._reader().execute(
+                f'SELECT * FROM violations WHERE {where} AND id > ? ORDER BY id LIMIT ?',
+                params + [last_id, batch_size]
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row_to_dict(row)
+            last_id = rows[-1]['id']
+
+    def contains_event(self, job_id: str, record: Dict, since: Optional[float] = None) -> bool:
+        """
+        Whether `job_id` already stored a violation with the same event_key()
+        as `record` (optionally since a unix timestamp). A resumed job replays
+        the frames after its checkpoint and checks each report here, with one
+        indexed (job_id, frame) lookup instead of loading the job's history.
+        """
+        key = event_key(record)
+        rows = self._reader().execute(
+            'SELECT * FROM violations WHERE job_id = ? AND frame IS ?', (job_id, key[1])
+        ).fetchall()
+        return any(event_key(row_to_dict(row)) == key for row in rows
+                   if since is None or row['ts'] >= since)
+
+    def aggregate(self, filters: Optional[Dict] = None, top_cameras: int = 20) -> Dict:
+        """Counts and speed statistics for violations matching `filters`"""
+        where, params = build_filters(filters or {})
+        conn = self._reader()
+
+        totals = conn.execute(
+            f'SELECT COUNT(*), AVG(speed), MAX(speed), MIN(ts), MAX(ts) FROM violations WHERE {where}',
+            params
+        ).fetchone()
+
+        by_type = conn.execute(
+            f'SELECT violation_type, COUNT(*) FROM violations WHERE {where} GROUP BY violation_type',
+            params
+        ).fetchall()
+
+        by_camera = conn.execute(
+            f'SELECT camera_id, COUNT(*) AS n FROM violations WHERE {where} '
+            f'GROUP BY camera_id ORDER BY n DESC LIMIT ?',
+            params + [top_cameras]
+        ).fetchall()
+
+        by_day = conn.execute(
+            f"SELECT date(ts, 'unixepoch', 'localtime') AS day, COUNT(*) FROM violations "
+            f'WHERE {where} GROUP BY day ORDER BY day',
+            params
+        ).fetchall()
+
+        return {
+            'total': totals[0],
+            'avg_speed': round(totals[1], 2) if totals[1] is not None else None,
+            'max_speed': totals[2],
+            'first_seen': datetime.fromtimestamp(totals[3]).isoformat() if totals[3] else None,
+            'last_seen': datetime.fromtimestamp(totals[4]).isoformat() if totals[4] else None,
+            'by_type': {row[0] or 'unknown': row[1] for row in by_type},
+            'by_camera': {row[0] or 'uploads': row[1] for row in by_camera},
+            'by_day': {row[0]: row[1] for row in by_day}
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'db_path': self.db_path,
+            'queued': self._queue.qsize(),
+            'rows_written': self.rows_written,
+            'batches_written': self.batches_written,
+            'dropped': self.dropped,
+            'write_errors': self.write_errors
+        }
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""
+Worker node for distributed processing
+
+Usage:
+    python worker.py --coordinator http://10.0.0.5:5100
+    python worker.py --coordinator http://10.0.0.5:5100 --slots 2 --gpu
+
+Registers with coordinator.py, heartbeats in the background and runs the
+tasks it leases (a whole file or a frame range of one) with its own
+detector per slot. Results are posted back to the coordinator, which merges
+them; video paths in tasks must be readable on this machine.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import logging
+
+from config import Config
+from utils.coordination import CoordinatorClient
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('worker')
+
+config = Config()
+
+
+class WorkerNode:
+    """Registration, heartbeats and the lease/process/report loop of one worker"""
+
+    def __init__(self, client: CoordinatorClient, name: str, slots: int = 1, use_gpu: bool = False,
+                 model: str = 'yolov8n.pt'):
+        self.client = client
+        self.name = name
+        self.slots = max(1, slots)
+        self.use_gpu = use_gpu
+        self.model = model
+
+        self.worker_id = None
+        self.running = {}  # task_id -> StreamingProcessor
+        self.cancelled = set()
+        self.lock = threading.Lock()
+        self._registered = threading.Event()
+        self._register_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self.tasks_done = 0
+        self.tasks_failed = 0
+
+    # Coordinator protocol
+
+    def register(self):
+        """(Re-)register until the coordinator answers"""
+        self._registered.clear()
+        while not self._stop_event.is_set():
+            try:
+                status, body = self.client.request('POST', '/api/workers/register',
+                                                   {'name': self.name, 'slots': self.slots})
+                if status == 201:
+                    with self.lock:
+                        self.worker_id = body['worker_id']
+                    self._registered.set()
+                    logger.info(f"✓ Registered as {self.worker_id} ({self.slots} slots)")
+                    return
+                logger.warning(f"Registration refused ({status}): {body}")
+            except ConnectionError as e:
+                logger.warning(f"{e}, retrying")
+            self._stop_event.wait(config.WORKER_HEARTBEAT_INTERVAL)
+
+    def reregister(self, stale_id: str):
+        """Register again after the coordinator forgot `stale_id` (once, however many threads notice)"""
+        with self._register_lock:
+            if self.worker_id == stale_id:
+                self.register()
+
+    def _cancel(self, task_ids):
+        with self.lock:
+            for task_id in task_ids:
+                processor = self.running.get(task_id)
+                if processor is not None:
+                    self.cancelled.add(task_id)
+                    processor.stop()
+                    logger.warning(f"Task {task_id} was reassigned, cancelling it")
+
+    def heartbeat_loop(self):
+        while not self._stop_event.wait(config.WORKER_HEARTBEAT_INTERVAL):
+            if not self._registered.is_set():
+                continue
+            with self.lock:
+                worker_id, running = self.worker_id, list(self.running)
+            try:
+                _, body = self.client.request('POST', f'/api/workers/{worker_id}/heartbeat', {'running': running})
+            except ConnectionError as e:
+                logger.warning(f"Heartbeat failed: {e}")
+                continue
+            if body is None:
+                continue
+            self._cancel(body.get('cancel', []))
+            if not body.get('known', True):
+                # Declared dead (e.g. after a network partition): our leases are gone
+                logger.warning("Coordinator no longer knows this worker, registering again")
+                self.reregister(worker_id)
+
+    def _report(self, task: dict, path: str, payload: dict):
+        """Post a result/failure; a 409 means the lease was revoked and the work is discarded"""
+        payload = {'worker_id': task['worker_id'], 'lease_id': task['lease_id'], **payload}
+        for attempt in range(3):
+            try:
+                status, body = self.client.request('POST', f"/api/tasks/{task['task_id']}/{path}", payload)
+                if status == 409:
+                    logger.warning(f"Task {task['task_id']}: {body.get('error')}")
+                return
+            except ConnectionError as e:
+                logger.warning(f"Reporting task {task['task_id']} failed: {e}")
+                self._stop_event.wait(2 ** attempt)
+
+    # Work
+
+    def slot_loop(self, slot: int):
+        from utils.realtime_detection import RealtimeDetector
+
+        detector = RealtimeDetector(model_path=self.model, use_gpu=self.use_gpu,
+                                    plate_model_path=config.PLATE_MODEL_WEIGHTS)
+        if not config.PLATE_PREFILTER_ENABLED:
+            detector.plate_filter = None
+        detector.ocr_recognition_only = config.OCR_RECOGNITION_ONLY
+        detector.ocr_allowlist = config.OCR_ALLOWLIST
+        detector.ocr_min_confidence = config.OCR_MIN_CONFIDENCE
+
+        while not self._stop_event.is_set():
+            self._registered.wait()
+            worker_id = self.worker_id
+            try:
+                status, task = self.client.request('POST', f'/api/workers/{worker_id}/lease')
+            except ConnectionError as e:
+                logger.warning(f"Lease failed: {e}")
+                self._stop_event.wait(config.WORKER_HEARTBEAT_INTERVAL)
+                continue
+            if status == 404:
+                self.reregister(worker_id)
+                continue
+            if status != 200:
+                self._stop_event.wait(config.WORKER_POLL_INTERVAL)
+                continue
+            self.run_task(detector, {**task, 'worker_id': worker_id})
+
+    def run_task(self, detector, task: dict):
+        from utils.realtime_detection import StreamingProcessor
+        from utils.result_sink import ResultSink
+        from utils.events import EventAggregator, IoUTracker
+
+        settings = task['settings']
+        detector.frame_skip = settings.get('frame_skip', config.DISTRIBUTED_FRAME_SKIP)
+        detector.conf_threshold = settings.get('confidence', config.CONFIDENCE_THRESHOLD)
+
+        fd, log_path = tempfile.mkstemp(prefix=f"task_{task['task_id']}_", suffix='.ndjson')
+        os.close(fd)
+        processor = StreamingProcessor(
+            detector, speed_limit=settings.get('speed_limit', config.SPEED_LIMIT),
+            sink=ResultSink(log_path, window_size=config.RESULT_WINDOW_SIZE),
+            events=EventAggregator(
+                IoUTracker(iou_threshold=config.EVENT_TRACK_IOU, max_age=config.EVENT_TRACK_MAX_AGE),
+                gap_frames=config.EVENT_GAP_FRAMES, keep_detail=config.EVENT_KEEP_DETAIL
+            ) if config.EVENT_AGGREGATION else None
+        )
+        with self.lock:
+            self.running[task['task_id']] = processor
+
+        span = f"frames {task['start_frame']}-{task['end_frame'] or 'end'}"
+        logger.info(f"▶ Task {task['task_id']}: {os.path.basename(task['file'])} {span}")
+        started = time.time()
+        try:
+            result = processor.process_stream(task['file'], start_frame=task['start_frame'],
+                                              end_frame=task['end_frame'])
+            with self.lock:
+                cancelled = task['task_id'] in self.cancelled
+            if cancelled:
+                pass  # already requeued elsewhere
+            elif 'error' in result:
+                with self.lock:
+                    self.tasks_failed += 1
+                self._report(task, 'failure', {'error': result['error']})
+            else:
+                with self.lock:
+                    self.tasks_done += 1
+                self._report(task, 'result', {'result': {
+                    'total_frames': result['total_frames'],
+                    'frames_analyzed': result['frames_analyzed'],
+                    'fps': result['fps'],
+                    'violations': list(processor.sink),
+                    'worker': self.name,
+                    'elapsed': round(time.time() - started, 3)
+                }})
+                logger.info(f"✓ Task {task['task_id']}: {result['violations']} violations "
+                            f"in {time.time() - started:.1f}s")
+        except Exception as e:
+            with self.lock:
+                self.tasks_failed += 1
+            logger.error(f"Task {task['task_id']} failed: {e}")
+            self._report(task, 'failure', {'error': str(e)})
+        finally:
+            with self.lock:
+                self.running.pop(task['task_id'], None)
+                self.cancelled.discard(task['task_id'])
+            os.remove(log_path)
+
+    def run(self):
+        self.register()
+        threading.Thread(target=self.heartbeat_loop, name='worker-heartbeat', daemon=True).start()
+        slots = [threading.Thread(target=self.slot_loop, args=(i,), name=f'worker-slot-{i}', daemon=True)
+                 for i in range(self.slots)]
+        for thread in slots:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in slots):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logger.info("Stopping worker (unfinished tasks are requeued by the coordinator)")
+        self._stop_event.set()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Process video tasks leased from a coordinator')
+    parser.add_argument('--coordinator', default=config.COORDINATOR_URL,
+                        help='coordinator base URL (default: %(default)s)')
+    parser.add_argument('--name', default=f'{socket.gethostname()}-{os.getpid()}',
+                        help='name shown by the coordinator (default: host-pid)')
+    parser.add_argument('--slots', type=int, default=1, help='tasks run concurrently, one detector each (default: %(default)s)')
+    parser.add_argument('--model', default='yolov8n.pt', help='YOLO weights (default: %(default)s)')
+    parser.add_argument('--gpu', action='store_true', help='run the detector on CUDA')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    WorkerNode(CoordinatorClient(args.coordinator), args.name, slots=args.slots,
+               use_gpu=args.gpu, model=args.model).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())